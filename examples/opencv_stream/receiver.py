@@ -17,7 +17,9 @@ from peerpy import Peer, protocol
 
 # OpenCV's imshow is not thread-safe: instead, we push frames to a queue
 # and the main thread reads it and display frames
-frames = queue.Queue()
+# frames are received into a ring of 4 reused arrays: the queue holds at most 2 of them, so that
+# the frame displayed and the frame being received are never overwritten
+frames = queue.Queue(maxsize=2)
 
 # by default, whenever a frame is received from a connection, put it in the queue
 protocol.defaults.connection_handlers["data"] = lambda frame: frames.put(frame)
@@ -25,8 +27,8 @@ protocol.defaults.connection_handlers["data"] = lambda frame: frames.put(frame)
 
 with Peer(timeout=1) as peer:
     address_name = input("Address to connect to (CTRL+C to stop):\n")
-    # data_type="raw" to tell the other peer that we are sending a python object (which will need to be unpickled)
-    connection = peer.connect(address_name, data_type="raw", stream=True)
+    # data_type="ndarray" to tell the other peer that we are sending numpy arrays, received without being copied
+    connection = peer.connect(address_name, data_type="ndarray", stream=True, ring_size=4)
 
     if connection:  # if connection was successful
         while True:
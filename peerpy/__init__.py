@@ -1,3 +1,17 @@
 from .peer import Peer
 from .connection import Connection
 from . import protocol
+
+# asyncio is only imported when asyncio peers are used
+_lazy_classes = {
+    "AsyncPeer": ".async_peer",
+    "AsyncConnection": ".async_connection"
+}
+
+
+def __getattr__(name: str):
+    if name in _lazy_classes:
+        import importlib
+        return getattr(importlib.import_module(_lazy_classes[name], __name__), name)
+
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -0,0 +1,285 @@
+import asyncio
+from typing import Any
+
+from .data import Data
+from .event_handler import AsyncEventHandler
+from .utils import valid_data_types, valid_framings, buffers_size, build_data_header, split_header, build_header
+from .utils import frame_struct, build_frame_header, split_frame_header
+from .protocol import headers, frames, defaults
+from .exceptions import DataSizeError, FrameError, FrameSizeError
+
+
+class AsyncConnection(AsyncEventHandler):
+    """asyncio counterpart of Connection, exchanging data over asyncio streams instead of a dedicated thread.
+    Received data is passed to the data handler if one is set, otherwise it can be iterated over with async for."""
+
+    def __init__(self, peer, target_name: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 buffer_size: int, **kwargs):
+        data_type = str(kwargs.get("data_type", "json"))
+        if data_type not in valid_data_types:
+            raise ValueError(f"data_type must be one of {valid_data_types}")
+
+        stream = bool(kwargs.get("stream", False))
+        data_size = int(kwargs["data_size"]) if "data_size" in kwargs else "auto"
+        if stream and data_size != "auto" and data_size <= 0:
+            raise ValueError(f"Data size should be > 0 or 'auto' (Received {data_size})!")
+
+        # fall back to text framing if the other peer proposed an unknown framing
+        framing = str(kwargs.get("framing", frames.text_framing))
+        if framing not in valid_framings:
+            framing = frames.text_framing
+
+        handlers = {**defaults.connection_handlers, **dict(kwargs.get("handlers", {}))}
+        super().__init__(["data", "close"], handlers)
+
+        self.peer = peer
+        self.target_name = str(target_name)
+        self.reader = reader
+        self.writer = writer
+        self.buffer_size = int(buffer_size)
+        self._data_type = data_type
+        self.strict = bool(kwargs.get("strict", True))
+        self.stream = stream
+        self.data_size = data_size
+        self.framing = framing
+        self.active = True
+
+        # data received while no data handler is set, consumed by async iteration
+        self.received = asyncio.Queue(maxsize=int(kwargs.get("max_received", 2 ** 10)))
+        self.task = None
+
+    @property
+    def data_type(self) -> str:
+        """Returns the data type each peers have agreed on for this connection.
+
+        Returns:
+            str: the string representation of the data type
+        """
+        return self._data_type
+
+    @property
+    def closed(self) -> bool:
+        """Returns whether this connection is closed.
+
+        Returns:
+            bool: a boolean indicating whether the connection is closed.
+        """
+        return not self.active
+
+    @property
+    def binary_framing(self) -> bool:
+        """Returns whether this connection exchanges compact binary frame headers instead of text headers.
+
+        Returns:
+            bool: a boolean indicating whether binary framing was negotiated.
+        """
+        return self.framing == frames.binary_framing
+
+    def start_task(self):
+        """Attempts to start this connection's listening task, if not already running."""
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._listen())
+
+    async def send(self, data: Any) -> bool:
+        """Send data to the target peer, serializing it to this connection's default data format.
+
+        Args:
+            data (Any): the data to serialize and send.
+
+        Raises:
+            DataTypeError: if this connection's default format is bytes and the data is not bytes
+            DataSizeError: if this connection is a stream and data is not of the stream's size
+
+        Returns:
+            bool: whether data was successfully sent.
+        """
+        if self.closed:
+            return False
+
+        data = Data(self.data_type, decoded_data=data).encode()
+
+        data_size = buffers_size(data)
+        if not self.stream or self.data_size == "auto":
+            self.writer.write(self._build_data_header(data_size, self.data_type))
+
+            if self.data_size == "auto":
+                self.data_size = data_size
+        elif self.data_size != data_size:
+            raise DataSizeError(f"Data size ({data_size}) is different from the stream size ({self.data_size})")
+
+        for segment in data:
+            self.writer.write(segment)
+
+        try:
+            # wait for the transport's buffer to be flushed below its high-water mark
+            await self.writer.drain()
+        except (ConnectionAbortedError, ConnectionResetError, BrokenPipeError):
+            await self.close()
+            return False
+
+        return True
+
+    async def receive(self) -> Any:
+        """Waits for the next data received over this connection, when no data handler is set.
+
+        Raises:
+            ConnectionAbortedError: if the connection was closed before any data was received.
+
+        Returns:
+            Any: the data received and deserialized.
+        """
+        if self.closed and self.received.empty():
+            raise ConnectionAbortedError("Connection was closed.")
+
+        data = await self.received.get()
+        if data is None:
+            # sentinel pushed when the connection closes
+            self.received.put_nowait(None)
+            raise ConnectionAbortedError("Connection was closed.")
+
+        return data.decode()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self.receive()
+        except ConnectionAbortedError:
+            raise StopAsyncIteration
+
+    def _build_data_header(self, data_size: int, data_type: str) -> bytes:
+        """Builds the header announcing data, according to this connection's framing.
+
+        Args:
+            data_size (int): the size of the data, in bytes.
+            data_type (str): the data type to be sent.
+
+        Returns:
+            bytes: the generated encoded header
+        """
+        if self.binary_framing:
+            return build_frame_header(frames.data_frame, data_size, data_type)
+
+        return build_data_header(data_size, data_type)
+
+    def _build_ping_header(self) -> bytes:
+        """Builds the header used to check whether the connection is still alive, according to this connection's framing.
+
+        Returns:
+            bytes: the generated encoded header
+        """
+        if self.binary_framing:
+            return build_frame_header(frames.ping_frame)
+
+        return build_header(headers.ping_header, {})
+
+    async def _receive_header(self):
+        """Internal method to receive the next header, and then the data it announces.
+
+        Raises:
+            asyncio.TimeoutError: if no header was received within the peer's timeout.
+            FrameError: if the frame header received is corrupted.
+            FrameSizeError: if the header announces more data than the peer accepts.
+            UnicodeDecodeError: if the text header received is corrupted.
+
+        Returns:
+            Data: the data object received, if any
+        """
+        header_size = frame_struct.size if self.binary_framing else headers.size
+        # readexactly leaves partial reads in the stream's buffer when timing out
+        header = await asyncio.wait_for(self.reader.readexactly(header_size), self.peer.timeout)
+
+        if self.binary_framing:
+            frame_type, _, data_type, channel, data_size = split_frame_header(header, self.peer.max_data_size)
+
+            if frame_type != frames.data_frame or channel != 0:
+                # logical channels are not supported by asyncio connections
+                if data_size > 0:
+                    await self.reader.readexactly(data_size)
+                return None
+        else:
+            header = header.decode("utf-8")
+            if not header.startswith(headers.data_header):
+                return None
+
+            header = split_header(header)
+
+            # don't process header if it does not contains the minimum needed key/values pairs
+            if any([key not in header for key in headers.required_data_fields]):
+                return None
+
+            data_type, data_size = header["data_type"], header["data_size"]
+            if not 0 <= data_size <= self.peer.max_data_size:
+                raise FrameSizeError(f"Data size should be between 0 and {self.peer.max_data_size} "
+                                     f"(Received {data_size})!")
+
+        if self.data_size == "auto":
+            self.data_size = data_size
+
+        data = Data(data_type, buffer=await self.reader.readexactly(data_size))
+
+        # the data is still received so that the next header is read at the right position
+        if self.strict and data_type != self.data_type:
+            return None
+
+        return data
+
+    async def close(self):
+        """Closes the connection nicely, waiting for its listening task to terminate."""
+        self.active = False
+        self.writer.close()
+
+        if self.task is not None and self.task is not asyncio.current_task():
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def _listen(self):
+        while self.active:
+            try:
+                # will wait until any streaming data/header is received or timeout
+                if self.stream and self.data_size != "auto":
+                    data = Data(self.data_type, buffer=await self.reader.readexactly(self.data_size))
+                else:
+                    data = await self._receive_header()
+            except FrameSizeError:
+                # the data announced can't be skipped without being received, which it is too large for
+                self.active = False
+                continue
+            except (asyncio.TimeoutError, UnicodeDecodeError, FrameError):
+                # asyncio.TimeoutError: no header received within timeout seconds
+                # UnicodeDecodeError, FrameError: data received is corrupted, don't process it
+
+                # fixed-size streams carry no header, so no ping can be framed over them
+                if self.stream and self.data_size != "auto":
+                    continue
+
+                # ping the connection to check if it is still alive
+                self.writer.write(self._build_ping_header())
+                try:
+                    await self.writer.drain()
+                except (ConnectionAbortedError, ConnectionResetError, BrokenPipeError):
+                    self.active = False
+                continue
+            except (asyncio.IncompleteReadError, ConnectionAbortedError, ConnectionResetError, asyncio.CancelledError):
+                # IncompleteReadError: the remote peer closed the connection
+                self.active = False
+                continue
+
+            if data is None:
+                continue
+
+            if "data" in self.handlers:
+                await self.handle("data", data.decode())
+            else:
+                await self.received.put(data)
+
+        self.writer.close()
+        if not self.received.full():
+            # wake up any consumer waiting for data
+            self.received.put_nowait(None)
+
+        await self.handle("close")
+
+        # the peer may already have replaced this connection with a new one
+        if self.peer.connections.get(self.target_name) is self:
+            del self.peer.connections[self.target_name]
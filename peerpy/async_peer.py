@@ -0,0 +1,241 @@
+import socket
+import asyncio
+
+from typing import Tuple, Any, List
+
+from .async_connection import AsyncConnection
+from .event_handler import AsyncEventHandler
+from .protocol import headers, frames, defaults
+from .exceptions import DataTypeError, DataSizeError
+from .utils import get_local_ip, check_address, build_hello_header, build_header, split_header
+
+
+class AsyncPeer(AsyncEventHandler):
+    """asyncio counterpart of Peer: every connection is served by the running event loop instead of a thread.
+    Peer discovery is not provided by this class."""
+
+    def __init__(self, address: str = None, port: int = 0, **kwargs):
+        handlers = {**defaults.peer_handlers, **dict(kwargs.get("handlers", {}))}
+        super().__init__(["listen", "offer", "connection", "stop"], handlers)
+
+        if address is None:
+            address = get_local_ip()
+        elif ":" in address:
+            address, port = address.split(":")[:2]
+
+        # bind the server socket right away so that this peer's address is known before it starts
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.bind((address, int(port)))
+
+        self._address = self.server_socket.getsockname()
+        self.timeout = float(kwargs.get("timeout", defaults.timeout))
+        self.connections = {}
+        self.server = None
+        self.max_connections = int(kwargs.get("max_connections", 0))
+        self.buffer_size = int(kwargs.get("buffer_size", defaults.buffer_size))
+        # connections whose remote peer announces larger data are closed
+        self.max_data_size = int(kwargs.get("max_data_size", defaults.max_data_size))
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """This peer' address, in a normalized format
+
+        Returns:
+            Tuple[str, int]: the normalized address (ipv4, port)
+        """
+        return self._address
+
+    @property
+    def address_name(self) -> str:
+        """This peer's normalized address name
+
+        Returns:
+            str: the normalized address name ipv4:port
+        """
+        return f"{self.address[0]}:{self.address[1]}"
+
+    async def connect(self, address: str, port: int = None, data_type: str = "json", strict: bool = True,
+                      **kwargs) -> AsyncConnection:
+        """Attempts to start a connection with a remote peer located at (address, port), using the same handshake as Peer.
+
+        Args:
+            address (str): the ipv4 address of the remote peer, provided with the port if wanted (ipv4:port)
+            port (int, optional): the port to use for the connection, if not provided in address. Defaults to None.
+            data_type (str, optional): the data type to use for the connection. Defaults to "json".
+            strict (bool, optional): whether this connection is strict on data types. Defaults to True.
+            buffer_size (int, optional): the buffer size to use to receive data. Defaults to this peer's buffer size.
+            framing (str, optional): the framing to propose to the remote peer. Defaults to "binary".
+
+        Returns:
+            AsyncConnection: the connection, if established
+        """
+        address, address_name = check_address(address, port)
+
+        if address_name == self.address_name:
+            return False
+
+        if address_name in self.connections:
+            connection = self.connections[address_name]
+            if connection.data_type != data_type:
+                await connection.close()
+            else:
+                return connection
+
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(*address), self.timeout)
+        except (asyncio.TimeoutError, ConnectionRefusedError):
+            return False
+
+        buffer_size = int(kwargs.get("buffer_size", self.buffer_size))
+        framing = kwargs.pop("framing", defaults.framing)
+        # will raise ValueError if stream and data_size are incompatible
+        connection = AsyncConnection(
+            self, address_name, reader, writer, buffer_size,
+            data_type=data_type,
+            strict=strict,
+            **kwargs
+        )
+
+        writer.write(build_hello_header(
+            self.address_name,
+            data_type,
+            strict,
+            stream=connection.stream,
+            framing=framing
+        ))
+
+        try:
+            await writer.drain()
+            header = (await asyncio.wait_for(reader.readexactly(headers.size), self.timeout)).decode("utf-8")
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, UnicodeDecodeError):
+            # UnicodeDecodeError: data received is corrupted, don't process it
+            writer.close()
+            return False
+
+        # only check if header is ACCEPT, otherwise cancel connection
+        if not header.startswith(headers.accept_header):
+            writer.close()
+            return False
+
+        # the remote peer only answers with the framing it agrees on
+        connection.framing = split_header(header).get("framing", frames.text_framing)
+
+        self.connections[address_name] = connection
+        # handlers are set before any data is received
+        await self.handle("connection", connection)
+
+        connection.start_task()
+        return connection
+
+    async def broadcast(self, data: Any) -> List[bool]:
+        """Broadcasts data to all the connected peers concurrently.
+
+        Args:
+            data (Any): the data to broadcast
+
+        Returns:
+            List[bool]: whether data was successfully sent, for each connection
+        """
+        async def send(connection: AsyncConnection) -> bool:
+            try:
+                return await connection.send(data)
+            except (DataTypeError, DataSizeError):
+                return False
+
+        return await asyncio.gather(*[send(connection) for connection in list(self.connections.values())])
+
+    async def start(self):
+        """Attempts to start this peer's server, listening for connections on the running event loop."""
+        if self.server is None:
+            self.server_socket.listen()
+            self.server = await asyncio.start_server(self._handle_offer, sock=self.server_socket)
+
+            await self.handle("listen")
+
+    async def stop(self):
+        """Attempts to stop this peer and all its connections."""
+        if self.server is None:
+            return
+
+        self.server.close()
+        await asyncio.gather(*[connection.close() for connection in list(self.connections.values())])
+        await self.server.wait_closed()
+        self.server = None
+
+        await self.handle("stop")
+
+    async def _handle_offer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handles an offer received from a peer.
+
+        Args:
+            reader (asyncio.StreamReader): the stream reader of the connection.
+            writer (asyncio.StreamWriter): the stream writer of the connection.
+        """
+        if len(self.connections) >= self.max_connections > 0:
+            writer.close()
+            return
+
+        try:
+            # will wait until a hello header is received
+            header = (await asyncio.wait_for(reader.readexactly(headers.size), self.timeout)).decode("utf-8")
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, UnicodeDecodeError):
+            # no offer received within timeout seconds, or data received is corrupted
+            writer.close()
+            return
+
+        if not header.startswith(headers.hello_header):
+            writer.close()
+            return
+
+        header = split_header(header)
+
+        # don't process header if it does not contains the minimum needed key/values pairs
+        if any([key not in header for key in headers.required_hello_fields]):
+            writer.close()
+            return
+
+        peer_name = header["peer_name"]
+        # local settings are never chosen by the remote peer
+        negotiated = {key: header[key] for key in headers.negotiated_hello_fields if key in header}
+
+        try:
+            connection = AsyncConnection(
+                self, peer_name, reader, writer, self.buffer_size,
+                **negotiated
+            )
+        except ValueError:
+            # the data type proposed is not supported by this peer
+            connection = None
+
+        try:
+            if connection is not None and await self.handle("offer", connection):
+                accept_contents = {}
+                if connection.binary_framing:
+                    # so that the other peer knows we agree on binary framing
+                    accept_contents["framing"] = connection.framing
+
+                writer.write(build_header(headers.accept_header, accept_contents))
+                await writer.drain()
+
+                self.connections[peer_name] = connection
+                # handlers are set before any data is received
+                await self.handle("connection", connection)
+
+                connection.start_task()
+                return
+
+            writer.write(build_header(headers.deny_header, {}))
+            await writer.drain()
+        except ConnectionError:
+            # connection is lost
+            pass
+
+        writer.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        await self.stop()
+        return False  # always reraise exception
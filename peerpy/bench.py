@@ -0,0 +1,323 @@
+"""
+Throughput and latency benchmarks over loopback, emitting machine-readable JSON so that releases can be compared.
+
+Usage: python -m peerpy.bench [--data-types raw json bytes] [--sizes 16 1024 ...] [--stream both]
+                              [--buffer-sizes 8192] [--connections 1 4] [--startup-runs 10] [--startup-only]
+                              [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import platform
+import itertools
+import threading
+import subprocess
+
+from typing import Any, Dict, List
+
+from .peer import Peer
+from .data import Data
+from .utils import buffers_size
+
+default_sizes = [16, 2 ** 10, 2 ** 16, 2 ** 20, 2 ** 26]
+
+
+def make_payload(data_type: str, size: int) -> Any:
+    """Returns a payload of the given data type, whose encoded size is close to size.
+
+    Args:
+        data_type (str): the data type of the payload.
+        size (int): the approximate size of the payload, in bytes.
+
+    Returns:
+        Any: the payload
+    """
+    if data_type == "json":
+        return "x" * size
+
+    return b"x" * size
+
+
+def percentile(values: List[float], rank: float) -> float:
+    """Returns the given percentile of values, using the nearest rank.
+
+    Args:
+        values (List[float]): the sorted values.
+        rank (float): the percentile, in [0, 100].
+
+    Returns:
+        float: the percentile, or None if there are no values
+    """
+    if len(values) == 0:
+        return None
+
+    index = max(0, min(len(values) - 1, int(round(rank / 100 * len(values))) - 1))
+    return values[index]
+
+
+def create_peer(**kwargs) -> Peer:
+    listening = threading.Event()
+    handlers = {"listen": lambda peer: listening.set(), "stop": lambda peer: None, **kwargs.pop("handlers", {})}
+    peer = Peer("127.0.0.1", invisible=True, handlers=handlers, **kwargs)
+    peer.start()
+    # connections would be refused until the server thread listens
+    listening.wait()
+
+    return peer
+
+
+def bench_throughput(data_type: str, size: int, messages: int, stream: bool = False, buffer_size: int = 2 ** 13,
+                     connections: int = 1, timeout: float = 60., batch_window: float = 0.) -> Dict[str, Any]:
+    """Measures how many messages per second are received when several connections send messages concurrently.
+
+    Args:
+        data_type (str): the data type of the connections.
+        size (int): the approximate size of every message, in bytes.
+        messages (int): the number of messages to send, in total.
+        stream (bool, optional): whether the connections are streams. Defaults to False.
+        buffer_size (int, optional): the buffer size of the peers. Defaults to 2 ** 13.
+        connections (int, optional): the number of connections (and sending peers). Defaults to 1.
+        timeout (float, optional): how long to wait for every message, in seconds. Defaults to 60.
+        batch_window (float, optional): the batch window of the sending connections, in seconds. Defaults to 0.
+
+    Returns:
+        Dict[str, Any]: the messages received, elapsed seconds, messages per second and megabytes per second
+    """
+    payload = make_payload(data_type, size)
+    encoded_size = buffers_size(Data(data_type, decoded_data=payload).encode())
+    messages = max(messages, connections)
+
+    received = [0]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def count(connection, data):
+        with lock:
+            received[0] += 1
+            if received[0] >= messages:
+                done.set()
+
+    def set_data_handler(peer, connection):
+        connection.handlers["data"] = count
+        return True
+
+    server = create_peer(buffer_size=buffer_size, handlers={"connection": set_data_handler})
+    clients = [create_peer(buffer_size=buffer_size) for _ in range(connections)]
+
+    try:
+        links = [client.connect(server.address_name, data_type=data_type, stream=stream, batch_window=batch_window)
+                 for client in clients]
+
+        def send(connection, count):
+            for _ in range(count):
+                connection.send(payload)
+
+        threads = [threading.Thread(target=send, args=(link, messages // connections + (i < messages % connections)))
+                   for i, link in enumerate(links)]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        completed = done.wait(timeout)
+        elapsed = time.perf_counter() - start
+
+        for thread in threads:
+            thread.join()
+        for link in links:
+            link.flush(timeout)
+    finally:
+        for peer in clients + [server]:
+            peer.stop()
+
+    return {
+        "completed": completed,
+        "messages": received[0],
+        "encoded_size": encoded_size,
+        "seconds": elapsed,
+        "messages_per_sec": received[0] / elapsed,
+        "mb_per_sec": received[0] * encoded_size / elapsed / 2 ** 20
+    }
+
+
+def bench_latency(data_type: str, size: int, messages: int, buffer_size: int = 2 ** 13,
+                  timeout: float = 10.) -> Dict[str, Any]:
+    """Measures the round trip time of messages echoed by the remote peer, one message at a time.
+
+    Args:
+        data_type (str): the data type of the connection.
+        size (int): the approximate size of every message, in bytes.
+        messages (int): the number of round trips.
+        buffer_size (int, optional): the buffer size of the peers. Defaults to 2 ** 13.
+        timeout (float, optional): how long to wait for every echo, in seconds. Defaults to 10.
+
+    Returns:
+        Dict[str, Any]: the round trips completed and their p50, p99 and maximum, in microseconds
+    """
+    payload = make_payload(data_type, size)
+    echoes = queue.Queue()
+
+    def set_echo_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: connection.send(data)
+        return True
+
+    server = create_peer(buffer_size=buffer_size, handlers={"connection": set_echo_handler})
+    client = create_peer(buffer_size=buffer_size)
+
+    round_trips = []
+    try:
+        connection = client.connect(server.address_name, data_type=data_type)
+        connection.handlers["data"] = lambda connection, data: echoes.put(None)
+
+        for _ in range(messages):
+            start = time.perf_counter()
+            connection.send(payload)
+            try:
+                echoes.get(timeout=timeout)
+            except queue.Empty:
+                break
+            round_trips.append((time.perf_counter() - start) * 1e6)
+    finally:
+        client.stop()
+        server.stop()
+
+    round_trips.sort()
+    return {
+        "round_trips": len(round_trips),
+        "p50_us": percentile(round_trips, 50),
+        "p99_us": percentile(round_trips, 99),
+        "max_us": round_trips[-1] if len(round_trips) > 0 else None
+    }
+
+
+# run in a fresh interpreter, so that nothing is imported or cached yet
+startup_script = """
+import time, json
+start = time.perf_counter()
+import peerpy
+imported = time.perf_counter()
+peer = peerpy.Peer(invisible=True)
+created = time.perf_counter()
+peer.server.close()
+print(json.dumps({"import": imported - start, "peer": created - imported}))
+"""
+
+
+def bench_startup(runs: int = 10) -> Dict[str, Any]:
+    """Measures how long importing peerpy and creating a first Peer take in a fresh interpreter,
+    as paid by short-lived processes.
+
+    Args:
+        runs (int, optional): the number of interpreters to start. Defaults to 10.
+
+    Returns:
+        Dict[str, Any]: the median and maximum import and Peer creation times, in milliseconds
+    """
+    # so that the interpreters import this very package
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    imports, peers = [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", startup_script], capture_output=True, check=True, text=True,
+                                cwd=cwd)
+        timings = json.loads(output.stdout.strip().splitlines()[-1])
+        imports.append(timings["import"] * 1e3)
+        peers.append(timings["peer"] * 1e3)
+
+    imports.sort()
+    peers.sort()
+    return {
+        "runs": runs,
+        "import_p50_ms": percentile(imports, 50),
+        "import_max_ms": imports[-1] if runs > 0 else None,
+        "peer_p50_ms": percentile(peers, 50),
+        "peer_max_ms": peers[-1] if runs > 0 else None
+    }
+
+
+def run(data_types: List[str], sizes: List[int], streams: List[bool], buffer_sizes: List[int],
+        connection_counts: List[int], budget: int = 2 ** 27, max_messages: int = 10000,
+        latency_messages: int = 1000, batch_windows: List[float] = None) -> Dict[str, Any]:
+    """Runs the throughput and latency benchmarks for every combination of parameters.
+    Latency is not measured over streams, which only send data one way.
+
+    Args:
+        data_types (List[str]): the data types to benchmark.
+        sizes (List[int]): the payload sizes to benchmark, in bytes.
+        streams (List[bool]): whether to benchmark streams, regular connections or both.
+        buffer_sizes (List[int]): the buffer sizes to benchmark.
+        connection_counts (List[int]): the numbers of concurrent connections to benchmark throughput with.
+        budget (int, optional): the number of bytes sent per benchmark, bounding the messages sent. Defaults to 2 ** 27.
+        max_messages (int, optional): the maximum number of messages sent per throughput benchmark. Defaults to 10000.
+        latency_messages (int, optional): the maximum number of round trips per latency benchmark. Defaults to 1000.
+        batch_windows (List[float], optional): the batch windows to benchmark throughput with. Defaults to [0.].
+
+    Returns:
+        Dict[str, Any]: the environment the benchmarks were run in, and one result per combination
+    """
+    batch_windows = batch_windows if batch_windows is not None else [0.]
+    results = []
+    for data_type, size, stream, buffer_size in itertools.product(data_types, sizes, streams, buffer_sizes):
+        messages = max(1, min(max_messages, budget // size))
+        case = {"data_type": data_type, "size": size, "stream": stream, "buffer_size": buffer_size}
+
+        for connections, batch_window in itertools.product(connection_counts, batch_windows):
+            results.append({
+                "benchmark": "throughput", **case, "connections": connections, "batch_window": batch_window,
+                **bench_throughput(data_type, size, messages, stream, buffer_size, connections,
+                                   batch_window=batch_window)
+            })
+
+        # streams only send headerless data one way: the remote peer can't echo it
+        if not stream:
+            results.append({
+                "benchmark": "latency", **case,
+                **bench_latency(data_type, size, min(messages, latency_messages), buffer_size=buffer_size)
+            })
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "results": results
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m peerpy.bench", description="peerpy loopback benchmarks")
+    parser.add_argument("--data-types", nargs="+", default=["raw", "json", "bytes"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=default_sizes)
+    parser.add_argument("--stream", choices=["off", "on", "both"], default="both")
+    parser.add_argument("--buffer-sizes", nargs="+", type=int, default=[2 ** 13, 2 ** 16])
+    parser.add_argument("--connections", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--batch-windows", nargs="+", type=float, default=[0.], help="seconds, 0 for no batching")
+    parser.add_argument("--budget", type=int, default=2 ** 27, help="bytes sent per benchmark")
+    parser.add_argument("--max-messages", type=int, default=10000)
+    parser.add_argument("--latency-messages", type=int, default=1000)
+    parser.add_argument("--startup-runs", type=int, default=10, help="interpreters started to measure startup")
+    parser.add_argument("--startup-only", action="store_true", help="only measure startup")
+    parser.add_argument("--output", default=None, help="file to write the JSON results to (default: stdout)")
+    args = parser.parse_args(argv)
+
+    streams = {"off": [False], "on": [True], "both": [False, True]}[args.stream]
+    if args.startup_only:
+        report = run([], [], streams, [], [])
+    else:
+        report = run(args.data_types, args.sizes, streams, args.buffer_sizes, args.connections,
+                     args.budget, args.max_messages, args.latency_messages, args.batch_windows)
+
+    if args.startup_runs > 0:
+        report["startup"] = bench_startup(args.startup_runs)
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
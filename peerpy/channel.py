@@ -0,0 +1,84 @@
+from typing import Any
+
+from .data import Data
+from .event_handler import EventHandler
+from .utils import valid_data_types
+from .protocol import defaults
+
+
+class Channel(EventHandler):
+    """Logical stream multiplexed over a connection, with its own data type, strictness, stream setting and handlers.
+    Channels are only available on connections using binary framing. The data of a streaming channel has a fixed size,
+    but is still framed, as frames carry the channel's id."""
+
+    def __init__(self, connection, channel_id: int, **kwargs):
+        data_type = str(kwargs.get("data_type", "json"))
+        if data_type not in valid_data_types:
+            raise ValueError(f"data_type must be one of {valid_data_types}")
+
+        stream = bool(kwargs.get("stream", False))
+        data_size = int(kwargs["data_size"]) if "data_size" in kwargs else "auto"
+        if stream and data_size != "auto" and data_size <= 0:
+            raise ValueError(f"Data size should be > 0 or 'auto' (Received {data_size})!")
+
+        handlers = {**defaults.connection_handlers, **dict(kwargs.get("handlers", {}))}
+        super().__init__(["data", "close"], handlers)
+
+        self.connection = connection
+        self.channel_id = int(channel_id)
+        self._data_type = data_type
+        self.strict = bool(kwargs.get("strict", True))
+        self.stream = stream
+        # the size of every data of a streaming channel, set by its first data unless given
+        self.data_size = data_size
+        self.active = True
+
+    @property
+    def data_type(self) -> str:
+        """Returns the data type each peers have agreed on for this channel.
+
+        Returns:
+            str: the string representation of the data type
+        """
+        return self._data_type
+
+    @property
+    def closed(self) -> bool:
+        """Returns whether this channel or its connection is closed.
+
+        Returns:
+            bool: a boolean indicating whether the channel is closed.
+        """
+        return not self.active or self.connection.closed
+
+    @property
+    def target_name(self) -> str:
+        """Returns the name of the remote peer.
+
+        Returns:
+            str: the normalized address name of the remote peer
+        """
+        return self.connection.target_name
+
+    def send(self, data: Any) -> bool:
+        """Send data over this channel, serializing it to this channel's data format.
+
+        Args:
+            data (Any): the data to serialize and send.
+
+        Raises:
+            DataTypeError: if this channel's format is bytes and the data is not bytes
+            DataSizeError: if this channel is a stream and data is not of the stream's size
+
+        Returns:
+            bool: whether data was successfully sent (or queued).
+        """
+        if self.closed:
+            return False
+
+        return self.connection._submit_channel_data(self, Data(self.data_type, decoded_data=data).encode())
+
+    def close(self):
+        """Closes this channel, notifying the remote peer. Its connection stays open."""
+        if self.active:
+            self.connection._close_channel(self)
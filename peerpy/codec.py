@@ -0,0 +1,286 @@
+import json
+import struct
+import pickle
+
+from typing import Any, List, Type
+
+from .exceptions import DataTypeError
+from .protocol import defaults
+
+valid_data_types = []
+codecs = {}
+codes = {}
+
+_instances = {}
+
+
+class Codec():
+    """Base class of data types, encoding python objects to bytes-like segments sent one after the other
+    and decoding the buffer they are received in. Subclasses must define a unique name and code,
+    the code being sent in binary frame headers."""
+
+    name: str = None
+    code: int = None
+
+    def __init__(self, **options):
+        pass
+
+    def allocate(self, size: int) -> memoryview:
+        """Returns a writable buffer of size bytes to receive encoded data into, or None to receive it into a new buffer.
+
+        Args:
+            size (int): the size of the encoded data, in bytes.
+
+        Returns:
+            memoryview: the buffer to fill, or None
+        """
+        return None
+
+    def encode(self, data: Any) -> List[bytes]:
+        """Encodes data to a list of bytes-like segments, concatenated on the wire.
+
+        Args:
+            data (Any): the data to encode.
+
+        Raises:
+            DataTypeError: if data can't be encoded by this codec.
+
+        Returns:
+            List[bytes]: the encoded segments
+        """
+        raise NotImplementedError
+
+    def decode(self, buffer: memoryview) -> Any:
+        """Decodes the buffer data was received in.
+
+        Args:
+            buffer (memoryview): the buffer of every segment received, concatenated.
+
+        Returns:
+            Any: the decoded data
+        """
+        raise NotImplementedError
+
+
+class RawCodec(Codec):
+    """Any python object, pickled with the default protocol."""
+
+    name = "raw"
+    code = 0
+
+    def encode(self, data: Any) -> List[bytes]:
+        return [pickle.dumps(data)]
+
+    def decode(self, buffer: memoryview) -> Any:
+        return pickle.loads(buffer)
+
+
+class JsonCodec(Codec):
+    """Any json-serializable object."""
+
+    name = "json"
+    code = 1
+
+    def encode(self, data: Any) -> List[bytes]:
+        return [json.dumps({
+            "data": data
+        }).encode("utf-8")]
+
+    def decode(self, buffer: memoryview) -> Any:
+        return json.loads(str(buffer, "utf-8"))["data"]
+
+
+class BytesCodec(Codec):
+    """Explicit bytes."""
+
+    name = "bytes"
+    code = 2
+
+    def encode(self, data: Any) -> List[bytes]:
+        if not isinstance(data, bytes):
+            raise DataTypeError("data is not a bytes object")
+
+        return [data]
+
+    def decode(self, buffer: memoryview) -> Any:
+        return bytes(buffer)
+
+
+class Pickle5Codec(Codec):
+    """Any python object, pickled with protocol 5: contiguous buffers exposing the buffer protocol
+    (e.g. bytearrays, numpy arrays) are sent out-of-band, right after the pickle stream, without being copied into it.
+    They are decoded as views over the received buffer, without being copied either."""
+
+    name = "pickle5"
+    code = 3
+
+    # number of out-of-band buffers, followed by the size of the pickle stream and of every out-of-band buffer
+    count_struct = struct.Struct("!I")
+    size_struct = struct.Struct("!Q")
+
+    def encode(self, data: Any) -> List[bytes]:
+        buffers = []
+
+        def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+            try:
+                buffers.append(buffer.raw())
+            except BufferError:
+                return True  # non-contiguous buffers are serialized in-band
+
+            return False
+
+        stream = pickle.dumps(data, protocol=5, buffer_callback=buffer_callback)
+        sizes = [len(stream)] + [buffer.nbytes for buffer in buffers]
+        meta = self.count_struct.pack(len(buffers)) + b"".join([self.size_struct.pack(size) for size in sizes])
+
+        return [meta, stream] + buffers
+
+    def decode(self, buffer: memoryview) -> Any:
+        buffer = memoryview(buffer)
+        count, = self.count_struct.unpack_from(buffer)
+        offset = self.count_struct.size
+
+        sizes = []
+        for _ in range(count + 1):
+            sizes.append(self.size_struct.unpack_from(buffer, offset)[0])
+            offset += self.size_struct.size
+
+        views = []
+        for size in sizes:
+            views.append(buffer[offset:offset + size])
+            offset += size
+
+        return pickle.loads(views[0], buffers=views[1:])
+
+
+class NdarrayCodec(Codec):
+    """numpy arrays of any shape and of a non-object, non-structured dtype. The dtype and shape are sent
+    in front of the array's raw contiguous buffer, which is received straight into one of ring_size buffers
+    reused in turn: a received array is only valid until ring_size more arrays are received over the same connection,
+    and must be copied to be kept longer. Connections handling data on an executor receive each array into its own
+    buffer instead. numpy is only imported when this data type is used."""
+
+    name = "ndarray"
+    code = 4
+
+    # dtype string (e.g. "<f8") and number of dimensions, followed by every dimension
+    meta_struct = struct.Struct("!16sB")
+    dim_struct = struct.Struct("!Q")
+    # so that the array's data is aligned within the receive buffer
+    alignment = 16
+
+    def __init__(self, ring_size: int = defaults.ring_size, **options):
+        try:
+            import numpy
+        except ImportError:
+            raise ValueError("numpy is required by the ndarray data type!")
+
+        self.numpy = numpy
+        self.ring = [bytearray() for _ in range(max(int(ring_size), 0))]
+        self._next_slot = 0
+
+    def allocate(self, size: int) -> memoryview:
+        if len(self.ring) == 0:
+            return None
+
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % len(self.ring)
+
+        # a slot only grows: arrays received into a replaced buffer remain valid
+        if len(self.ring[slot]) < size:
+            self.ring[slot] = bytearray(size)
+
+        return memoryview(self.ring[slot])[:size]
+
+    def encode(self, data: Any) -> List[bytes]:
+        if not isinstance(data, self.numpy.ndarray):
+            raise DataTypeError("data is not a numpy array")
+        if data.dtype.hasobject or data.dtype.fields is not None:
+            raise DataTypeError(f"arrays of dtype {data.dtype} can't be sent as raw buffers")
+
+        if not data.flags.c_contiguous:
+            data = data.copy(order="C")
+        meta = self.meta_struct.pack(data.dtype.str.encode("ascii"), data.ndim) + \
+            b"".join([self.dim_struct.pack(dim) for dim in data.shape])
+        meta += bytes(-len(meta) % self.alignment)
+
+        return [meta, data.reshape(-1).view(self.numpy.uint8)]
+
+    def decode(self, buffer: memoryview) -> Any:
+        dtype, ndim = self.meta_struct.unpack_from(buffer)
+        shape = tuple([self.dim_struct.unpack_from(buffer, self.meta_struct.size + i * self.dim_struct.size)[0]
+                       for i in range(ndim)])
+
+        offset = self.meta_struct.size + ndim * self.dim_struct.size
+        offset += -offset % self.alignment
+
+        array = self.numpy.frombuffer(buffer, dtype=dtype.rstrip(b"\0").decode("ascii"), offset=offset)
+        return array.reshape(shape)
+
+
+def register_codec(codec: Type[Codec]):
+    """Registers a codec, so that its name can be used as a connection's data type.
+    Both peers of a connection must have registered the codec for the connection to be accepted.
+
+    Args:
+        codec (Type[Codec]): the codec class to register.
+
+    Raises:
+        ValueError: if the codec's name or code is already registered.
+    """
+    if codec.name is None or codec.code is None:
+        raise ValueError("A codec must have a name and a code!")
+    if codec.name in codecs:
+        raise ValueError(f"A codec named {codec.name} is already registered!")
+    if codec.code in codes or not 0 <= codec.code < 2 ** 8:
+        raise ValueError(f"Codec code {codec.code} is already registered or is not in [0, 255]!")
+
+    codecs[codec.name] = codec
+    codes[codec.code] = codec.name
+    valid_data_types.append(codec.name)
+
+
+def get_codec(data_type: str) -> Codec:
+    """Returns the shared instance of the codec registered for data_type.
+
+    Args:
+        data_type (str): the data type.
+
+    Raises:
+        DataTypeError: if no codec is registered for data_type.
+
+    Returns:
+        Codec: the codec instance
+    """
+    codec = _instances.get(data_type, None)
+    if codec is None:
+        if data_type not in codecs:
+            raise DataTypeError(f"data_type must be one of {valid_data_types}")
+
+        codec = _instances[data_type] = codecs[data_type]()
+
+    return codec
+
+
+def create_codec(data_type: str, **options) -> Codec:
+    """Returns a new instance of the codec registered for data_type, for codecs holding per-connection state.
+
+    Args:
+        data_type (str): the data type.
+        ring_size (int, optional): the number of receive buffers reused in turn, for codecs receiving in place.
+
+    Raises:
+        DataTypeError: if no codec is registered for data_type.
+        ValueError: if the codec can't be used (e.g. its optional dependency is missing).
+
+    Returns:
+        Codec: the codec instance
+    """
+    if data_type not in codecs:
+        raise DataTypeError(f"data_type must be one of {valid_data_types}")
+
+    return codecs[data_type](**options)
+
+
+for _codec in [RawCodec, JsonCodec, BytesCodec, Pickle5Codec, NdarrayCodec]:
+    register_codec(_codec)
@@ -0,0 +1,207 @@
+import time
+import zlib
+import importlib
+import threading
+
+from importlib.util import find_spec
+from typing import Any, Dict, List
+
+from .protocol import defaults
+from .exceptions import FrameError
+
+# bz2 and lzma are only imported when a connection uses them, and python may be built without lzma support
+valid_compressions = ["zlib", "bz2"] + (["lzma"] if find_spec("_lzma") is not None else [])
+
+# bz2 raises OSError on invalid data, lzma raises LZMAError (an Exception) on invalid data and EOFError after the end
+# of its stream
+decompression_errors = (zlib.error, OSError, EOFError, ValueError)
+
+# preset dictionaries, by id, that a connection can agree on
+zdicts = {}
+
+
+def register_zdict(zdict: bytes) -> str:
+    """Registers a preset dictionary, so that connections proposing it can be accepted with it.
+    A preset dictionary (only used with zlib) holds byte sequences common to the data sent, e.g. json keys,
+    so that small messages compress well. Both peers must register the same dictionary.
+
+    Args:
+        zdict (bytes): the preset dictionary.
+
+    Returns:
+        str: the dictionary's id, sent during the handshake
+    """
+    zdict = bytes(zdict)
+    zdict_id = f"{zlib.crc32(zdict):08x}"
+    zdicts[zdict_id] = zdict
+
+    return zdict_id
+
+
+def _module(algorithm: str) -> Any:
+    """Imports the module of a compression algorithm, when a connection first uses it.
+
+    Args:
+        algorithm (str): the compression algorithm, one of the valid compressions.
+
+    Returns:
+        Any: the module
+    """
+    return importlib.import_module(algorithm)
+
+
+class Compressor():
+    """Compresses the data sent over a connection above a size threshold, and decompresses the data received,
+    keeping track of the compression ratio and of the time spent compressing and decompressing."""
+
+    def __init__(self, algorithm: str, level: int = None, threshold: int = None, zdict: bytes = None):
+        if algorithm not in valid_compressions:
+            raise ValueError(f"compression must be one of {valid_compressions}")
+
+        self.algorithm = algorithm
+        self.level = int(level if level is not None else defaults.compression_level)
+        self.threshold = int(threshold if threshold is not None else defaults.compression_threshold)
+        # only zlib supports preset dictionaries
+        self.zdict = bytes(zdict) if zdict is not None and algorithm == "zlib" else None
+
+        self.compressed_frames = 0
+        self.skipped_frames = 0
+        self.decompressed_frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_time = 0.
+        self.decompress_time = 0.
+        self._lock = threading.Lock()
+
+    @property
+    def zdict_id(self) -> str:
+        """Returns the id of this compressor's preset dictionary.
+
+        Returns:
+            str: the dictionary's id, or None if no dictionary is used
+        """
+        if self.zdict is None:
+            return None
+
+        return f"{zlib.crc32(self.zdict):08x}"
+
+    @property
+    def ratio(self) -> float:
+        """Returns the ratio between the size of the data compressed and its compressed size.
+
+        Returns:
+            float: the compression ratio, 1 if nothing was compressed yet
+        """
+        if self.bytes_out == 0:
+            return 1.
+
+        return self.bytes_in / self.bytes_out
+
+    def compress(self, buffers: List[bytes], size: int) -> bytes:
+        """Compresses the given segments if they are large enough and compressible.
+
+        Args:
+            buffers (List[bytes]): the encoded segments to compress, in order.
+            size (int): the total size of the segments, in bytes.
+
+        Returns:
+            bytes: the compressed data, or None if it should be sent uncompressed
+        """
+        if size < self.threshold:
+            with self._lock:
+                self.skipped_frames += 1
+            return None
+
+        start = time.perf_counter()
+        if self.algorithm == "zlib":
+            if self.zdict is not None:
+                compressor = zlib.compressobj(self.level, zdict=self.zdict)
+            else:
+                compressor = zlib.compressobj(self.level)
+        elif self.algorithm == "bz2":
+            compressor = _module("bz2").BZ2Compressor(max(1, min(self.level, 9)))
+        else:
+            compressor = _module("lzma").LZMACompressor(preset=max(0, min(self.level, 9)))
+
+        compressed = b"".join([compressor.compress(buffer) for buffer in buffers] + [compressor.flush()])
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.compress_time += elapsed
+            if len(compressed) >= size:
+                # incompressible data is sent as is
+                self.skipped_frames += 1
+                return None
+
+            self.compressed_frames += 1
+            self.bytes_in += size
+            self.bytes_out += len(compressed)
+
+        return compressed
+
+    def decompress(self, buffer: memoryview, max_size: int = None) -> bytes:
+        """Decompresses data received, without ever producing more than max_size bytes: a few kilobytes of compressed
+        data could otherwise expand to gigabytes.
+
+        Args:
+            buffer (memoryview): the compressed data.
+            max_size (int, optional): the largest size of the decompressed data. Defaults to None (any size).
+
+        Raises:
+            FrameError: if data can't be decompressed, or decompresses to more than max_size bytes.
+
+        Returns:
+            bytes: the decompressed data
+        """
+        start = time.perf_counter()
+        # one more byte than the limit tells whether the data goes over it
+        max_length = max_size + 1 if max_size is not None else None
+        try:
+            if self.algorithm == "zlib":
+                if self.zdict is not None:
+                    decompressor = zlib.decompressobj(zdict=self.zdict)
+                else:
+                    decompressor = zlib.decompressobj()
+                data = decompressor.decompress(buffer, max_length or 0)
+                if max_size is None or len(data) <= max_size:
+                    data += decompressor.flush()
+            else:
+                if self.algorithm == "bz2":
+                    decompressor = _module("bz2").BZ2Decompressor()
+                else:
+                    decompressor = _module("lzma").LZMADecompressor()
+                data = decompressor.decompress(buffer, max_length or -1)
+
+            if not decompressor.eof and (max_size is None or len(data) <= max_size):
+                raise EOFError("Compressed data ended before the end-of-stream marker was reached")
+        except decompression_errors + ((_module("lzma").LZMAError,) if self.algorithm == "lzma" else ()) as error:
+            raise FrameError(f"Compressed data is corrupted ({error})!")
+
+        if max_size is not None and len(data) > max_size:
+            raise FrameError(f"Decompressed data size should be <= {max_size}!")
+
+        with self._lock:
+            self.decompress_time += time.perf_counter() - start
+            self.decompressed_frames += 1
+
+        return data
+
+    def stats(self) -> Dict[str, float]:
+        """Returns this compressor's statistics.
+
+        Returns:
+            Dict[str, float]: the algorithm, frames compressed, skipped and decompressed, bytes compressed,
+            bytes produced, compression ratio and seconds spent compressing and decompressing
+        """
+        return {
+            "algorithm": self.algorithm,
+            "level": self.level,
+            "compressed_frames": self.compressed_frames,
+            "skipped_frames": self.skipped_frames,
+            "decompressed_frames": self.decompressed_frames,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.ratio,
+            "compress_time": self.compress_time,
+            "decompress_time": self.decompress_time
+        }
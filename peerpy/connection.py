@@ -1,12 +1,50 @@
+import os
+import json
+import time
 import socket
+import sys
+import struct
 import threading
-from typing import Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple, List, Iterable
 
 from .data import Data
 from .event_handler import EventHandler
-from .utils import valid_data_types, build_data_header, split_header, build_header
-from .protocol import headers, defaults
-from .exceptions import DataSizeError
+from .utils import valid_data_types, valid_framings, buffers_size, build_data_header, split_header, build_header, receive_exactly
+from .utils import frame_struct, build_frame_header, split_frame_header, send_buffers, receive_into, send_file
+from .utils import set_keepalive, wait_writable
+from .protocol import headers, frames, defaults
+from .exceptions import DataSizeError, DataTypeError, FrameError, FrameSizeError, RemoteError
+from .send_queue import SendQueue
+from .dispatcher import Dispatcher, create_executor
+from .channel import Channel
+from .transfer import Transfer
+from .stats import ConnectionStats
+from . import tracing
+from .codec import create_codec
+from .compression import Compressor, valid_compressions, zdicts
+
+
+# sends without blocking, where supported
+nonblocking_flag = getattr(socket, "MSG_DONTWAIT", 0)
+
+# a request's payload is preceded by its method's name and padded, so that the payload stays aligned
+method_struct = struct.Struct("!B")
+method_alignment = 16
+
+
+class IncomingFrame():
+    """What was received so far of a frame, for connections receiving without ever blocking (i.e. driven by a reactor).
+    The view being filled is the frame's header, then the data it announces or each piece of a chunk in turn."""
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.received = 0
+        # (frame_type, flags, data_type, channel_id, data_size), once the header is received
+        self.frame = None
+        # the bytes of a chunk not received yet, and the transfer it belongs to
+        self.remaining = 0
+        self.transfer = None
 
 
 class Connection(EventHandler):
@@ -21,20 +59,113 @@ class Connection(EventHandler):
         if stream and data_size != "auto" and data_size <= 0:
             raise ValueError(f"Data size should be > 0 or 'auto' (Received {data_size})!")
 
+        # fall back to text framing if the other peer proposed an unknown framing
+        framing = str(kwargs.get("framing", frames.text_framing))
+        if framing not in valid_framings:
+            framing = frames.text_framing
+
+        # a send queue makes sending asynchronous, drained by a writer thread
+        send_queue_size = int(kwargs.get("send_queue_size", defaults.send_queue_size))
+        # conflating sends replace the data still queued by the latest one, so they need a send queue
+        conflate_sends = bool(kwargs.get("conflate_sends", peer.conflate_sends))
+        if conflate_sends:
+            send_queue_size = max(send_queue_size, 1)
+        # batching coalesces the data queued during batch_window seconds (or up to batch_bytes) into a single write,
+        # so it needs a send queue too
+        batch_window = float(kwargs.get("batch_window", peer.batch_window))
+        batch_bytes = int(kwargs.get("batch_bytes", peer.batch_bytes))
+        if batch_window < 0:
+            raise ValueError(f"Batch window should be >= 0 (Received {batch_window})!")
+        if batch_window > 0 and send_queue_size == 0:
+            send_queue_size = defaults.batch_queue_size
+        send_queue = SendQueue(send_queue_size, str(kwargs.get("send_policy", defaults.send_policy))) \
+            if send_queue_size > 0 else None
+
+        # data handlers are run by the peer's executor, unless this connection is given its own
+        executor = create_executor(kwargs["executor"]) if "executor" in kwargs else peer.executor
+        max_pending = int(kwargs.get("max_pending", peer.max_pending))
+        # conflating receives hand the data handler the latest data only, skipping the data it couldn't keep up with
+        conflate = bool(kwargs.get("conflate", peer.conflate))
+        if conflate and executor is None:
+            # the data handler can only fall behind if it runs apart from the receiving thread
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conflate")
+        dispatcher = Dispatcher(executor, max_pending) if executor is not None else None
+        if conflate and dispatcher.in_process:
+            raise ValueError("Data received can't be conflated when handled by another process!")
+
+        # compression proposed by this peer, or by the remote peer: a remote preset dictionary is given by its id,
+        # and only used if this peer registered it. Streams are never compressed, as their data size is fixed
+        compression = kwargs.get("compression", defaults.compression)
+        zdict = kwargs.get("zdict", None)
+        if isinstance(zdict, str):
+            zdict = zdicts.get(zdict, None)
+        compressor = Compressor(compression, kwargs.get("compression_level"), kwargs.get("compression_threshold"), zdict) \
+            if compression in valid_compressions and not stream else None
+
+        # each connection has its own codec instance, as codecs may receive data into buffers they own
+        # will raise ValueError if the codec can't be used
+        codec = create_codec(data_type, ring_size=int(kwargs.get("ring_size", defaults.ring_size)))
+
         handlers = {**defaults.connection_handlers, **dict(kwargs.get("handlers", {}))}
-        super().__init__(["data", "close"], handlers)
+        super().__init__(["data", "close", "channel", "transfer"], handlers)
 
         self.peer = peer
         self.target_name = str(target_name)
         self.sock = sock
         self.buffer_size = int(buffer_size)
         self._data_type = data_type
+        self.codec = codec
+        self.compressor = compressor
+        self.counters = ConnectionStats()
         self.strict = bool(kwargs.get("strict", True))
         self.stream = stream
         self.data_size = data_size
+        self.framing = framing
+        self.send_queue = send_queue
+        self.dispatcher = dispatcher
+        self.conflate = conflate
+        self.conflate_sends = conflate_sends
+        self.batch_window = batch_window
+        self.batch_bytes = batch_bytes
+        self._owns_executor = executor is not None and executor is not peer.executor
         self.active = True
 
+        # logical channels multiplexed over this connection, by id
+        # ids are odd for channels opened by the peer which initiated the connection, so that both peers never collide
+        self.channels = {}
+        self._next_channel_id = 1 if kwargs.get("initiator", False) else 2
+        self._channel_lock = threading.Lock()
+
+        # transfers received from the remote peer, by id, and the buffer their chunks are received into
+        self.transfers = {}
+        self.chunk_size = int(kwargs.get("chunk_size", defaults.chunk_size))
+        self._chunk_buffer = None
+        self._next_transfer_id = 1
+        # the frame being received, when receiving without blocking
+        self._incoming = None
+        self._transfer_lock = threading.Lock()
+
+        # requests sent and waiting for their response, by id, and methods answering the remote peer's requests
+        # (besides those registered on the peer)
+        self.methods = {}
+        self._requests = {}
+        self._next_request_id = 1
+        self._request_lock = threading.Lock()
+
+        # liveness: when data was last sent and received, and the heartbeat scheduled on the peer's timer wheel
+        self.last_sent = self.last_received = time.monotonic()
+        self._heartbeat_timer = None
+        if peer.keepalive is not None:
+            set_keepalive(sock, *peer.keepalive)
+        # None keeps the system's default (Nagle's algorithm enabled)
+        nodelay = kwargs.get("nodelay", peer.nodelay)
+        if nodelay is not None:
+            self.nodelay = nodelay
+
+        # so that headers and data sent from different threads are not interleaved
+        self._send_lock = threading.Lock()
         self.thread = threading.Thread(target=self._listen)
+        self.writer_thread = threading.Thread(target=self._write) if send_queue is not None else None
 
     @property
     def data_type(self) -> str:
@@ -54,22 +185,127 @@ class Connection(EventHandler):
         """
         return not self.active
 
+    @property
+    def binary_framing(self) -> bool:
+        """Returns whether this connection exchanges compact binary frame headers instead of text headers.
+
+        Returns:
+            bool: a boolean indicating whether binary framing was negotiated.
+        """
+        return self.framing == frames.binary_framing
+
+    @property
+    def shared_memory(self) -> bool:
+        """Returns whether this connection exchanges data through shared memory rings, the remote peer being on the
+        same host, instead of through its TCP socket.
+
+        Returns:
+            bool: a boolean indicating whether shared memory was negotiated.
+        """
+        # no shared memory transport can exist if its module was never imported
+        shared_ring = sys.modules.get(f"{__package__}.shared_ring", None)
+        return shared_ring is not None and isinstance(self.sock, shared_ring.SharedMemorySocket)
+
+    @property
+    def queue_depth(self) -> int:
+        """Returns the number of data waiting to be sent, if this connection has a send queue.
+
+        Returns:
+            int: the send queue's depth
+        """
+        return self.send_queue.depth if self.send_queue is not None else 0
+
+    @property
+    def dropped(self) -> int:
+        """Returns the number of data dropped because this connection's send queue was full.
+
+        Returns:
+            int: the number of data dropped
+        """
+        return self.send_queue.dropped if self.send_queue is not None else 0
+
+    @property
+    def nodelay(self) -> bool:
+        """Returns whether small writes are sent right away (TCP_NODELAY), instead of being delayed by Nagle's algorithm
+        until previous ones are acknowledged.
+
+        Returns:
+            bool: whether TCP_NODELAY is set on this connection's socket
+        """
+        try:
+            return bool(self.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+        except OSError:
+            return False
+
+    @nodelay.setter
+    def nodelay(self, nodelay: bool):
+        """Sets whether small writes are sent right away (TCP_NODELAY)
+
+        Args:
+            nodelay (bool): whether to disable Nagle's algorithm on this connection's socket
+        """
+        try:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(bool(nodelay)))
+        except OSError:
+            # the socket was already closed
+            pass
+
+    @property
+    def compression_stats(self) -> Dict[str, float]:
+        """Returns the statistics of the compression agreed on for this connection.
+
+        Returns:
+            Dict[str, float]: the compressor's statistics, or None if data is not compressed
+        """
+        if self.compressor is None:
+            return None
+
+        return self.compressor.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of this connection's counters: messages, frames and bytes sent and received,
+        pings sent, receive timeouts, data ignored (e.g. of another data type over a strict connection), corrupted or
+        conflated (replaced by newer data before being handled), time spent encoding, decoding and handling data,
+        and latency histograms of socket writes and data handlers.
+
+        Returns:
+            Dict[str, Any]: the counters, along with the send queue's state and the compression statistics
+        """
+        stats = self.counters.to_dict()
+        stats["queue_depth"] = self.queue_depth
+        stats["queue_dropped"] = self.dropped
+        stats["compression"] = self.compression_stats
+
+        return stats
+
     def start_thread(self):
-        """Attempts to start this connection's main thread, if not already running."""
-        if not self.thread.is_alive():
+        """Attempts to start this connection's main thread, if not already running.
+        If its peer runs a reactor, the connection is driven by the reactor instead."""
+        if self.writer_thread is not None and not self.writer_thread.is_alive():
+            self.writer_thread.start()
+
+        if self._heartbeat_timer is None:
+            # the first call schedules the next ones
+            self._heartbeat_timer = self.peer.timers.schedule(0, self._heartbeat)
+
+        if self.peer.reactor is not None:
+            self.peer.reactor.register(self)
+        elif not self.thread.is_alive():
             self.thread.start()
 
     def send(self, data: Any):
         """Send data to the target peer, serializing it to this connection's default data format.
+        If this connection has a send queue, data is only queued and sent by the connection's writer thread.
 
         Args:
             data (Any): the data to serialize and send.
 
         Raises:
             ValueError: if this connection's default format is bytes and the data is not bytes
+            SendQueueFullError: if this connection's send queue is full and its policy is "raise"
 
         Returns:
-            bool: whether data was successfully sent.
+            bool: whether data was successfully sent (or queued).
         """
         if self.closed:
             # raise ConnectionAbortedError("Connection was lost with remote peer.")
@@ -78,37 +314,775 @@ class Connection(EventHandler):
             # to send data over a defective connection
             return False
 
+        with tracing.span("send", target=self.target_name, data_type=self.data_type) as span:
+            # first encode data according to this connection's default data type
+            start = time.perf_counter()
+            data = Data(self.data_type, decoded_data=data, codec=self.codec)
+            encoded = data.encode()
+            self.counters.encode_time += time.perf_counter() - start
+
+            if span:
+                span.set(message_id=data.message_id, size=len(data))
+
+            return self._submit_encoded(encoded)
+
+    def open_channel(self, data_type: str = "json", strict: bool = True, stream: bool = False, **kwargs) -> Channel:
+        """Opens a logical channel multiplexed over this connection, with its own data type and handlers.
+        The remote peer is notified through its connection's channel event.
+
+        Args:
+            data_type (str, optional): the data type to use for the channel. Defaults to "json".
+            strict (bool, optional): whether this channel is strict on data types. Defaults to True.
+            stream (bool, optional): whether the channel only carries data of a fixed size. Defaults to False.
+            data_size (int, optional): the size of every data of a streaming channel, in bytes.
+            Defaults to the size of the first data sent.
+            handlers (Dict[str, Callable], optional): the channel's event handlers. Defaults to None.
+
+        Raises:
+            ValueError: if this connection doesn't use binary framing, data_type is not a valid data type
+            or data_size is not > 0.
+
+        Returns:
+            Channel: the channel opened
+        """
+        if not self.binary_framing:
+            raise ValueError("Channels can only be opened over connections using binary framing!")
+
+        with self._channel_lock:
+            channel_id = self._next_channel_id
+            if channel_id >= 2 ** 16:
+                raise ValueError("No more channel can be opened over this connection!")
+
+            self._next_channel_id += 2
+
+        channel = Channel(self, channel_id, data_type=data_type, strict=strict, stream=stream, **kwargs)
+        self.channels[channel_id] = channel
+
+        contents = {"data_type": data_type, "strict": strict}
+        if channel.stream:
+            contents["stream"] = True
+            if channel.data_size != "auto":
+                contents["data_size"] = channel.data_size
+        header = build_header(headers.channel_header, contents)
+        self._submit_buffers([build_frame_header(frames.open_frame, len(header), channel=channel_id), header])
+
+        return channel
+
+    def send_file(self, path: str, name: str = None) -> bool:
+        """Sends a file as a transfer, chunk by chunk, letting the kernel copy each chunk from the page cache (sendfile).
+        The remote peer is notified through its connection's transfer event. Chunks are sent directly,
+        without going through this connection's send queue.
+
+        Args:
+            path (str): the path of the file to send.
+            name (str, optional): the name of the transfer, sent to the remote peer. Defaults to the file's name.
+
+        Raises:
+            ValueError: if this connection doesn't use binary framing or is a stream.
+
+        Returns:
+            bool: whether the file was entirely sent.
+        """
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            transfer_id = self._begin_transfer(name if name is not None else os.path.basename(path), size)
+            if transfer_id is None:
+                return False
+
+            offset = 0
+            while offset < size:
+                count = min(self.chunk_size, size - offset)
+                try:
+                    with self._send_lock:
+                        if self.closed:
+                            return False
+
+                        send_buffers(self.sock, [build_frame_header(frames.chunk_frame, count, channel=transfer_id)])
+                        send_file(self.sock, file, offset, count)
+                        self.counters.frames_sent += 1
+                        self.counters.bytes_sent += frame_struct.size + count
+                except (ConnectionAbortedError, ConnectionResetError, BrokenPipeError, BlockingIOError, EOFError,
+                        ValueError):
+                    # EOFError: the file was truncated while being sent, the chunk announced can't be completed
+                    # ValueError: the connection was closed while sending, making its socket non-blocking
+                    self.close()
+                    return False
+
+                offset += count
+
+        return self._send_buffers([build_frame_header(frames.end_frame, channel=transfer_id)])
+
+    def send_iter(self, chunks: Iterable[bytes], name: str = None, size: int = None) -> bool:
+        """Sends bytes-like chunks as a transfer, as they are produced (e.g. by a generator of unknown length).
+        The remote peer is notified through its connection's transfer event. Chunks are sent directly,
+        without going through this connection's send queue.
+
+        Args:
+            chunks (Iterable[bytes]): the bytes-like chunks to send, in order.
+            name (str, optional): the name of the transfer, sent to the remote peer. Defaults to None.
+            size (int, optional): the total size of the transfer, if known. Defaults to None.
+
+        Raises:
+            ValueError: if this connection doesn't use binary framing or is a stream.
+
+        Returns:
+            bool: whether every chunk was sent.
+        """
+        transfer_id = self._begin_transfer(name, size)
+        if transfer_id is None:
+            return False
+
+        for chunk in chunks:
+            chunk_size = memoryview(chunk).nbytes
+            if chunk_size == 0:
+                continue
+
+            if not self._send_buffers([build_frame_header(frames.chunk_frame, chunk_size, channel=transfer_id), chunk]):
+                return False
+
+        return self._send_buffers([build_frame_header(frames.end_frame, channel=transfer_id)])
+
+    def register_method(self, name: str, method: Callable[["Connection", Any], Any]):
+        """Registers a method answering the requests of the remote peer, over this connection only.
+        The method is passed this connection and the request's payload, and returns the response (or a future of it).
+
+        Args:
+            name (str): the name requests call the method by.
+            method (Callable[[Connection, Any], Any]): the method.
+        """
+        self.methods[name] = method
+
+    def request(self, payload: Any, timeout: float = None, method: str = "default") -> Future:
+        """Sends a request to the remote peer, answered by its method registered under the given name.
+        Requests are pipelined: any number of them can wait for their response, and responses are matched to their
+        request by id whatever the order they arrive in. The future's callbacks are called by the thread receiving
+        the response.
+
+        Args:
+            payload (Any): the data passed to the remote method, serialized to this connection's data type.
+            timeout (float, optional): how long to wait for the response, in seconds. Defaults to None (until the
+            connection is closed).
+            method (str, optional): the name of the remote method. Defaults to "default".
+
+        Raises:
+            ValueError: if this connection doesn't use binary framing or is a stream.
+
+        Returns:
+            Future: the future of the response, which fails with RemoteError if the remote method failed or isn't
+            registered, TimeoutError if no response was received within timeout seconds, or ConnectionAbortedError
+            if the connection was closed meanwhile. Cancelling it drops the response
+        """
+        if not self.binary_framing or self.stream:
+            raise ValueError("Requests can only be sent over non-streaming connections using binary framing!")
+
+        name = method.encode("utf-8")
+        if len(name) >= 2 ** 8:
+            raise ValueError(f"Method names can't be longer than 255 bytes (Received {len(name)})!")
+
+        future = Future()
+        encoded = Data(self.data_type, decoded_data=payload, codec=self.codec).encode()
+        with self._request_lock:
+            if len(self._requests) >= 2 ** 16 - 1:
+                raise ValueError("Too many requests are waiting for their response!")
+
+            request_id = self._next_request_id
+            while request_id in self._requests:
+                request_id = request_id % (2 ** 16 - 1) + 1
+            self._next_request_id = request_id % (2 ** 16 - 1) + 1
+
+            self._requests[request_id] = future
+
+        if timeout is not None:
+            timer = self.peer.timers.schedule(timeout, self._expire_request, request_id, future)
+            future.add_done_callback(lambda future: timer.cancel())
+
+        prefix = method_struct.pack(len(name)) + name
+        prefix += bytes(-len(prefix) % method_alignment)
+        buffers, data_size, flags = self._compress([prefix] + list(encoded), len(prefix) + buffers_size(encoded))
+        header = build_frame_header(frames.request_frame, data_size, self.data_type, flags, request_id)
+
+        if self._submit_buffers([header] + buffers):
+            self.counters.requests_sent += 1
+        else:
+            self._resolve_request(request_id, error=ConnectionAbortedError("Connection was lost with remote peer."))
+
+        return future
+
+    def _resolve_request(self, request_id: int, data: Data = None, error: Exception = None):
+        """Resolves the future of a request waiting for its response, unless it was already resolved.
+
+        Args:
+            request_id (int): the id of the request.
+            data (Data, optional): the response received. Defaults to None.
+            error (Exception, optional): the reason why the request failed. Defaults to None.
+        """
+        with self._request_lock:
+            future = self._requests.pop(request_id, None)
+
+        if future is None:
+            # the request timed out meanwhile
+            self.counters.ignored += 1
+            return
+
+        if not future.set_running_or_notify_cancel():
+            # the request was cancelled by the user: its response is dropped
+            self.counters.ignored += 1
+            return
+
+        if error is None:
+            try:
+                future.set_result(data.decode())
+                return
+            except Exception as decode_error:
+                error = decode_error
+
+        future.set_exception(error)
+
+    def _expire_request(self, request_id: int, future: Future):
+        with self._request_lock:
+            if self._requests.get(request_id) is not future:
+                return
+
+            del self._requests[request_id]
+
+        if future.set_running_or_notify_cancel():
+            future.set_exception(TimeoutError("No response was received within the request's timeout!"))
+
+    def _receive_request(self, request_id: int, data: Data):
+        """Calls the method a request received from the remote peer is for, and sends its response.
+        Methods run on this connection's executor if it has one, so that responses can be sent in any order.
+
+        Args:
+            request_id (int): the id of the request.
+            data (Data): the request received, starting with the method's name.
+        """
+        buffer = memoryview(data.buffer)
+        try:
+            name_size = method_struct.unpack_from(buffer)[0]
+            name = str(buffer[method_struct.size:method_struct.size + name_size], "utf-8")
+        except (struct.error, UnicodeDecodeError):
+            # data received is corrupted, don't process it
+            self.counters.corrupted += 1
+            return
+
+        self.counters.requests_received += 1
+        offset = method_struct.size + name_size
+        offset += -offset % method_alignment
+        payload = Data(data.get_type(), buffer=buffer[offset:], codec=data.codec, message_id=data.message_id)
+
+        method = self.methods.get(name, self.peer.methods.get(name, None))
+        if method is None:
+            self._respond(request_id, error=f"Method {name} is not registered!")
+        elif self.dispatcher is not None and not self.dispatcher.in_process:
+            try:
+                self.dispatcher.executor.submit(self._call_method, request_id, method, payload)
+            except RuntimeError:
+                # the executor was shut down (e.g. its peer was stopped)
+                self._call_method(request_id, method, payload)
+        else:
+            self._call_method(request_id, method, payload)
+
+    def _call_method(self, request_id: int, method: Callable, payload: Data):
+        try:
+            with tracing.span("handle", event="request", emitter=type(self).__name__):
+                result = method(self, payload.decode())
+        except Exception as error:
+            self._respond(request_id, error=f"{type(error).__name__}: {error}")
+            return
+
+        if isinstance(result, Future):
+            # the response is sent once the method completed
+            def respond(future: Future):
+                error = future.exception()
+                if error is not None:
+                    self._respond(request_id, error=f"{type(error).__name__}: {error}")
+                else:
+                    self._respond(request_id, future.result())
+
+            result.add_done_callback(respond)
+        else:
+            self._respond(request_id, result)
+
+    def _respond(self, request_id: int, result: Any = None, error: str = None):
+        """Sends the response to a request of the remote peer.
+
+        Args:
+            request_id (int): the id of the request.
+            result (Any, optional): the response, serialized to this connection's data type. Defaults to None.
+            error (str, optional): the reason why the request failed, sent instead of the response. Defaults to None.
+        """
+        if error is None:
+            try:
+                encoded = Data(self.data_type, decoded_data=result, codec=self.codec).encode()
+            except DataTypeError as data_type_error:
+                error = f"{type(data_type_error).__name__}: {data_type_error}"
+
+        if error is not None:
+            # the remote peer can only ever receive so much of it
+            message = error.encode("utf-8")[:2 ** 12]
+            self._submit_buffers([build_frame_header(frames.error_frame, len(message), channel=request_id), message])
+            return
+
+        buffers, data_size, flags = self._compress(list(encoded), buffers_size(encoded))
+        header = build_frame_header(frames.response_frame, data_size, self.data_type, flags, request_id)
+        self._submit_buffers([header] + buffers)
+
+    def _begin_transfer(self, name: str, size: int) -> int:
+        """Notifies the remote peer that a transfer begins.
+
+        Args:
+            name (str): the name of the transfer.
+            size (int): the total size of the transfer, if known.
+
+        Raises:
+            ValueError: if this connection doesn't use binary framing or is a stream.
+
+        Returns:
+            int: the id of the transfer, or None if the connection was lost
+        """
+        if not self.binary_framing or self.stream:
+            raise ValueError("Transfers can only be sent over non-streaming connections using binary framing!")
+
+        with self._transfer_lock:
+            transfer_id = self._next_transfer_id
+            self._next_transfer_id = transfer_id % (2 ** 16 - 1) + 1
+
+        info = json.dumps({"name": name, "size": size}).encode("utf-8")
+        if not self._send_buffers([build_frame_header(frames.begin_frame, len(info), channel=transfer_id), info]):
+            return None
+
+        return transfer_id
+
+    def _submit_channel_data(self, channel: Channel, data: List[bytes]) -> bool:
+        """Sends data already encoded to a channel's data type, or queues it if this connection has a send queue.
+
+        Args:
+            channel (Channel): the channel to send data over.
+            data (List[bytes]): the encoded segments to send.
+
+        Raises:
+            DataSizeError: if the channel is a stream and data is not of the stream's size
+
+        Returns:
+            bool: whether data was successfully sent (or queued).
+        """
+        data_size = buffers_size(data)
+        if channel.stream:
+            # as over streaming connections, data keeps its fixed size and is never compressed
+            if channel.data_size == "auto":
+                channel.data_size = data_size
+            elif channel.data_size != data_size:
+                raise DataSizeError(f"Data size ({data_size}) is different from the stream size ({channel.data_size})")
+            buffers, flags = list(data), 0
+        else:
+            buffers, data_size, flags = self._compress(data, data_size)
+        header = build_frame_header(frames.data_frame, data_size, channel.data_type, flags, channel.channel_id)
+        sent = self._submit_buffers([header] + buffers, channel.channel_id)
+        if sent:
+            self.counters.messages_sent += 1
+
+        return sent
+
+    def _close_channel(self, channel: Channel):
+        """Closes a channel, notifying the remote peer.
+
+        Args:
+            channel (Channel): the channel to close.
+        """
+        self._submit_buffers([build_frame_header(frames.close_frame, channel=channel.channel_id)])
+        self._terminate_channel(channel.channel_id)
+
+    def _submit_encoded(self, data: List[bytes], header_cache: Dict[Tuple[str, str, int, int], bytes] = None,
+                        deadline: float = None, compressed_cache: Dict[Tuple, Tuple[List[bytes], int, int]] = None) -> bool:
+        """Sends data already encoded to this connection's data type, or queues it if this connection has a send queue.
+
+        Args:
+            data (List[bytes]): the encoded segments to send.
+            header_cache (Dict[Tuple[str, str, int, int], bytes], optional): headers already built for other
+            connections, by framing, data type, data size and flags, so that they can be reused. Defaults to None.
+            deadline (float, optional): the time.monotonic() value after which sending (or queuing) is given up.
+            Defaults to None (never gives up).
+            compressed_cache (Dict[Tuple, Tuple[List[bytes], int, int]], optional): data already compressed for other
+            connections (see _compress). Defaults to None.
+
+        Raises:
+            DataSizeError: if this connection is a stream and data is not of the stream's size
+            SendQueueFullError: if this connection's send queue is full and its policy is "raise"
+
+        Returns:
+            bool: whether data was successfully sent (or queued).
+        """
+        if self.closed:
+            return False
+
+        data_size = buffers_size(data)
+        buffers = list(data)
         # send a header if the connection is not streaming
         # otherwise, data_type is fixed and known and data is of fixed size so header is useless
-        # first encode data according to this connection's default data type
-        data = Data(self.data_type, decoded_data=data).encode()
-
-        data_size = len(data)
         if not self.stream or self.data_size == "auto":
-            # then send information about data
-            header = build_data_header(data_size, self.data_type)
-            try:
-                self.sock.sendall(header)
-            except (ConnectionAbortedError, ConnectionResetError):
-                self.close()
-                return False
+            buffers, data_size, flags = self._compress(buffers, data_size, compressed_cache)
+
+            # then send information about data, along with data
+            if header_cache is None:
+                header = self._build_data_header(data_size, self.data_type, flags)
+            else:
+                key = (self.framing, self.data_type, data_size, flags)
+                header = header_cache.get(key)
+                if header is None:
+                    header = header_cache[key] = self._build_data_header(data_size, self.data_type, flags)
+
+            # the buffers may be shared with other connections (see _compress)
+            buffers = [header] + buffers
 
             if self.data_size == "auto":
                 self.data_size = data_size
         elif self.data_size != data_size:
             raise DataSizeError(f"Data size ({data_size}) is different from the stream size ({self.data_size})")
 
-        # set the socket as blocking so that we wait for the data to be received
-        self.sock.setblocking(True)
+        sent = self._submit_buffers(buffers, 0, deadline)
+        if sent:
+            self.counters.messages_sent += 1
+
+        return sent
+
+    def _compress(self, buffers: List[bytes], data_size: int,
+                  compressed_cache: Dict[Tuple, Tuple[List[bytes], int, int]] = None) -> Tuple[List[bytes], int, int]:
+        """Compresses encoded data if compression was agreed on and data is large enough and compressible.
+
+        Args:
+            buffers (List[bytes]): the encoded segments to send.
+            data_size (int): the total size of the segments, in bytes.
+            compressed_cache (Dict[Tuple, Tuple[List[bytes], int, int]], optional): the same data already compressed
+            for other connections, by data type and compression settings, so that it is compressed once.
+            Defaults to None.
+
+        Returns:
+            Tuple[List[bytes], int, int]: the segments to send, their total size and the frame flags announcing them
+        """
+        if self.compressor is None or not self.binary_framing:
+            return buffers, data_size, 0
+
+        compressor = self.compressor
+        key = (self.data_type, compressor.algorithm, compressor.zdict_id, compressor.level, compressor.threshold)
+        if compressed_cache is not None and key in compressed_cache:
+            return compressed_cache[key]
+
+        compressed = compressor.compress(buffers, data_size)
+        result = (buffers, data_size, 0) if compressed is None else ([compressed], len(compressed), frames.compressed_flag)
+        if compressed_cache is not None:
+            compressed_cache[key] = result
+
+        return result
+
+    def _submit_buffers(self, buffers: List[bytes], key: int = None, deadline: float = None) -> bool:
+        """Sends framed data, or queues it if this connection has a send queue.
+
+        Args:
+            buffers (List[bytes]): the headers and data to send, in order.
+            key (int, optional): the id of the channel data is sent over (0 for the connection itself), so that data
+            still queued can be replaced by the latest data of the same channel if sends are conflated.
+            None for frames which must all be sent, e.g. transfers' frames. Defaults to None.
+            deadline (float, optional): the time.monotonic() value after which sending (or queuing) is given up.
+            Defaults to None (never gives up).
+
+        Raises:
+            SendQueueFullError: if this connection's send queue is full and its policy is "raise"
+
+        Returns:
+            bool: whether data was successfully sent (or queued).
+        """
+        if self.send_queue is None:
+            return self._send_buffers(buffers, deadline=deadline)
+
+        if self.conflate_sends and key is not None:
+            return self.send_queue.put_latest(buffers, key)
+
+        return self.send_queue.put(buffers, max(deadline - time.monotonic(), 0) if deadline is not None else None)
+
+    def _send_buffers(self, buffers: List[bytes], frames_count: int = 1, deadline: float = None) -> bool:
+        """Sends framed data through the underlying socket, closing the connection if it is lost.
+
+        Args:
+            buffers (List[bytes]): the headers and data to send, in order.
+            frames_count (int, optional): the number of frames the buffers hold, when batched. Defaults to 1.
+            deadline (float, optional): the time.monotonic() value after which sending is given up. Data not sent at
+            all is simply dropped, while data sent in part closes the connection, as the remote peer would read the
+            next frame from its middle. Defaults to None (never gives up).
+
+        Returns:
+            bool: whether data was successfully sent.
+        """
+        if self.closed:
+            return False
+
+        # another thread may still be sending through the socket
+        if not self._send_lock.acquire(timeout=max(deadline - time.monotonic(), 0) if deadline is not None else -1):
+            return False
+
+        size = buffers_size(buffers)
         try:
-            self.sock.sendall(data)  # raises an error if data ain't fully sent
-        except (ConnectionAbortedError, ConnectionResetError):
-            self.close()
+            with tracing.span("write", target=self.target_name, size=size):
+                start = time.perf_counter()
+                sent = send_buffers(self.sock, buffers, deadline)  # raises an error if the connection is lost
+                self.counters.send_latency.record(time.perf_counter() - start)
+
+            if sent == size:
+                self.counters.frames_sent += frames_count
+                self.counters.bytes_sent += size
+                self.last_sent = time.monotonic()
+        except (ConnectionAbortedError, ConnectionResetError, BrokenPipeError, BlockingIOError):
+            # BlockingIOError: connection was closed while sending
+            sent = None
+        finally:
+            self._send_lock.release()
+
+        if sent is None or 0 < sent < size:
+            self.close(force=sent is not None)
             return False
 
-        # reset the socket timeout
-        self.sock.settimeout(self.peer.timeout)
-        return True
+        return sent == size
+
+    def _build_data_header(self, data_size: int, data_type: str, flags: int = 0) -> bytes:
+        """Builds the header announcing data, according to this connection's framing.
+
+        Args:
+            data_size (int): the size of the data, in bytes.
+            data_type (str): the data type to be sent.
+            flags (int, optional): the frame flags, only sent with binary framing. Defaults to 0.
+
+        Returns:
+            bytes: the generated encoded header
+        """
+        if self.binary_framing:
+            return build_frame_header(frames.data_frame, data_size, data_type, flags)
+
+        return build_data_header(data_size, data_type)
+
+    def _build_ping_header(self) -> bytes:
+        """Builds the header used to check whether the connection is still alive, according to this connection's framing.
+
+        Returns:
+            bytes: the generated encoded header
+        """
+        if self.binary_framing:
+            return build_frame_header(frames.ping_frame)
+
+        return build_header(headers.ping_header, {})
+
+    def _receive_frame(self):
+        """Internal method to receive a binary frame header, then the data it announces.
+
+        Raises:
+            FrameError: if the frame header received is corrupted.
+            FrameSizeError: if the frame announces more data than the peer accepts.
+
+        Returns:
+            Any: the data received, if the frame was a data frame of an accepted data type
+        """
+        header = receive_exactly(self.sock, frame_struct.size)
+        # headers are counted as they are when sent
+        self.counters.bytes_received += len(header)
+        frame_type, flags, data_type, channel_id, data_size = split_frame_header(header, self.peer.max_data_size)
+
+        if frame_type == frames.data_frame and channel_id == 0:
+            return self._accept_data(data_size, data_type, flags)
+        if frame_type == frames.chunk_frame:
+            self._receive_chunk(channel_id, data_size)
+            return None
+
+        data = self._receive(data_size, data_type, flags) if data_size > 0 else Data(data_type)
+        if data is None:
+            # connection was lost while receiving
+            return None
+
+        self._handle_frame(frame_type, channel_id, data)
+        return None
+
+    def _handle_frame(self, frame_type: int, channel_id: int, data: Data):
+        """Processes a frame other than a data frame of the connection itself or a chunk, once entirely received.
+
+        Args:
+            frame_type (int): the type of the frame.
+            channel_id (int): the channel, transfer or request the frame relates to.
+            data (Data): the data the frame carries.
+        """
+        data_type = data.get_type()
+        if frame_type == frames.open_frame:
+            self._open_remote_channel(channel_id, str(data.buffer, "utf-8"))
+        elif frame_type == frames.close_frame:
+            self._terminate_channel(channel_id)
+        elif frame_type == frames.begin_frame:
+            self._begin_remote_transfer(channel_id, str(data.buffer, "utf-8"))
+        elif frame_type == frames.end_frame:
+            self._end_remote_transfer(channel_id)
+        elif frame_type == frames.request_frame:
+            self._receive_request(channel_id, data)
+        elif frame_type == frames.response_frame:
+            self._resolve_request(channel_id, data)
+        elif frame_type == frames.error_frame:
+            self._resolve_request(channel_id, error=RemoteError(str(data.buffer, "utf-8", "replace")))
+        elif frame_type == frames.data_frame:
+            channel = self.channels.get(channel_id, None)
+            if channel is not None and channel.stream and channel.data_size == "auto":
+                channel.data_size = len(data.buffer)
+
+            if channel is not None and not (channel.strict and data_type != channel.data_type) \
+                    and not (channel.stream and len(data.buffer) != channel.data_size):
+                self._dispatch_data(data, channel)
+            else:
+                self.counters.ignored += 1
+
+    def _open_remote_channel(self, channel_id: int, header: str):
+        """Registers a channel opened by the remote peer and triggers the channel event.
+
+        Args:
+            channel_id (int): the id of the channel.
+            header (str): the header describing the channel.
+        """
+        if channel_id == 0 or channel_id % 2 == self._next_channel_id % 2:
+            # the remote peer can only open channels with ids of its own parity, which never collide with this peer's
+            self.counters.corrupted += 1
+            return
+
+        try:
+            channel = Channel(self, channel_id, **split_header(header))
+        except ValueError:
+            # the channel's data type is not supported: its data will be ignored
+            return
+
+        if channel_id in self.channels:
+            # the remote peer reopened a channel without closing it: the previous one is closed first
+            self._terminate_channel(channel_id)
+        self.channels[channel_id] = channel
+        # handlers are set before any data is received over the channel
+        self.handle("channel", channel)
+
+    def _terminate_channel(self, channel_id: int):
+        """Unregisters a closed channel and triggers its close event.
+
+        Args:
+            channel_id (int): the id of the channel.
+        """
+        channel = self.channels.pop(channel_id, None)
+        if channel is None:
+            return
+
+        channel.active = False
+        self._dispatch_event(channel, "close")
+
+    def _begin_remote_transfer(self, transfer_id: int, info: str):
+        """Registers a transfer begun by the remote peer and triggers the transfer event.
+
+        Args:
+            transfer_id (int): the id of the transfer.
+            info (str): the json object describing the transfer.
+        """
+        try:
+            info = json.loads(info)
+        except ValueError:
+            # the transfer is corrupted: its chunks will be discarded
+            return
+
+        transfer = Transfer(self, transfer_id, info.get("name", None), info.get("size", None))
+        self.transfers[transfer_id] = transfer
+        # handlers and targets are set before any chunk is received
+        self.handle("transfer", transfer)
+
+    def _end_remote_transfer(self, transfer_id: int):
+        """Unregisters a transfer once every chunk is received and triggers its end event.
+
+        Args:
+            transfer_id (int): the id of the transfer.
+        """
+        transfer = self.transfers.pop(transfer_id, None)
+        if transfer is None:
+            return
+
+        transfer._end()
+        self._dispatch_event(transfer, "end")
+
+    def _receive_chunk(self, transfer_id: int, data_size: int):
+        """Receives a chunk of a transfer piece by piece, so that memory usage doesn't depend on the chunk's size.
+        Pieces are received into the transfer's buffer if it has one, or into a buffer reused for every piece.
+
+        Args:
+            transfer_id (int): the id of the transfer.
+            data_size (int): the size of the chunk, in bytes.
+        """
+        transfer = self.transfers.get(transfer_id, None)
+        if transfer is None:
+            self.counters.ignored += 1
+
+        self.counters.bytes_received += data_size
+        remaining = data_size
+        while remaining > 0:
+            view = self._chunk_target(transfer, remaining)
+            while True:
+                try:
+                    receive_into(self.sock, view, self.buffer_size)
+                    break
+                except socket.timeout:
+                    # the rest of the chunk must be received for the next header to be read at the right position
+                    if not self.active:
+                        raise ConnectionAbortedError("Connection was closed while receiving a chunk.")
+
+            remaining -= len(view)
+            if transfer is not None:
+                transfer._write(view)
+
+    def _chunk_target(self, transfer: Transfer, remaining: int) -> memoryview:
+        """Returns the buffer the next piece of a chunk is received into: the transfer's buffer if it has one,
+        or a buffer reused for every piece.
+
+        Args:
+            transfer (Transfer): the transfer the chunk belongs to, if any.
+            remaining (int): the bytes of the chunk not received yet.
+
+        Returns:
+            memoryview: the view to fill
+        """
+        view = transfer._target(remaining) if transfer is not None else None
+        if view is None:
+            if self._chunk_buffer is None:
+                self._chunk_buffer = memoryview(bytearray(self.chunk_size))
+            view = self._chunk_buffer[:min(remaining, self.chunk_size)]
+
+        return view
+
+    def _accept_data(self, data_size: int, data_type: str, flags: int = 0):
+        """Receives announced data, or discards it if this connection is strict and data_type is not its data type.
+
+        Args:
+            data_size (int): the size of the data, in bytes.
+            data_type (str): the type of data announced.
+            flags (int, optional): the flags of the frame announcing data. Defaults to 0.
+
+        Returns:
+            Data: the data object received, if accepted
+        """
+        if self.data_size == "auto":
+            self.data_size = data_size
+
+        # the data is still received so that the next header is read at the right position
+        return self._filter_data(self._receive(data_size, data_type, flags), data_type)
+
+    def _filter_data(self, data: Data, data_type: str) -> Data:
+        """Ignores data received over this connection if its type isn't valid, or isn't this connection's data type
+        while strict.
+
+        Args:
+            data (Data): the data received, or None if the connection was lost while receiving it.
+            data_type (str): the type of data announced.
+
+        Returns:
+            Data: the data object, if accepted
+        """
+        if data_type not in valid_data_types or (self.strict and data_type != self.data_type):
+            if data is not None:
+                self.counters.ignored += 1
+            return None
+
+        return data
 
     def _receive_data(self, header: str):
         """Internal method to start the receiving process
@@ -125,42 +1099,114 @@ class Connection(EventHandler):
         if any([key not in header for key in headers.required_data_fields]):
             return None
 
-        data_type, data_size = header["data_type"], header["data_size"]
+        return self._accept_data(header["data_size"], header["data_type"])
 
-        if self.data_size == "auto":
-            self.data_size = data_size
-
-        if self.strict and data_type != self.data_type:
-            return None
-
-        return self._receive(data_size, data_type)
-
-    def _receive(self, data_size: int, data_type: str):
+    def _receive(self, data_size: int, data_type: str, flags: int = 0):
         """Receives data from the underlying socket, according to data_size and data_type.
 
         Args:
             data_size (int): the size of the data, in bytes.
-            data_type (str): the type of data (one of ['raw', 'json', 'bytes']).
+            data_type (str): the type of data (one of the registered data types).
+            flags (int, optional): the flags of the frame announcing data. Defaults to 0.
+
+        Raises:
+            FrameError: if data is compressed and can't be decompressed.
 
         Returns:
             Data: the data object received
         """
-        data = Data(data_type)
+        buffer = self._receive_buffer(data_size, data_type, flags)
 
-        nb_chunks = data_size // self.buffer_size
-        residue_size = data_size % self.buffer_size
-
-        # TODO: set socket blocking?
+        message_id = None
         try:
-            for _ in range(nb_chunks):
-                data.buffer += self.sock.recv(self.buffer_size)
-            if residue_size > 0:
-                data.buffer += self.sock.recv(residue_size)
+            with tracing.span("receive", target=self.target_name, data_type=data_type, size=data_size) as span:
+                if span:
+                    message_id = tracing.next_message_id()
+                    span.set(message_id=message_id)
+
+                while True:
+                    try:
+                        receive_into(self.sock, buffer, self.buffer_size)
+                        break
+                    except socket.timeout:
+                        # the data announced must be received for the next header to be read at the right position
+                        if not self.active:
+                            raise ConnectionAbortedError("Connection was closed while receiving data.")
         except (ConnectionAbortedError, ConnectionResetError):
             self.close()
             return None
 
-        return data
+        return self._received_data(buffer, data_type, flags, message_id)
+
+    def _receive_buffer(self, data_size: int, data_type: str, flags: int = 0) -> memoryview:
+        """Returns the buffer data announced is received into.
+
+        Args:
+            data_size (int): the size of the data, in bytes.
+            data_type (str): the type of data.
+            flags (int, optional): the flags of the frame announcing data. Defaults to 0.
+
+        Raises:
+            FrameSizeError: if data_size is larger than the peer's max_data_size.
+
+        Returns:
+            memoryview: the buffer, of data_size bytes
+        """
+        if not 0 <= data_size <= self.peer.max_data_size:
+            raise FrameSizeError(f"Data size should be between 0 and {self.peer.max_data_size} "
+                                 f"(Received {data_size})!")
+
+        # the connection's codec may provide the buffer to receive into, e.g. a preallocated one. Only data handled
+        # on this thread can use it: data waiting in the dispatcher would be overwritten by the data received meanwhile
+        codec = self.codec if data_type == self.data_type else None
+        if codec is not None and not flags & frames.compressed_flag and self.dispatcher is None:
+            buffer = codec.allocate(data_size)
+            if buffer is not None:
+                return buffer
+
+        # a single buffer is allocated up front and filled in place
+        return memoryview(bytearray(data_size))
+
+    def _received_data(self, buffer: memoryview, data_type: str, flags: int = 0, message_id: int = None) -> Data:
+        """Builds the data object of data entirely received, decompressing it if needed.
+
+        Args:
+            buffer (memoryview): the bytes received.
+            data_type (str): the type of data.
+            flags (int, optional): the flags of the frame announcing data. Defaults to 0.
+            message_id (int, optional): the id tracing the data, if traced. Defaults to None.
+
+        Raises:
+            FrameError: if data is compressed and can't be decompressed.
+
+        Returns:
+            Data: the data object received
+        """
+        self.counters.bytes_received += len(buffer)
+        if flags & frames.compressed_flag:
+            # data is still received entirely, so that the next header is read at the right position
+            if self.compressor is None:
+                raise FrameError("Compressed data received over a connection without compression!")
+
+            buffer = self.compressor.decompress(buffer, self.peer.max_data_size)
+
+        codec = self.codec if data_type == self.data_type else None
+        return Data(data_type, buffer=buffer, codec=codec, message_id=message_id)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Sends the data waiting in this connection's send queue right away, without waiting for the end of the batch
+        window, and waits until it is written.
+
+        Args:
+            timeout (float, optional): how long to wait, in seconds. Defaults to None (waits until written).
+
+        Returns:
+            bool: whether every data waiting was written (always True without a send queue, as data is sent right away).
+        """
+        if self.send_queue is None:
+            return True
+
+        return self.send_queue.flush(timeout)
 
     def close(self, force: bool = False):
         """Closes the connection nicely.
@@ -169,7 +1215,23 @@ class Connection(EventHandler):
             force (bool, optional): whether to force close the connection.
             This setting should be considered dangerous, as data can be lost. Defaults to False.
         """
+        if self.batch_window > 0 and not force and self.active \
+                and threading.current_thread() is not self.writer_thread and self.writer_thread.is_alive():
+            # data batched was already sent as far as the user is concerned, so it is written before closing
+            self.flush(self.peer.timeout)
+
         self.active = False
+        if self._heartbeat_timer is not None:
+            self._heartbeat_timer.cancel()
+
+        if self.send_queue is not None:
+            # data still queued is dropped
+            self.send_queue.close()
+
+        if self.peer.reactor is not None:
+            # so that the reactor releases this connection right away
+            self.peer.reactor.wakeup()
+
         try:
             self.sock.settimeout(0)  # try to speed up closing process
 
@@ -179,38 +1241,356 @@ class Connection(EventHandler):
             # in case the socket was already termianted, an OSError is raised
             return
 
-    def _listen(self):
-        while self.active:
-            # in case timeout has changed
-            if self.peer.timeout != self.sock.gettimeout():
-                self.sock.settimeout(self.peer.timeout)
+    def _ping(self, wait: bool = True):
+        """Pings the target peer to check if the connection is still alive, closing it otherwise.
+
+        Args:
+            wait (bool, optional): whether to wait for data being sent by other threads. Otherwise, the ping is
+            skipped if data is being sent or if the socket can't take it right away. Defaults to True.
+        """
+        # fixed-size streams carry no header, so no ping can be framed over them
+        # (data_size may have been set by a concurrent send while we were waiting)
+        if self.stream and self.data_size != "auto":
+            return
+
+        # data being sent already tells the remote peer this connection is alive
+        if not self._send_lock.acquire(wait):
+            return
+
+        try:
+            header = self._build_ping_header()
+            if wait:
+                self.sock.sendall(header)
+            else:
+                # without waiting, the ping is only written if the socket's buffer has room for it, which a writable
+                # socket takes at once: the rest of the ping is never waited for
+                if not wait_writable(self.sock, time.monotonic()):
+                    return
+                if self.sock.send(header, nonblocking_flag) < len(header):
+                    # the remote peer would read the next frame from the middle of the ping
+                    self.close(force=True)
+                    return
+
+            self.counters.pings_sent += 1
+            self.last_sent = time.monotonic()
+        except (socket.timeout, BlockingIOError):
+            # the remote peer is too busy to even receive a ping, try again later
+            return
+        except (ConnectionAbortedError, ConnectionResetError, BrokenPipeError):
+            self.close()
+        except OSError:
+            # the socket was closed by another thread meanwhile
+            pass
+        finally:
+            self._send_lock.release()
+
+    def _heartbeat(self):
+        """Called from the peer's timer wheel: pings the target peer if nothing was sent for the peer's heartbeat
+        interval, and closes the connection if nothing was received for the peer's dead timeout."""
+        if not self.active:
+            return
+
+        now = time.monotonic()
+        interval = self.peer.heartbeat_interval
+        dead_timeout = self.peer.dead_timeout
+        # the receiving end of a fixed-size stream gets no heartbeat
+        if dead_timeout is not None and now - self.last_received >= dead_timeout \
+                and not (self.stream and self.data_size != "auto"):
+            self.close(force=True)
+            return
+
+        if now - self.last_sent >= interval:
+            self._ping(wait=False)
+
+        # next time a heartbeat or the remote peer's death may be due
+        due = self.last_sent + interval
+        if dead_timeout is not None:
+            due = min(due, self.last_received + dead_timeout)
+
+        self._heartbeat_timer = self.peer.timers.schedule(due - time.monotonic(), self._heartbeat)
+
+    def _receive_next(self):
+        """Receives the next header and the data it announces, or the next streaming data.
+
+        Returns:
+            Data: the data object received, if any
+        """
+        data = None
+        try:
+            # will block until any streaming data/header is received or socket timeout
+            if self.stream and self.data_size != "auto":
+                data = self._receive(self.data_size, self.data_type)
+            elif self.binary_framing:
+                data = self._receive_frame()
+            else:
+                header = receive_exactly(self.sock, headers.size)
+                self.counters.bytes_received += len(header)
+                header = str(header, "utf-8")
+
+                # if we received a data header, otherwise do nothing with the received packet
+                if header.startswith(headers.data_header):
+                    data = self._receive_data(header)
+        except socket.timeout:
+            # no header/streaming data received within timeout seconds, heartbeats are sent by the peer's timer wheel
+            self.counters.timeouts += 1
+            return None
+        except FrameSizeError:
+            # the data announced can't be skipped without being received, which it is too large for
+            self.counters.corrupted += 1
+            self.close()
+            return None
+        except (UnicodeDecodeError, FrameError):
+            # data received is corrupted, don't process it
+            self.counters.corrupted += 1
+            self._ping()
+            return None
+        except OSError:
+            # ConnectionAbortedError, ConnectionResetError: connection is lost
+            # BlockingIOError: connection was closed while receiving
+            self.close()
+            return None
+
+        self.last_received = time.monotonic()
+        return data
+
+    def _receive_ready(self):
+        """Receives what is available of the next frame with a single call to the readable socket, which thus never
+        blocks, for connections driven by a reactor. What was received so far is kept until the frame's header and the
+        data it announces are complete, so that a slow remote peer never holds the reactor's thread.
+
+        Returns:
+            Data: the data object received, if this call completed it
+        """
+        if self._incoming is None:
+            if self.stream and self.data_size != "auto":
+                # streaming data has no header
+                self._incoming = IncomingFrame(None)
+                self._expect_data((frames.data_frame, 0, self.data_type, 0, self.data_size))
+            else:
+                self._incoming = IncomingFrame(memoryview(bytearray(frame_struct.size if self.binary_framing
+                                                                    else headers.size)))
+
+        incoming = self._incoming
+        try:
+            nbytes = self.sock.recv_into(incoming.view[incoming.received:])
+            if nbytes == 0:
+                raise ConnectionResetError("Connection was closed by the remote peer.")
+        except (BlockingIOError, socket.timeout):
+            # nothing was available after all
+            return None
+        except OSError:
+            # ConnectionAbortedError, ConnectionResetError: connection is lost
+            self.close()
+            return None
+
+        self.last_received = time.monotonic()
+        incoming.received += nbytes
+        if incoming.received < len(incoming.view):
+            return None
+
+        try:
+            return self._complete_incoming(incoming)
+        except FrameSizeError:
+            # the data announced can't be skipped without being received, which it is too large for
+            self.counters.corrupted += 1
+            self._incoming = None
+            self.close()
+            return None
+        except (UnicodeDecodeError, FrameError):
+            # data received is corrupted, don't process it
+            self.counters.corrupted += 1
+            self._incoming = None
+            self._ping(wait=False)
+            return None
+
+    def _expect_data(self, frame: Tuple[int, int, str, int, int]):
+        """Prepares the incoming frame to receive what its header announces.
+
+        Args:
+            frame (Tuple[int, int, str, int, int]): the frame type, flags, data type, channel id and data size.
+        """
+        frame_type, flags, data_type, channel_id, data_size = frame
+        incoming = self._incoming
+        incoming.frame = frame
+        incoming.received = 0
+
+        if frame_type == frames.chunk_frame:
+            incoming.transfer = self.transfers.get(channel_id, None)
+            if incoming.transfer is None:
+                self.counters.ignored += 1
+
+            self.counters.bytes_received += data_size
+            incoming.remaining = data_size
+            incoming.view = self._chunk_target(incoming.transfer, data_size) if data_size > 0 else None
+            return
+
+        if frame_type == frames.data_frame and channel_id == 0 and self.data_size == "auto":
+            self.data_size = data_size
+        incoming.view = self._receive_buffer(data_size, data_type, flags) if data_size > 0 else None
+
+    def _complete_incoming(self, incoming: IncomingFrame) -> Data:
+        """Processes the header, data or piece of a chunk which was just received entirely.
+
+        Args:
+            incoming (IncomingFrame): the frame being received.
+
+        Raises:
+            UnicodeDecodeError: if a text header received is corrupted.
+            FrameError: if a frame header received is corrupted, or data can't be decompressed.
+
+        Returns:
+            Data: the data object received, if the frame was a data frame of an accepted data type
+        """
+        if incoming.frame is None:
+            self.counters.bytes_received += len(incoming.view)
+            if self.binary_framing:
+                self._expect_data(split_frame_header(incoming.view, self.peer.max_data_size))
+            else:
+                header = str(incoming.view, "utf-8")
+                fields = split_header(header)
+                if not header.startswith(headers.data_header) \
+                        or any([key not in fields for key in headers.required_data_fields]):
+                    # e.g. a ping header, announcing nothing
+                    self._incoming = None
+                    return None
+
+                self._expect_data((frames.data_frame, 0, fields["data_type"], 0, fields["data_size"]))
+
+            if incoming.view is not None:
+                # what the header announces is received next
+                return None
+        elif incoming.frame[0] == frames.chunk_frame:
+            incoming.remaining -= len(incoming.view)
+            if incoming.transfer is not None:
+                incoming.transfer._write(incoming.view)
+
+            if incoming.remaining > 0:
+                incoming.view = self._chunk_target(incoming.transfer, incoming.remaining)
+                incoming.received = 0
+                return None
+
+        # the frame was received entirely
+        self._incoming = None
+        frame_type, flags, data_type, channel_id, data_size = incoming.frame
+        if frame_type == frames.chunk_frame:
+            return None
+
+        buffer = incoming.view if incoming.view is not None else memoryview(bytearray(0))
+        # the frame was received piece by piece, as the socket became readable: the span covers what is done with it
+        message_id = None
+        with tracing.span("receive", target=self.target_name, data_type=data_type, size=data_size) as span:
+            if span:
+                message_id = tracing.next_message_id()
+                span.set(message_id=message_id)
+
+            if frame_type == frames.data_frame and channel_id == 0:
+                return self._filter_data(self._received_data(buffer, data_type, flags, message_id), data_type)
+
+            self._handle_frame(frame_type, channel_id, self._received_data(buffer, data_type, flags, message_id)
+                               if data_size > 0 else Data(data_type))
+        return None
+
+    def _handle_data(self, data: Data, target: EventHandler):
+        start = time.perf_counter()
+        decoded = data.decode()
+        decoded_at = time.perf_counter()
+        target.handle("data", decoded)
+        handled_in = time.perf_counter() - decoded_at
+
+        self.counters.decode_time += decoded_at - start
+        self.counters.handler_time += handled_in
+        self.counters.handler_latency.record(handled_in)
+
+    def _dispatch_data(self, data: Data, target: EventHandler = None):
+        """Passes received data to the data handler, either inline or through this connection's dispatcher.
+
+        Args:
+            data (Data): the data received.
+            target (EventHandler, optional): the connection or channel the data was received over. Defaults to self.
+        """
+        if target is None:
+            target = self
+
+        self.counters.messages_received += 1
+        if self.dispatcher is None:
+            self._handle_data(data, target)
+        elif self.conflate:
+            # data still waiting for the data handler is dropped without ever being decoded
+            self.counters.conflated += self.dispatcher.submit_latest(target, self._handle_data, data, target)
+        elif self.dispatcher.in_process:
+            # this connection can't be sent to another process: the handler is passed its name instead
+            handler = target.handlers.get("data", None)
+            if handler is not None:
+                self.dispatcher.submit(handler, self.target_name, data.decode())
+        else:
+            self.dispatcher.submit(self._handle_data, data, target)
+
+    def _dispatch_event(self, target: EventHandler, event_name: str):
+        """Triggers an event without arguments on target, after every pending data handler.
+
+        Args:
+            target (EventHandler): the connection or channel emitting the event.
+            event_name (str): the event to trigger.
+        """
+        if self.dispatcher is not None and not self.dispatcher.in_process:
+            self.dispatcher.submit(target.handle, event_name)
+        else:
+            target.handle(event_name)
+
+    def _terminate(self):
+        """Releases this connection's socket once closed, and unregisters it from its peer."""
+        self.sock.close()
+
+        for channel_id in list(self.channels):
+            self._terminate_channel(channel_id)
+
+        # transfers which didn't end are left incomplete
+        for transfer in list(self.transfers.values()):
+            transfer.close()
+        self.transfers.clear()
+
+        # requests still waiting for their response never get it
+        for request_id in list(self._requests):
+            self._resolve_request(request_id, error=ConnectionAbortedError("Connection was lost with remote peer."))
+
+        # so that the close handler is called after every pending data handler
+        self._dispatch_event(self, "close")
+
+        if self._owns_executor:
+            self.dispatcher.executor.shutdown(wait=False)
+        # the peer may already have replaced this connection with a new one
+        if self.peer.connections.get(self.target_name) is self:
+            del self.peer.connections[self.target_name]
+
+        # so that the peer's stats still account for this connection
+        self.peer.closed_stats.merge(self.counters)
+
+    def _write(self):
+        """Sends data queued in this connection's send queue, until the connection is closed."""
+        while True:
+            if self.batch_window > 0:
+                batch = self.send_queue.get_batch(self.batch_window, self.batch_bytes, buffers_size)
+            else:
+                buffers = self.send_queue.get()
+                batch = [buffers] if buffers is not None else None
+
+            if batch is None:
+                return
 
-            header, data = None, None
             try:
-                # will block until any streaming data/header is received or socket timeout
-                if self.stream and self.data_size != "auto":
-                    data = self._receive(self.data_size, self.data_type)
-                else:
-                    header = self.sock.recv(headers.size).decode("utf-8")
-            except (socket.timeout, UnicodeDecodeError):
-                # socket.timeout: no header/streaming data received within timeout seconds
-                # UnicodeDecodeError: data received is corrupted, don't process it
-
-                # ping the connection to check if it is still alive
-                # which otherwise raises ConnectionAbortedError, ConnectionResetError
-                self.sock.sendall(build_header(headers.ping_header, {}))
-                continue
-            except (ConnectionAbortedError, ConnectionResetError):
-                self.close()
-                continue
+                if self.closed:
+                    return
 
-            # if we received a data header, otherwise do nothing with the received packet
-            if header is not None and header.startswith(headers.data_header):
-                data = self._receive_data(header)
+                # the frames of a batch are written at once, and leave in as few segments as possible
+                self._send_buffers([buffer for buffers in batch for buffer in buffers], len(batch))
+            finally:
+                # even when dropped, so that flushing doesn't wait for it
+                self.send_queue.done(len(batch))
 
+    def _listen(self):
+        while self.active:
+            data = self._receive_next()
             if data is not None:
-                self.handle("data", data.decode())
+                self._dispatch_data(data)
 
-        self.sock.close()
-        self.handle("close")
-        del self.peer.connections[self.target_name]
+        self._terminate()
@@ -1,47 +1,66 @@
-import json
-import pickle
-
-from typing import Any
+from typing import Any, List, Union
 from dataclasses import dataclass
 
-from .exceptions import DataTypeError
+from . import tracing
+from .codec import Codec, get_codec
 
 
 @dataclass
 class Data():
 
     _type: str
-    buffer: bytes = b""
+    buffer: Union[bytes, memoryview] = b""
     decoded_data: Any = None
-    encoded_data: bytes = None
+    encoded_data: List[bytes] = None
+    codec: Codec = None
+    message_id: int = None
 
     def get_type(self):
         return self._type
 
-    def encode(self):
+    def get_codec(self) -> Codec:
+        """Returns the codec of this data's type.
+
+        Raises:
+            DataTypeError: if no codec is registered for this data type.
+
+        Returns:
+            Codec: the codec, either given or registered for this data type
+        """
+        if self.codec is None:
+            self.codec = get_codec(self._type)
+
+        return self.codec
+
+    def encode(self) -> List[bytes]:
+        """Encodes data with its data type's codec.
+
+        Returns:
+            List[bytes]: the bytes-like segments to send, in order
+        """
         if self.encoded_data is None:
-            if self._type == "raw":
-                self.encoded_data = pickle.dumps(self.decoded_data)
-            elif self._type == "json":
-                self.encoded_data = json.dumps({
-                    "data": self.decoded_data
-                }).encode("utf-8")
-            else:
-                if not isinstance(self.decoded_data, bytes):
-                    raise DataTypeError("data is not a bytes object")
-
-                self.encoded_data = self.decoded_data
+            with tracing.span("encode", data_type=self._type) as span:
+                self.encoded_data = self.get_codec().encode(self.decoded_data)
+
+                if span:
+                    if self.message_id is None:
+                        self.message_id = tracing.next_message_id()
+                    span.set(message_id=self.message_id, size=len(self))
 
         return self.encoded_data
 
-    def decode(self):
+    def decode(self) -> Any:
+        """Decodes the buffer data was received in with its data type's codec.
+
+        Returns:
+            Any: the decoded data
+        """
         if self.decoded_data is None:
-            if self._type == "raw":
-                self.decoded_data = pickle.loads(self.buffer)
-            elif self._type == "json":
-                self.decoded_data = json.loads(self.buffer)["data"]
-            else:
-                self.decoded_data = self.buffer
+            with tracing.span("decode", data_type=self._type) as span:
+                if span:
+                    span.set(message_id=self.message_id, size=memoryview(self.buffer).nbytes)
+
+                self.decoded_data = self.get_codec().decode(self.buffer)
 
         return self.decoded_data
 
@@ -49,4 +68,4 @@ class Data():
         if self.encoded_data is None:
             return 0
 
-        return len(self.encoded_data)
+        return sum([memoryview(segment).nbytes for segment in self.encoded_data])
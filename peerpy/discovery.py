@@ -0,0 +1,270 @@
+import time
+import socket
+import threading
+
+from typing import Any, Dict, List
+
+from .protocol import headers, announce_group, announce_port
+from .codec import valid_data_types
+from .exceptions import HeaderSizeError
+from .utils import get_local_ip, build_header, split_header
+
+valid_discovery_modes = ["ping", "announce"]
+
+
+class Discovery():
+    """Background discovery service of a peer, keeping a registry of the peers visible on the local network along with
+    when they were last seen, so that they can be known without waiting. In "ping" mode, the local network is pinged
+    every interval and every visible peer answers. In "announce" mode, every peer multicasts a presence beacon every
+    interval instead, so that peers learn about each other passively with a single datagram per peer and interval.
+    A peer is discovered when it is first seen, and lost when it hasn't been seen for ttl seconds."""
+
+    def __init__(self, peer, port: int, interval: float = 1., ttl: float = 5., mode: str = "ping",
+                 group: str = announce_group, group_port: int = announce_port):
+        if mode not in valid_discovery_modes:
+            raise ValueError(f"Discovery mode must be one of {valid_discovery_modes}")
+
+        self.peer = peer
+        self.port = int(port)
+        self.interval = float(interval)
+        self.ttl = float(ttl)
+        self.mode = mode
+        self.group = group
+        self.group_port = int(group_port)
+
+        if self.ttl <= self.interval:
+            raise ValueError("Discovery ttl must be larger than its interval!")
+
+        # address name of every peer known, with the time it was last seen at
+        self.last_seen = {}
+        # last beacon of every peer known in announce mode: its data types and load
+        self.beacons = {}
+        self._lock = threading.Lock()
+        self._active = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def active(self) -> bool:
+        """Whether the background service is running.
+
+        Returns:
+            bool: whether the registry is kept up to date in the background
+        """
+        return self._active
+
+    def start(self):
+        """Starts pinging the local network in the background."""
+        if not self._active:
+            self._active = True
+            if not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def stop(self):
+        """Stops the background service, within an interval. Peers known are kept until they expire."""
+        self._active = False
+
+    def peers(self) -> List[str]:
+        """Returns the peers seen within the last ttl seconds, without any network access.
+
+        Returns:
+            List[str]: the address names of the peers known, in the order they were discovered
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [name for name, seen in self.last_seen.items() if now - seen <= self.ttl]
+
+    def beacon(self, name: str) -> Dict[str, Any]:
+        """Returns what a peer announced about itself in its last beacon, in announce mode.
+
+        Args:
+            name (str): the address name of the peer.
+
+        Returns:
+            Dict[str, Any]: the data types the peer supports and its load (its number of connections),
+            or None if it hasn't announced itself
+        """
+        with self._lock:
+            return self.beacons.get(name)
+
+    def ping(self, timeout: float = .5) -> List[str]:
+        """Pings the local network and waits for answers, blocking the caller for timeout seconds.
+        Peers answering are recorded as seen.
+
+        Args:
+            timeout (float, optional): how long to wait for answers, in seconds. Defaults to .5.
+
+        Returns:
+            List[str]: the address names of the peers that answered
+        """
+        addresses = []
+        with self._open_socket() as sock:
+            self._send_ping(sock)
+
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                sock.settimeout(remaining)
+                name = self._receive_pong(sock)
+                if name is not None and name not in addresses:
+                    addresses.append(name)
+                    self._record(name)
+
+        return addresses
+
+    def _open_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        # any free port: the pong is sent back to the address the ping holds
+        sock.bind((get_local_ip(), 0))
+
+        return sock
+
+    def _send_ping(self, sock: socket.socket):
+        address, port = sock.getsockname()
+        ping_header = build_header(headers.ping_header, {"pinger": f"{address}:{port}"})
+        try:
+            sock.sendto(ping_header, ("<broadcast>", self.port))
+        except OSError:
+            # the network is unreachable for now (e.g. interface down), the next ping may succeed
+            pass
+
+    def _receive_pong(self, sock: socket.socket) -> str:
+        """Receives a datagram and parses it as a pong.
+
+        Args:
+            sock (socket.socket): the socket the ping was sent from, with a timeout set.
+
+        Returns:
+            str: the address name of the remote peer that answered, or None if nothing valid was received
+        """
+        pong = self._receive(sock, headers.pong_header)
+        if pong is None:
+            return None
+
+        name = pong.get("ponger")
+        if name is None or name == self.peer.address_name:
+            return None
+
+        return name
+
+    def _receive(self, sock: socket.socket, header_type: str) -> Dict[str, Any]:
+        """Receives a datagram and parses it as a header of the given type.
+
+        Args:
+            sock (socket.socket): the socket to receive from, with a timeout set.
+            header_type (str): the type of header expected.
+
+        Returns:
+            Dict[str, Any]: the header's contents, or None if nothing valid was received
+        """
+        try:
+            header = sock.recv(headers.size).decode("utf-8")
+            if not header.startswith(header_type):
+                return None
+
+            return split_header(header)
+        except (socket.timeout, UnicodeDecodeError, ValueError):
+            # UnicodeDecodeError, ValueError: data received is corrupted, don't process it
+            return None
+
+    def _record(self, name: str, beacon: Dict[str, Any] = None):
+        now = time.monotonic()
+        with self._lock:
+            # a peer not seen for ttl seconds is discovered again, even if the service wasn't running to expire it
+            discovered = now - self.last_seen.get(name, -self.ttl - 1) > self.ttl
+            self.last_seen[name] = now
+            if beacon is not None:
+                self.beacons[name] = beacon
+
+        if discovered:
+            self.peer.handle("discovered", name)
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            lost = [name for name, seen in self.last_seen.items() if now - seen > self.ttl]
+            for name in lost:
+                del self.last_seen[name]
+                self.beacons.pop(name, None)
+
+        for name in lost:
+            self.peer.handle("lost", name)
+
+    def _open_group_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # every peer of this device receives the beacons
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", self.group_port))
+
+        membership = socket.inet_aton(self.group) + socket.inet_aton("0.0.0.0")
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        # beacons don't leave the local network, and are received by the peers of this device too
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+        return sock
+
+    def _send_beacon(self, sock: socket.socket):
+        contents = {
+            "peer_name": self.peer.address_name,
+            "load": len(self.peer.connections),
+            "data_types": ",".join(valid_data_types)
+        }
+        try:
+            try:
+                beacon = build_header(headers.announce_header, contents)
+            except HeaderSizeError:
+                # too many data types registered to fit: peers only learn about this peer's presence
+                del contents["data_types"]
+                beacon = build_header(headers.announce_header, contents)
+
+            sock.sendto(beacon, (self.group, self.group_port))
+        except OSError:
+            # the network is unreachable for now (e.g. interface down), the next beacon may succeed
+            pass
+
+    def _run(self):
+        if self.mode == "announce":
+            self._run_announce()
+        else:
+            self._run_ping()
+
+    def _run_announce(self):
+        with self._open_group_socket() as sock:
+            next_beacon = 0.
+            while self._active:
+                now = time.monotonic()
+                if now >= next_beacon:
+                    self._expire()
+                    # invisible peers still learn about the others
+                    if not self.peer.invisible:
+                        self._send_beacon(sock)
+                    next_beacon = now + self.interval
+
+                sock.settimeout(max(next_beacon - now, 1e-3))
+                beacon = self._receive(sock, headers.announce_header)
+                if beacon is not None and beacon.get("peer_name", self.peer.address_name) != self.peer.address_name:
+                    name = beacon.pop("peer_name")
+                    self._record(name, beacon)
+
+    def _run_ping(self):
+        with self._open_socket() as sock:
+            next_ping = 0.
+            while self._active:
+                now = time.monotonic()
+                if now >= next_ping:
+                    self._expire()
+                    self._send_ping(sock)
+                    next_ping = now + self.interval
+
+                # pongs are received until the next ping is due
+                sock.settimeout(max(next_ping - now, 1e-3))
+                name = self._receive_pong(sock)
+                if name is not None:
+                    self._record(name)
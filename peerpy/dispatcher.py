@@ -0,0 +1,151 @@
+import sys
+import threading
+import traceback
+import collections
+
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Union
+
+valid_executors = ["inline", "thread", "process"]
+
+
+def create_executor(executor: Union[str, Executor]) -> Executor:
+    """Returns the executor described by executor.
+
+    Args:
+        executor (Union[str, Executor]): one of ["inline", "thread", "process"], or an executor instance.
+
+    Raises:
+        ValueError: if executor is neither a valid executor name nor an executor instance.
+
+    Returns:
+        Executor: the executor, or None for inline execution
+    """
+    if isinstance(executor, Executor):
+        return executor
+    if executor not in valid_executors:
+        raise ValueError(f"executor must be one of {valid_executors} or a concurrent.futures.Executor")
+
+    if executor == "thread":
+        return ThreadPoolExecutor(thread_name_prefix="handler")
+    if executor == "process":
+        # multiprocessing is only imported when a process pool is used
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor()
+
+    return None
+
+
+class Dispatcher():
+    """Runs tasks on an executor one at a time and in submission order, so that a connection's handlers keep their
+    order while not blocking the connection's thread. At most max_pending tasks can be submitted and not yet completed:
+    submit blocks until a slot is available. Tasks submitted with submit_latest instead replace the task of the same
+    key still waiting to run, if any, so that a late handler only gets the latest data."""
+
+    def __init__(self, executor: Executor, max_pending: int):
+        if max_pending <= 0:
+            raise ValueError(f"max_pending should be > 0 (Received {max_pending})!")
+
+        self.executor = executor
+        self.max_pending = int(max_pending)
+
+        self._tasks = collections.deque()
+        self._pending = 0
+        self._running = False
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.max_pending)
+
+    @property
+    def in_process(self) -> bool:
+        """Returns whether tasks are run in another process, and must thus be picklable.
+
+        Returns:
+            bool: whether this dispatcher's executor is a process pool.
+        """
+        # no process pool can exist if its module was never imported
+        process = sys.modules.get("concurrent.futures.process", None)
+        return process is not None and isinstance(self.executor, process.ProcessPoolExecutor)
+
+    @property
+    def pending(self) -> int:
+        """Returns the number of tasks submitted and not yet completed.
+
+        Returns:
+            int: the number of pending tasks
+        """
+        return self._pending
+
+    def submit(self, task: Callable, *args):
+        """Submits a task to be run after every task previously submitted.
+
+        Args:
+            task (Callable): the callable to run.
+        """
+        self._slots.acquire()  # will block until a slot is available
+        self._append(None, task, args)
+
+    def submit_latest(self, key: Any, task: Callable, *args) -> int:
+        """Submits a task to be run after every task previously submitted, replacing the task submitted with the same key
+        which is still waiting to run, if any. Never blocks, as at most one such task per key can wait.
+
+        Args:
+            key (Any): the key of the task, e.g. the connection or channel its data was received over. Must not be None.
+            task (Callable): the callable to run.
+
+        Returns:
+            int: the number of tasks replaced, 0 or 1
+        """
+        with self._lock:
+            pending = len(self._tasks)
+            self._tasks = collections.deque([item for item in self._tasks if item[0] is not key])
+            replaced = pending - len(self._tasks)
+            self._pending -= replaced
+
+        self._append(key, task, args)
+        return replaced
+
+    def _append(self, key: Any, task: Callable, args: tuple):
+        with self._lock:
+            self._pending += 1
+            self._tasks.append((key, task, args))
+            if self._running:
+                return
+
+            self._running = True
+
+        self._run_next()
+
+    def _run_next(self):
+        with self._lock:
+            if len(self._tasks) == 0:
+                self._running = False
+                return
+
+            key, task, args = self._tasks.popleft()
+
+        try:
+            future = self.executor.submit(task, *args)
+        except RuntimeError:
+            # the executor was shut down (e.g. its peer was stopped): the task is run inline
+            future = Future()
+            try:
+                future.set_result(task(*args))
+            except Exception as error:
+                future.set_exception(error)
+
+        # only tasks submitted without a key hold a slot
+        future.add_done_callback(self._done if key is None else self._done_latest)
+
+    def _done(self, future: Future):
+        self._slots.release()
+        self._done_latest(future)
+
+    def _done_latest(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+
+        error = future.exception()
+        if error is not None:
+            traceback.print_exception(type(error), error, error.__traceback__)
+
+        self._run_next()
@@ -1,14 +1,17 @@
-import time
-import queue
+import inspect
+import threading
 
 from dataclasses import dataclass, field
 from typing import Dict, Callable, Any, List
 
+from . import tracing
 from .exceptions import HandlerMissingException
 
 
 class EventHandler():
-    """Super class that registers and handle events, for objects such as Peer and Connection."""
+    """Super class that registers and handle events, for objects such as Peer and Connection.
+    Handlers are called directly by the thread triggering the event, while threads waiting for an event
+    are only notified when there is any."""
 
     def __init__(self, event_names: List[str], handlers: Dict[str, Callable[[Any], Any]], min_handler_names: List[str] = None):
         if min_handler_names is None:
@@ -18,38 +21,44 @@ class EventHandler():
         self.handlers = handlers
         self.min_handler_names = min_handler_names
 
-        self.event_queues = {event_name: queue.Queue(maxsize=1) for event_name in event_names}
+        # for each event, the number of times it was triggered while being waited for and the last handler's result
+        self.event_results = {event_name: (0, None) for event_name in event_names}
         self.waiting_threads = {event_name: 0 for event_name in event_names}
+        self._event_condition = threading.Condition()
 
-    def _register(self, event_name: str, *args):
-        """Registers an event with specific arguments, so that consumer threads can handle it.
+    def handle(self, event_name: str, *args) -> Any:
+        """Calls a handler for a specific event if existing, passing it arguments,
+        and notifies the threads waiting for this event.
 
         Args:
             event_name (str): the event to trigger.
 
         Raises:
             ValueError: if event_name is not a valid event name for this handler.
-        """
-        if event_name not in self.event_names:
-            raise ValueError(f"{event_name} is not a valid event name for {self.__name__}!")
-
-        self.event_queues[event_name].put(args)  # will block until a slot is available
-
-    def handle(self, event_name: str, *args) -> Any:
-        """Calls a handler for a specific event if existing, passing it arguments.
-
-        Args:
-            event_name (str): the event to trigger.
+            HandlerMissingException: if no handler is registered for the event, while it is a necessary handler.
 
         Returns:
-            Any: whatever the handler, if existing, returns 
+            Any: whatever the handler, if existing, returns
         """
-        self._register(event_name, *args)
+        if event_name not in self.event_names:
+            raise ValueError(f"{event_name} is not a valid event name for {type(self).__name__}!")
+
+        result = None
+        handler = self.handlers.get(event_name, None)
+        if handler is not None:
+            with tracing.span("handle", event=event_name, emitter=type(self).__name__):
+                result = handler(self, *args)
+        elif event_name in self.min_handler_names:
+            raise HandlerMissingException(f"{type(self).__name__} must have the following handlers: {self.min_handler_names}")
 
+        # only take the lock if some thread is waiting for this event
         if self.waiting_threads[event_name] > 0:
-            time.sleep(1e-12)  # pass the handle to the waiting thread
+            with self._event_condition:
+                count, _ = self.event_results[event_name]
+                self.event_results[event_name] = (count + 1, result)
+                self._event_condition.notify_all()
 
-        return self.wait(event_name, timeout=0)
+        return result
 
     def set_handler(self, handler_type: str, handler: Callable):
         """Sets a callable as an event handler.
@@ -69,26 +78,68 @@ class EventHandler():
 
         Raises:
             ValueError: if event_name is not a valid event name for this handler.
-            HandlerMissingException: if no handler is registered for the event, while it is a necessary handler.
 
         Returns:
-            Any: whatever the handler returns.
+            Any: whatever the handler returns, or None if the event wasn't triggered within the timeout window.
         """
         if event_name not in self.event_names:
-            raise ValueError(f"{event_name} is not a valid event name for {self.__name__}!")
+            raise ValueError(f"{event_name} is not a valid event name for {type(self).__name__}!")
+
+        with self._event_condition:
+            self.waiting_threads[event_name] += 1  # notify other threads that we are listening for this event
+            try:
+                count, _ = self.event_results[event_name]
+                if not self._event_condition.wait_for(lambda: self.event_results[event_name][0] != count, timeout):
+                    return  # event not triggered within the timeout window
+
+                return self.event_results[event_name][1]
+            finally:
+                self.waiting_threads[event_name] -= 1  # we are no longer listening for this event
 
-        self.waiting_threads[event_name] += 1  # notify other threads that we are listening for this event
 
-        block = timeout is None or timeout > 0
-        try:
-            args = self.event_queues[event_name].get(block=block, timeout=timeout)
-        except queue.Empty:
-            return  # no item in the queue within the timeout window
-        finally:
-            self.waiting_threads[event_name] -= 1  # we are no longer listening for this event
+class AsyncEventHandler():
+    """Super class that registers and handle events for asyncio objects, such as AsyncPeer and AsyncConnection.
+    Handlers can either be regular callables or coroutine functions."""
+
+    def __init__(self, event_names: List[str], handlers: Dict[str, Callable[[Any], Any]], min_handler_names: List[str] = None):
+        if min_handler_names is None:
+            min_handler_names = []
+
+        self.event_names = event_names
+        self.handlers = handlers
+        self.min_handler_names = min_handler_names
+
+    async def handle(self, event_name: str, *args) -> Any:
+        """Calls a handler for a specific event if existing, passing it arguments, and awaits it if needed.
+
+        Args:
+            event_name (str): the event to trigger.
+
+        Raises:
+            ValueError: if event_name is not a valid event name for this handler.
+            HandlerMissingException: if no handler is registered for the event, while it is a necessary handler.
+
+        Returns:
+            Any: whatever the handler, if existing, returns
+        """
+        if event_name not in self.event_names:
+            raise ValueError(f"{event_name} is not a valid event name for {type(self).__name__}!")
 
         handler = self.handlers.get(event_name, None)
         if handler is not None:
-            return handler(self, *args)
+            result = handler(self, *args)
+            if inspect.isawaitable(result):
+                result = await result
+
+            return result
         elif event_name in self.min_handler_names:
-            raise HandlerMissingException(f"{self.__name__} must have the following handlers: {self.min_handler_names}")
+            raise HandlerMissingException(f"{type(self).__name__} must have the following handlers: {self.min_handler_names}")
+
+    def set_handler(self, handler_type: str, handler: Callable):
+        """Sets a callable or a coroutine function as an event handler.
+
+        Args:
+            handler_type (str): the event name.
+            handler (Callable): the handler to be called when event is triggered.
+        """
+        self.handlers[handler_type] = handler
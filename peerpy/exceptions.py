@@ -16,3 +16,23 @@ class HeaderSizeError(Exception):
 class DataSizeError(Exception):
     """Raised the data size doesn't correspond to the connection's data size."""
     pass
+
+
+class FrameError(Exception):
+    """Raised when a binary frame header is corrupted or of an unsupported version."""
+    pass
+
+
+class FrameSizeError(FrameError):
+    """Raised when a frame announces more data than the receiving peer accepts."""
+    pass
+
+
+class SendQueueFullError(Exception):
+    """Raised when a connection's send queue is full and its policy is to raise."""
+    pass
+
+
+class RemoteError(Exception):
+    """Raised when a request failed on the remote peer, e.g. its method raised an exception or is not registered."""
+    pass
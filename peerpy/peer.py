@@ -3,20 +3,30 @@ import time
 import socket
 import threading
 
-from typing import Tuple, List, Any, Dict
+from concurrent.futures import ThreadPoolExecutor, wait
 
+from typing import Tuple, List, Any, Dict, Callable
+
+from .data import Data
 from .connection import Connection
+from .reactor import Reactor
+from .discovery import Discovery
+from .timer_wheel import TimerWheel
+from .dispatcher import create_executor
+from .compression import valid_compressions
+from .stats import ConnectionStats
 from .event_handler import EventHandler
-from .protocol import headers, defaults
-from .exceptions import DataTypeError, DataSizeError
-from .utils import get_local_ip, check_address, build_hello_header, build_header, split_header
+from .protocol import headers, frames, defaults, pinger_port, announce_group, announce_port
+from .exceptions import DataTypeError, DataSizeError, SendQueueFullError, HeaderSizeError
+from .utils import get_local_ip, check_address, build_hello_header, build_header, split_header, receive_exactly
+from .utils import buffers_size
 
 
 class Peer(EventHandler):
 
     def __init__(self, address: str = None, port: int = 0, **kwargs):
         handlers = {**defaults.peer_handlers, **dict(kwargs.get("handlers", {}))}
-        super().__init__(["listen", "offer", "connection", "stop"], handlers)
+        super().__init__(["listen", "offer", "connection", "stop", "discovered", "lost"], handlers)
 
         if address is None:
             address = get_local_ip()
@@ -33,9 +43,69 @@ class Peer(EventHandler):
         self._server_active = False
         self.max_connections = int(kwargs.get("max_connections", 0))
         self.buffer_size = float(kwargs.get("buffer_size", defaults.buffer_size))
-
-        self.server_thread = threading.Thread(target=self._listen_offers)
+        # connections whose remote peer announces larger data are closed
+        self.max_data_size = int(kwargs.get("max_data_size", defaults.max_data_size))
+        self.broadcast_workers = int(kwargs.get("broadcast_workers", defaults.broadcast_workers))
+        self._broadcast_executor = None
+        # counters of the connections already closed
+        self.closed_stats = ConnectionStats()
+
+        # runs the data handlers of this peer's connections (None for inline)
+        self.executor = create_executor(kwargs.get("executor", defaults.executor))
+        self.max_pending = int(kwargs.get("max_pending", defaults.max_pending))
+        # methods answering the requests received over every connection of this peer
+        self.methods = {}
+        # default conflation of the data received and sent by this peer's connections
+        self.conflate = bool(kwargs.get("conflate", False))
+        self.conflate_sends = bool(kwargs.get("conflate_sends", False))
+        # default batching of the data sent by this peer's connections, and TCP_NODELAY (None for the system's default)
+        self.batch_window = float(kwargs.get("batch_window", defaults.batch_window))
+        self.batch_bytes = int(kwargs.get("batch_bytes", defaults.batch_bytes))
+        self.nodelay = kwargs.get("nodelay", defaults.nodelay)
+        # whether connections to peers on the same host propose to exchange data through shared memory
+        self.shared_memory = bool(kwargs.get("shared_memory", defaults.shared_memory))
+        self.shared_memory_size = int(kwargs.get("shared_memory_size", defaults.shared_memory_size))
+
+        # heartbeats are sent over connections idle for heartbeat_interval seconds, and connections which received
+        # nothing for dead_timeout seconds are closed, both scheduled on a single timer wheel
+        self._heartbeat_interval = kwargs.get("heartbeat_interval", defaults.heartbeat_interval)
+        dead_timeout = kwargs.get("dead_timeout", defaults.dead_timeout)
+        self.dead_timeout = float(dead_timeout) if dead_timeout is not None else None
+        # a connection would be closed before its remote peer even had to send a heartbeat
+        if self.dead_timeout is not None and self.dead_timeout < self.heartbeat_interval:
+            self.server.close()
+            raise ValueError(f"Dead timeout should be >= the heartbeat interval ({self.heartbeat_interval}) "
+                             f"(Received {self.dead_timeout})!")
+        self.timers = TimerWheel(float(kwargs.get("timer_tick", defaults.timer_tick)))
+        # kernel TCP keepalive (idle, interval, count) set on every connection's socket, if enabled
+        self.keepalive = (
+            float(kwargs.get("keepalive_idle", defaults.keepalive_idle)),
+            float(kwargs.get("keepalive_interval", defaults.keepalive_interval)),
+            int(kwargs.get("keepalive_count", defaults.keepalive_count))
+        ) if kwargs.get("keepalive", defaults.keepalive) else None
+
+        # in reactor mode, the server thread also drives every connection
+        self.reactor = Reactor(self, int(kwargs.get("workers", 0))) if kwargs.get("reactor", False) else None
+        self.server_thread = threading.Thread(target=self._listen_offers if self.reactor is None else self.reactor.run)
         self.pinger_thread = threading.Thread(target=self._listen_pings)
+        self.pinger_port = int(kwargs.get("pinger_port", pinger_port))
+        # keeps the peers visible on the local network known in the background, if enabled
+        # discovery is either a boolean or the discovery mode, one of ["ping", "announce"]
+        discovery = kwargs.get("discovery", False)
+        try:
+            # will raise ValueError if the discovery settings are invalid
+            self.discovery = Discovery(
+                self, self.pinger_port,
+                interval=float(kwargs.get("discovery_interval", defaults.discovery_interval)),
+                ttl=float(kwargs.get("discovery_ttl", defaults.discovery_ttl)),
+                mode=discovery if isinstance(discovery, str) else defaults.discovery_mode,
+                group=kwargs.get("announce_group", announce_group),
+                group_port=int(kwargs.get("announce_port", announce_port))
+            )
+        except ValueError:
+            self.server.close()
+            raise
+        self._discover = bool(discovery)
         # needs to be after pinger_thread because checks the pinger_thread state
         self.invisible = bool(kwargs.get("invisible", False))
 
@@ -75,6 +145,43 @@ class Peer(EventHandler):
         """
         self.server.settimeout(timeout)
 
+        # so that connections don't have to check whether it changed
+        for connection in list(self.connections.values()):
+            try:
+                connection.sock.settimeout(timeout)
+            except OSError:
+                # the connection's socket was already closed
+                pass
+
+    @property
+    def heartbeat_interval(self) -> float:
+        """How long a connection must have sent nothing before a heartbeat is sent over it
+
+        Returns:
+            float: the heartbeat interval, in seconds, which is this peer's timeout unless set
+        """
+        if self._heartbeat_interval is None:
+            return self.timeout
+
+        return float(self._heartbeat_interval)
+
+    @heartbeat_interval.setter
+    def heartbeat_interval(self, heartbeat_interval: float):
+        """Sets how long a connection must have sent nothing before a heartbeat is sent over it
+
+        Args:
+            heartbeat_interval (float): the heartbeat interval, in seconds, or None to use this peer's timeout
+
+        Raises:
+            ValueError: if the heartbeat interval is longer than this peer's dead timeout.
+        """
+        interval = float(heartbeat_interval) if heartbeat_interval is not None else self.timeout
+        if self.dead_timeout is not None and self.dead_timeout < interval:
+            raise ValueError(f"Dead timeout ({self.dead_timeout}) should be >= the heartbeat interval "
+                             f"(Received {interval})!")
+
+        self._heartbeat_interval = heartbeat_interval
+
     @property
     def invisible(self) -> bool:
         """Whether this peer is invisible to other peers on the same local network
@@ -109,6 +216,32 @@ class Peer(EventHandler):
             data_type (str, optional): the data type to use for the connection. Defaults to "raw".
             strict (bool, optional): whether this connection is strict on data types. Defaults to True.
             buffer_size (int, optional): the buffer size to use to receive data. Defaults to this peer's buffer size.
+            framing (str, optional): the framing to propose to the remote peer, which falls back to text headers
+            if it doesn't support it. Defaults to "binary".
+            ring_size (int, optional): the number of buffers data is received into in turn, for data types receiving
+            in place (e.g. "ndarray") and handled inline. Defaults to 4.
+            compression (str, optional): the compression algorithm to propose to the remote peer
+            (one of ["zlib", "lzma", "bz2"]). Defaults to None.
+            compression_level (int, optional): the compression level. Defaults to 6.
+            compression_threshold (int, optional): the size, in bytes, from which data is compressed. Defaults to 1024.
+            zdict (Union[bytes, str], optional): the preset dictionary to propose, or its id if it was registered.
+            Only used with zlib, and if the remote peer registered the same dictionary. Defaults to None.
+            conflate (bool, optional): whether the data handler is only passed the latest data received, data received
+            while it is busy replacing the data still waiting for it without being decoded. Defaults to this peer's.
+            conflate_sends (bool, optional): whether data sent replaces the data still waiting to be sent, through a
+            send queue. Defaults to this peer's.
+            batch_window (float, optional): how long data sent waits for more data to be written along with it,
+            in seconds, through a send queue. 0 sends data on its own. Defaults to this peer's.
+            batch_bytes (int, optional): the size from which a batch is written without waiting for the end of its
+            window. Defaults to this peer's.
+            nodelay (bool, optional): whether to set TCP_NODELAY on the connection's socket, None keeping the system's
+            default. Defaults to this peer's.
+            shared_memory (bool, optional): whether to propose exchanging data through shared memory rings, if the
+            remote peer is on the same host. Not supported in reactor mode. Defaults to this peer's.
+            shared_memory_size (int, optional): the capacity of each direction's ring, in bytes. Defaults to this peer's.
+
+        Raises:
+            ValueError: if compression is not one of the valid compressions.
 
         Returns:
             Connection: the connection, if established
@@ -125,94 +258,213 @@ class Peer(EventHandler):
             else:
                 return connection
 
+        # arguments are checked before connecting, so that the remote peer is never left with a half-open connection
+        compression = kwargs.get("compression", defaults.compression)
+        if compression is not None and compression not in valid_compressions:
+            raise ValueError(f"compression must be one of {valid_compressions}")
+
         # TODO: use create_connection for ipv4 + ipv6 ??
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.settimeout(self.timeout)
         try:
             sock.connect(address)
-        except socket.timeout:
+        except (socket.timeout, ConnectionRefusedError):
+            sock.close()
             return False
 
         buffer_size = int(kwargs.get("buffer_size", self.buffer_size))
-        # will raise ValueError if stream and data_size are incompatible
-        # will parse kwargs to their right properties
-        connection = Connection(
-            self, address_name, sock, buffer_size,
-            data_type=data_type,
-            strict=strict,
-            **kwargs
-        )
-
-        header = build_hello_header(
-            self.address_name,
-            data_type,
-            strict,
-            stream=connection.stream
-        )
-
+        framing = kwargs.pop("framing", defaults.framing)
         try:
-            sock.sendall(header)
-            header = sock.recv(headers.size).decode("utf-8")
-        except (socket.timeout, ConnectionAbortedError, UnicodeDecodeError):
-            # UnicodeDecodeError: data received is corrupted, don't process it
+            # will raise ValueError if stream and data_size are incompatible
+            # will parse kwargs to their right properties
+            connection = Connection(
+                self, address_name, sock, buffer_size,
+                data_type=data_type,
+                strict=strict,
+                initiator=True,
+                **kwargs
+            )
+        except Exception:
             sock.close()
+            raise
+
+        # peers on the same host may exchange data through shared memory instead of the loopback TCP stack
+        segment = None
+        if kwargs.get("shared_memory", self.shared_memory) and self.reactor is None \
+                and sock.getpeername()[0] == sock.getsockname()[0]:
+            # multiprocessing is only imported when shared memory is used
+            from . import shared_ring
+            if shared_ring.supported:
+                segment = shared_ring.create_segment(self.address_name,
+                                                     int(kwargs.get("shared_memory_size", self.shared_memory_size)))
+
+        try:
+            hello = dict(
+                stream=connection.stream,
+                framing=framing,
+                compression=connection.compressor.algorithm if connection.compressor is not None else None,
+                zdict=connection.compressor.zdict_id if connection.compressor is not None else None
+            )
+            try:
+                header = build_hello_header(self.address_name, data_type, strict,
+                                            shared_memory=segment.name if segment is not None else None, **hello)
+            except HeaderSizeError:
+                if segment is None:
+                    raise
+
+                # no room left in the header to propose shared memory
+                shared_ring.unlink_segment(segment)
+                segment.close()
+                segment = None
+                header = build_hello_header(self.address_name, data_type, strict, **hello)
+
+            try:
+                sock.sendall(header)
+                header = str(receive_exactly(sock, headers.size), "utf-8")
+            except (socket.timeout, ConnectionAbortedError, ConnectionResetError, BrokenPipeError, UnicodeDecodeError):
+                # UnicodeDecodeError: data received is corrupted, don't process it
+                sock.close()
+                header = ""
+        finally:
+            if segment is not None:
+                # the remote peer mapped the segment before answering (or declined it): it can be unlinked already,
+                # even if the handshake raised, so that it never outlives this connection attempt
+                shared_ring.unlink_segment(segment)
+
+        if segment is not None:
+            if header.startswith(headers.accept_header) and split_header(header).get("shm") == segment.name:
+                connection.sock = shared_ring.SharedMemorySocket(sock, segment, initiator=True)
+            else:
+                segment.close()
+
+        if header == "":
             return False
 
         # only check if header is ACCEPT, otherwise cancel connection
         if header.startswith(headers.accept_header):
-            self.connections[address_name] = connection
-            connection.start_thread()
+            # the remote peer only answers with the framing, compression and preset dictionary it agrees on
+            accept = split_header(header)
+            connection.framing = accept.get("framing", frames.text_framing)
+            if connection.compressor is not None:
+                if accept.get("compression") != connection.compressor.algorithm:
+                    connection.compressor = None
+                elif accept.get("zdict") != connection.compressor.zdict_id:
+                    connection.compressor.zdict = None
 
+            self.connections[address_name] = connection
+            # handlers are set before any data is received
             self.handle("connection", connection)
+
+            connection.start_thread()
         else:
             sock.close()
 
         return self.connections.get(address_name, False)
 
-    def get_local_peers(self) -> List[str]:
+    def register_method(self, name: str, method: Callable[[Connection, Any], Any]):
+        """Registers a method answering the requests received over every connection of this peer, unless the connection
+        registered a method of the same name. The method is passed the connection and the request's payload,
+        and returns the response (or a future of it).
+
+        Args:
+            name (str): the name requests call the method by.
+            method (Callable[[Connection, Any], Any]): the method.
+        """
+        self.methods[name] = method
+
+    def get_local_peers(self, refresh: bool = False, timeout: float = .5) -> List[str]:
         """Returns the list of peers visible on the same local network.
+        If the discovery service is running, peers known are returned at once, otherwise the local network is pinged
+        and answers are waited for.
+
+        Args:
+            refresh (bool, optional): whether to ping the local network even if the discovery service is running.
+            Defaults to False.
+            timeout (float, optional): how long to wait for answers when pinging, in seconds. Defaults to .5.
 
         Returns:
             List[str]: the list of visible peers' addresses
         """
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            sock.settimeout(.5)
+        if self.discovery.active and not refresh:
+            return self.discovery.peers()
+
+        return self.discovery.ping(timeout)
 
-            sock.bind((get_local_ip(), 1024))
+    def broadcast(self, data: Any, timeout: float = None) -> List[str]:
+        """Broadcasts data to all the connected peers.
+        Data is encoded once per data type (and compressed once per data type and compression settings) and sent to
+        every connection concurrently, so that a slow remote peer doesn't delay the others.
 
-            address, port = sock.getsockname()
-            ping_header = build_header(headers.ping_header, {"pinger": f"{address}:{port}"})
-            sock.sendto(ping_header, ("<broadcast>", 1024))
+        Args:
+            data (Any): the data to broadcast
+            timeout (float, optional): how long maximum to wait for each connection to send data, in seconds.
+            Defaults to this peer's timeout.
 
-            addresses = []
-            while True:
+        Returns:
+            List[str]: the names of the connections data couldn't be sent to within the timeout. A connection gives up
+            sending once the timeout is over: data it couldn't send at all is dropped, while a connection which
+            could only send part of it is closed
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        failed = []
+        encoded = {}
+        header_cache = {}
+        compressed_cache = {}
+        targets = []
+        for connection in list(self.connections.values()):
+            # encode data once for all the connections sharing a same data type
+            if connection.data_type not in encoded:
                 try:
-                    pong_header = sock.recv(headers.size).decode("utf-8")
-                except (socket.timeout, UnicodeDecodeError):
-                    # UnicodeDecodeError: data received is corrupted, don't process it
-                    break
+                    encoded[connection.data_type] = Data(connection.data_type, decoded_data=data).encode()
+                except DataTypeError:
+                    encoded[connection.data_type] = None
 
-                if pong_header.startswith(headers.pong_header):
-                    pong_header = split_header(pong_header)
+            if encoded[connection.data_type] is None:
+                failed.append(connection.target_name)
+                continue
 
-                    if pong_header["ponger"] != self.address_name:
-                        addresses.append(pong_header["ponger"])
+            targets.append(connection)
+            # compressed before sending concurrently, so that the connections sharing the same compression settings
+            # find it compressed already
+            connection._compress(list(encoded[connection.data_type]), buffers_size(encoded[connection.data_type]),
+                                 compressed_cache)
 
-        return addresses
+        def send(connection: Connection) -> bool:
+            try:
+                return connection._submit_encoded(encoded[connection.data_type], header_cache, deadline,
+                                                  compressed_cache)
+            except (DataSizeError, SendQueueFullError):
+                return False
+
+        if len(targets) <= 1:
+            # not worth a context switch
+            sent = {connection: send(connection) for connection in targets}
+        else:
+            if self._broadcast_executor is None:
+                self._broadcast_executor = ThreadPoolExecutor(
+                    max_workers=self.broadcast_workers, thread_name_prefix="broadcast")
 
-    def broadcast(self, data: Any):
-        """Broadcasts data to all the connected peers.
+            # every send gives up at the deadline, so that a stuck remote peer never holds a worker for longer
+            futures = {connection: self._broadcast_executor.submit(send, connection) for connection in targets}
+            wait(futures.values())
 
-        Args:
-            data (Any): the data to broadcast
+            sent = {connection: future.result() for connection, future in futures.items()}
+
+        return failed + [connection.target_name for connection, success in sent.items() if not success]
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the counters of every connection of this peer summed, including connections already closed.
+
+        Returns:
+            Dict[str, Any]: the number of open connections and the aggregated counters (see Connection.stats)
         """
-        for connection in self.connections.values():
-            try:
-                connection.send(data)
-            except (DataTypeError, DataSizeError):
-                continue
+        connections = list(self.connections.values())
+        total = ConnectionStats.aggregate([self.closed_stats] + [connection.counters for connection in connections])
+
+        return {"connections": len(connections), **total.to_dict()}
 
     def start(self):
         """Attempts to start this peer's server and pinger (if needed)."""
@@ -223,6 +475,9 @@ class Peer(EventHandler):
             if not self.invisible:
                 self.pinger_thread.start()
 
+            if self._discover:
+                self.discovery.start()
+
     def stop(self, _async=False):
         """Attempts to stop this peer and all its connections.
 
@@ -230,19 +485,39 @@ class Peer(EventHandler):
             _async (bool, optional): whether to stop this peer asynchronously. Defaults to False.
         """
         self._server_active = False
+        self.discovery.stop()
+        self.timers.stop()
+        if self.reactor is not None:
+            self.reactor.wakeup()
 
         connections = list(self.connections.values())
         for connection in connections:
             connection.close()
 
+        if self._broadcast_executor is not None:
+            self._broadcast_executor.shutdown(wait=_async)
+            self._broadcast_executor = None
+
+        if self.executor is not None:
+            # remaining handlers are run inline by the connections' dispatchers
+            self.executor.shutdown(wait=_async)
+
         if _async:
             for connection in connections:
-                connection.thread.join()
+                # connections driven by a reactor have no thread of their own
+                if connection.thread.is_alive():
+                    connection.thread.join()
+                if connection.writer_thread is not None and connection.writer_thread.is_alive():
+                    connection.writer_thread.join()
 
             if self.server_thread.is_alive():
                 self.server_thread.join()
             if self.pinger_thread.is_alive():
                 self.pinger_thread.join()
+            if self.discovery.thread.is_alive():
+                self.discovery.thread.join()
+            if self.timers.thread is not None and self.timers.thread.is_alive():
+                self.timers.thread.join()
 
     def _handle_offer(self, offer_header: str, sock: socket.socket) -> bool:
         """Handles an offer received from a peer.
@@ -261,21 +536,49 @@ class Peer(EventHandler):
             return False
 
         peer_name = header["peer_name"]
+        # local settings (executor, send queue, batching, chunk size...) are never chosen by the remote peer
+        negotiated = {key: header[key] for key in headers.negotiated_hello_fields if key in header}
 
-        connection = Connection(
-            self, peer_name, sock, self.buffer_size,
-            **header
-        )
+        try:
+            connection = Connection(
+                self, peer_name, sock, self.buffer_size,
+                **negotiated
+            )
+        except ValueError:
+            # the data type proposed is not supported by this peer
+            connection = None
 
         try:
-            if self.handle("offer", connection):
-                accept = build_header(headers.accept_header, {})
+            if connection is not None and self.handle("offer", connection):
+                accept_contents = {}
+                if connection.binary_framing:
+                    # so that the other peer knows we agree on binary framing
+                    accept_contents["framing"] = connection.framing
+
+                if connection.compressor is not None and connection.binary_framing:
+                    # compression is flagged in binary frame headers only
+                    accept_contents["compression"] = connection.compressor.algorithm
+                    if connection.compressor.zdict_id is not None:
+                        accept_contents["zdict"] = connection.compressor.zdict_id
+                else:
+                    connection.compressor = None
+
+                # the reactor waits for the socket only, not for the shared memory rings
+                if "shm" in header and self.reactor is None:
+                    from . import shared_ring
+                    segment = shared_ring.attach_segment(header["shm"], peer_name) if shared_ring.supported else None
+                    if segment is not None:
+                        accept_contents["shm"] = header["shm"]
+                        connection.sock = shared_ring.SharedMemorySocket(sock, segment, initiator=False)
+
+                accept = build_header(headers.accept_header, accept_contents)
                 sock.sendall(accept)
 
                 self.connections[peer_name] = connection
-                connection.start_thread()
-
+                # handlers are set before any data is received
                 self.handle("connection", connection)
+
+                connection.start_thread()
                 return True
             else:
                 deny = build_header(headers.deny_header, {})
@@ -284,7 +587,8 @@ class Peer(EventHandler):
             # sock.sendall raised ConnectionAbortedError: connection is lost
             pass
 
-        sock.close()
+        # also unmaps the shared memory segment, if it was mapped
+        (connection.sock if connection is not None else sock).close()
         return False
 
     def _listen_pings(self):
@@ -295,7 +599,7 @@ class Peer(EventHandler):
             pinger.settimeout(.5)
 
             # will raise EADDRINUSE error if 2 peers are from the same device on Windows
-            pinger.bind(("", 1024))
+            pinger.bind(("", self.pinger_port))
 
             while self._server_active and not self.invisible:
                 try:
@@ -312,6 +616,29 @@ class Peer(EventHandler):
                     pong_header = build_header(headers.pong_header, {"ponger": self.address_name})
                     pinger.sendto(pong_header, (address, int(port)))
 
+    def _accept_offer(self):
+        """Accepts a pending connection request and handles the offer it carries."""
+        try:
+            # will block until offer received AND accepted or socket timeout
+            sock, peer_address = self.server.accept()
+        except socket.timeout:
+            # no offer received within timeout seconds
+            return
+
+        sock.settimeout(self.timeout)
+
+        try:
+            # will block until a hello header is received
+            header = str(receive_exactly(sock, headers.size), "utf-8")
+        except (socket.timeout, UnicodeDecodeError, ConnectionAbortedError, ConnectionResetError):
+            # socket.timeout: no offer received within timeout seconds, we cancel the connection
+            # data received is corrupted, don't process it
+            sock.close()
+            return
+
+        if header.startswith(headers.hello_header):
+            self._handle_offer(header, sock)
+
     def _listen_offers(self):
         """Starts this peer's server, used to listen for connection requests."""
         self.server.listen()
@@ -322,26 +649,7 @@ class Peer(EventHandler):
                 time.sleep(self.timeout)
                 continue
 
-            try:
-                # will block until offer received AND accepted or socket timeout
-                sock, peer_address = self.server.accept()
-            except socket.timeout:
-                # no offer received within timeout seconds
-                continue
-
-            sock.settimeout(self.timeout)
-
-            try:
-                # will block until a hello header is received
-                header = sock.recv(headers.size).decode("utf-8")
-            except (socket.timeout, UnicodeDecodeError, ConnectionAbortedError):
-                # socket.timeout: no offer received within timeout seconds, we cancel the connection
-                # data received is corrupted, don't process it
-                sock.close()
-                continue
-
-            if header.startswith(headers.hello_header):
-                self._handle_offer(header, sock)
+            self._accept_offer()
 
         self.server.close()
         self.handle("stop")
@@ -16,31 +16,102 @@ class Headers():
     deny_header: str = "DENY"
     ping_header: str = "PING"
     pong_header: str = "PONG"
+    announce_header: str = "ANNOUNCE"
+    channel_header: str = "CHANNEL"
 
     data_types_parsers: Dict[str, Callable] = field(default_factory=dict)
     required_hello_fields: List[str] = field(default_factory=list)
+    # the only fields of a hello header the remote peer negotiates, any other setting being the accepting peer's own
+    negotiated_hello_fields: List[str] = field(default_factory=list)
     required_data_fields: List[str] = field(default_factory=list)
 
 
+@dataclass
+class Frames():
+
+    magic: bytes = b"PP"
+    version: int = 1
+    # magic, version, frame type, flags, data type, channel, data size
+    layout: str = "!2sBBBBHQ"
+
+    text_framing: str = "text"
+    binary_framing: str = "binary"
+
+    data_frame: int = 0
+    ping_frame: int = 1
+    open_frame: int = 2
+    close_frame: int = 3
+    # a transfer is a begin frame, any number of chunk frames and an end frame, whose channel field holds its id
+    begin_frame: int = 4
+    chunk_frame: int = 5
+    end_frame: int = 6
+    # a request frame's channel field holds the request's id, echoed by the response or error frame answering it
+    request_frame: int = 7
+    response_frame: int = 8
+    error_frame: int = 9
+
+    # frame flags
+    compressed_flag: int = 1
+
+
 @dataclass
 class Defaults():
 
     buffer_size: int = int(2 ** 13)
+    framing: str = "binary"
     timeout: float = 2
+    broadcast_workers: int = 8
+    send_queue_size: int = 0
+    send_policy: str = "block"
+    executor: str = "inline"
+    max_pending: int = 64
+    ring_size: int = 4
+    compression: str = None
+    compression_level: int = 6
+    compression_threshold: int = 1024
+    chunk_size: int = int(2 ** 18)
+    # the largest data a header can announce, which is allocated before it is received
+    max_data_size: int = int(2 ** 28)
+    discovery_interval: float = 1.
+    discovery_ttl: float = 5.
+    discovery_mode: str = "ping"
+    # None to send heartbeats after the peer's timeout, and to never consider a remote peer dead
+    heartbeat_interval: float = None
+    dead_timeout: float = None
+    keepalive: bool = False
+    keepalive_idle: float = 60.
+    keepalive_interval: float = 10.
+    keepalive_count: int = 5
+    timer_tick: float = .1
+    # 0 to send data on its own, instead of batching the data sent within the window
+    batch_window: float = 0.
+    batch_bytes: int = int(2 ** 16)
+    batch_queue_size: int = 1024
+    nodelay: bool = None
+    shared_memory: bool = False
+    # capacity of each direction's ring, in bytes
+    shared_memory_size: int = int(2 ** 22)
     peer_handlers: Dict[str, Callable] = field(default_factory=dict)
     connection_handlers: Dict[str, Callable] = field(default_factory=dict)
 
 
 pinger_port: int = 1024
+# presence beacons of the announce discovery mode are multicast to this (administratively scoped) group
+announce_group: str = "239.255.80.80"
+announce_port: int = 1025
 headers = Headers(
     data_types_parsers={
         "data_size": int,
         "buffer_size": int,
-        "strict": bool
+        "strict": lambda value: value == "True",
+        "load": int,
+        "data_types": lambda value: value.split(",") if len(value) > 0 else []
     },
     required_hello_fields=["peer_name", "data_type", "strict"],
+    negotiated_hello_fields=["data_type", "strict", "stream", "data_size", "framing", "compression", "zdict"],
     required_data_fields=["data_type", "data_size"]
 )
+frames = Frames()
 defaults = Defaults(peer_handlers={
     "listen": lambda peer: print(f"Peer listening for connections on {peer.address_name}!"),
     "offer": lambda peer, connection: True,
@@ -0,0 +1,278 @@
+import time
+import queue
+import socket
+import selectors
+import threading
+import traceback
+
+from .protocol import headers
+
+
+class HandlerWorker():
+    """Thread consuming tasks from its own queue, so that tasks submitted to a same worker keep their order."""
+
+    def __init__(self):
+        self.tasks = queue.Queue()
+        self.thread = threading.Thread(target=self._work, daemon=True)
+
+    def submit(self, task, *args):
+        """Queues a task to be executed by this worker.
+
+        Args:
+            task (Callable): the callable to execute.
+        """
+        self.tasks.put((task, args))
+
+    def stop(self):
+        """Stops this worker once every task already queued is executed."""
+        self.tasks.put(None)
+
+    def _work(self):
+        while True:
+            item = self.tasks.get()
+            if item is None:
+                return
+
+            task, args = item
+            try:
+                task(*args)
+            except Exception:
+                # a failing task must not stop the tasks of other connections bound to this worker
+                traceback.print_exc()
+
+
+class PendingOffer():
+    """Socket accepted by a reactor, whose HELLO header is received without blocking before it is handed to the peer."""
+
+    def __init__(self, sock: socket.socket, timeout: float):
+        self.sock = sock
+        self.header = memoryview(bytearray(headers.size))
+        self.received = 0
+        # the offer is dropped if its header isn't received in time, as a blocking socket would time out
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+
+
+class Reactor():
+    """Drives a peer's server socket and all its connections from a single selectors-based loop,
+    instead of one thread per socket. Handlers are either called from the reactor's thread, or from a small pool
+    of workers: every connection is bound to one worker, so that its events are handled in order."""
+
+    def __init__(self, peer, workers: int = 0):
+        self.peer = peer
+        self.selector = selectors.DefaultSelector()
+        self.workers = [HandlerWorker() for _ in range(int(workers))]
+
+        # connections are registered by the reactor's thread only
+        self.pending = queue.Queue()
+        self.connections = set()
+        # accepted sockets whose HELLO header is still being received
+        self.offers = set()
+
+        # used to wake up the reactor's thread from other threads
+        self._waker, self._wakee = socket.socketpair()
+        self._wakee.setblocking(False)
+
+    def register(self, connection):
+        """Registers a connection to be driven by this reactor.
+
+        Args:
+            connection (Connection): the connection to drive.
+        """
+        self.pending.put(connection)
+        self.wakeup()
+
+    def wakeup(self):
+        """Wakes the reactor's thread up, so that it processes registrations and closed connections."""
+        try:
+            self._waker.send(b"\0")
+        except OSError:
+            # the reactor was already stopped, or its wakeup buffer is full
+            pass
+
+    def _worker(self, connection) -> HandlerWorker:
+        return self.workers[connection.sock.fileno() % len(self.workers)] if len(self.workers) > 0 else None
+
+    def _dispatch(self, connection, task, *args):
+        """Calls task from the worker bound to connection, or inline if there is no worker.
+
+        Args:
+            connection (Connection): the connection the task relates to.
+            task (Callable): the callable to execute.
+        """
+        worker = self._worker(connection)
+        if worker is None:
+            task(*args)
+        else:
+            worker.submit(task, *args)
+
+    def _handle_data(self, connection, data):
+        connection._dispatch_data(data)
+
+    def _register_pending(self):
+        while True:
+            try:
+                connection = self.pending.get_nowait()
+            except queue.Empty:
+                return
+
+            self.connections.add(connection)
+            self.selector.register(connection.sock, selectors.EVENT_READ, connection)
+
+    def _release(self, connection):
+        """Unregisters a closed connection and terminates it, after its pending handlers.
+
+        Args:
+            connection (Connection): the closed connection.
+        """
+        # the worker bound to the connection is computed before the socket is closed
+        worker = self._worker(connection)
+
+        self.selector.unregister(connection.sock)
+        self.connections.discard(connection)
+
+        if worker is None:
+            connection._terminate()
+        else:
+            worker.submit(connection._terminate)
+
+    def _accept(self):
+        """Accepts a connection request, whose HELLO header is then received as the socket becomes readable."""
+        try:
+            sock, _ = self.peer.server.accept()
+        except (BlockingIOError, socket.timeout):
+            # the connection request was withdrawn meanwhile
+            return
+
+        sock.settimeout(self.peer.timeout)
+        offer = PendingOffer(sock, self.peer.timeout)
+        self.offers.add(offer)
+        self.selector.register(sock, selectors.EVENT_READ, offer)
+
+    def _receive_offer(self, offer: PendingOffer):
+        """Receives what is available of an offer's HELLO header with a single call to its readable socket, and hands the
+        offer to the peer once the header is complete.
+
+        Args:
+            offer (PendingOffer): the offer being received.
+        """
+        try:
+            nbytes = offer.sock.recv_into(offer.header[offer.received:])
+            if nbytes == 0:
+                raise ConnectionResetError("Connection was closed by the remote peer.")
+        except (BlockingIOError, socket.timeout):
+            return
+        except OSError:
+            self._drop_offer(offer)
+            return
+
+        offer.received += nbytes
+        if offer.received < len(offer.header):
+            return
+
+        self._drop_offer(offer, close=False)
+        try:
+            header = str(offer.header, "utf-8")
+        except UnicodeDecodeError:
+            # data received is corrupted, don't process it
+            header = ""
+
+        if not header.startswith(headers.hello_header):
+            offer.sock.close()
+            return
+
+        try:
+            self.peer._handle_offer(header, offer.sock)
+        except Exception:
+            # a failing offer must not stop the reactor
+            traceback.print_exc()
+            offer.sock.close()
+
+    def _drop_offer(self, offer: PendingOffer, close: bool = True):
+        self.selector.unregister(offer.sock)
+        self.offers.discard(offer)
+        if close:
+            offer.sock.close()
+
+    def _receive_ready(self, connection):
+        """Receives what is available of a connection's next frame, without ever waiting for the rest, and dispatches
+        the data it completes. Any error only closes that connection, so that the reactor keeps driving the others.
+
+        Args:
+            connection (Connection): the connection whose socket is readable.
+        """
+        try:
+            data = connection._receive_ready()
+            if data is not None:
+                self._dispatch(connection, self._handle_data, connection, data)
+        except Exception:
+            traceback.print_exc()
+            connection.close(force=True)
+
+    def _check_connections(self):
+        """Releases closed connections, and drops offers whose header wasn't received in time.
+        Idle connections are pinged by the peer's timer wheel."""
+        for connection in list(self.connections):
+            if not connection.active:
+                self._release(connection)
+
+        now = time.monotonic()
+        for offer in list(self.offers):
+            if offer.deadline is not None and now > offer.deadline:
+                self._drop_offer(offer)
+
+    def _set_accepting(self, accepting: bool, accepting_now: bool) -> bool:
+        if accepting and not accepting_now:
+            self.selector.register(self.peer.server, selectors.EVENT_READ, self.peer.server)
+        elif accepting_now and not accepting:
+            self.selector.unregister(self.peer.server)
+
+        return accepting
+
+    def run(self):
+        """Runs the reactor's loop until its peer is stopped."""
+        for worker in self.workers:
+            worker.thread.start()
+
+        self.peer.server.listen()
+        self.peer.handle("listen")
+
+        self.selector.register(self._wakee, selectors.EVENT_READ, None)
+        accepting = False
+
+        while self.peer._server_active:
+            # only accept offers while the peer can hold more connections
+            accepting = self._set_accepting(not (len(self.peer.connections) >= self.peer.max_connections > 0), accepting)
+            self._register_pending()
+
+            for key, _ in self.selector.select(timeout=self.peer.timeout):
+                if key.data is None:
+                    try:
+                        self._wakee.recv(2 ** 10)
+                    except BlockingIOError:
+                        pass
+                elif key.data is self.peer.server:
+                    self._accept()
+                elif isinstance(key.data, PendingOffer):
+                    self._receive_offer(key.data)
+                elif key.data.active:
+                    self._receive_ready(key.data)
+
+            self._check_connections()
+
+        self._register_pending()
+        for connection in list(self.connections):
+            connection.close()
+            self._release(connection)
+        for offer in list(self.offers):
+            self._drop_offer(offer)
+
+        for worker in self.workers:
+            worker.stop()
+            worker.thread.join()
+
+        self.selector.close()
+        self._waker.close()
+        self._wakee.close()
+
+        self.peer.server.close()
+        self.peer.handle("stop")
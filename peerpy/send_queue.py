@@ -0,0 +1,196 @@
+import time
+import threading
+import collections
+
+from typing import Any, Callable, List
+
+from .exceptions import SendQueueFullError
+
+valid_send_policies = ["block", "raise", "drop_newest", "drop_oldest"]
+
+
+class SendQueue():
+    """Bounded queue of encoded data waiting to be sent by a connection's writer thread.
+    When the queue is full, put either blocks, raises, drops the data being put or drops the oldest data queued,
+    according to the queue's policy. Data put with put_latest instead replaces the data of the same key still queued,
+    so that only the latest data of every key is sent.
+    The writer thread may take data in batches, and marks the data taken as done once written, so that flush can wait
+    for every data queued to be sent."""
+
+    def __init__(self, maxsize: int, policy: str = "block"):
+        if maxsize <= 0:
+            raise ValueError(f"Send queue size should be > 0 (Received {maxsize})!")
+        if policy not in valid_send_policies:
+            raise ValueError(f"policy must be one of {valid_send_policies}")
+
+        self.maxsize = int(maxsize)
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+
+        self._items = collections.deque()
+        # data taken by the writer thread but not yet written, and whether a flush is waiting for the queue to drain
+        self._taken = 0
+        self._flushing = False
+        self._condition = threading.Condition()
+
+    @property
+    def depth(self) -> int:
+        """Returns the number of data currently waiting to be sent.
+
+        Returns:
+            int: the queue's depth
+        """
+        return len(self._items)
+
+    def put(self, item: Any, timeout: float = None) -> bool:
+        """Queues data to be sent, applying the queue's policy if it is full.
+
+        Args:
+            item (Any): the data to queue.
+            timeout (float, optional): how long to wait for room in the queue if its policy is "block", in seconds.
+            Defaults to None (waits forever).
+
+        Raises:
+            SendQueueFullError: if the queue is full and its policy is "raise".
+
+        Returns:
+            bool: whether data was queued.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while len(self._items) >= self.maxsize and not self.closed:
+                if self.policy == "block":
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return False
+                    self._condition.wait(deadline - time.monotonic() if deadline is not None else None)
+                elif self.policy == "raise":
+                    raise SendQueueFullError(f"Send queue is full ({self.maxsize} data waiting to be sent)!")
+                elif self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                else:
+                    self._items.popleft()
+                    self.dropped += 1
+
+            if self.closed:
+                return False
+
+            self._items.append((None, item))
+            self._condition.notify_all()
+            return True
+
+    def put_latest(self, item: Any, key: Any) -> bool:
+        """Queues data to be sent, replacing the data queued with the same key and not yet taken by the writer thread.
+        Never blocks, as at most one data per key can be queued.
+
+        Args:
+            item (Any): the data to queue.
+            key (Any): the key of the data, e.g. the id of the channel it is sent over. Must not be None.
+
+        Returns:
+            bool: whether data was queued.
+        """
+        with self._condition:
+            if self.closed:
+                return False
+
+            depth = len(self._items)
+            self._items = collections.deque([queued for queued in self._items if queued[0] != key])
+            self.dropped += depth - len(self._items)
+
+            self._items.append((key, item))
+            self._condition.notify_all()
+            return True
+
+    def get(self) -> Any:
+        """Waits for the oldest data queued and removes it from the queue.
+
+        Returns:
+            Any: the oldest data queued, or None if the queue was closed.
+        """
+        with self._condition:
+            while len(self._items) == 0 and not self.closed:
+                self._condition.wait()
+
+            if len(self._items) == 0:
+                return None
+
+            _, item = self._items.popleft()
+            self._taken += 1
+            self._condition.notify_all()
+            return item
+
+    def get_batch(self, window: float, max_size: int, size: Callable[[Any], int]) -> List[Any]:
+        """Waits for the oldest data queued, then for more data during window seconds, and removes it all from the queue.
+        Waiting is cut short once max_size is reached, or if the queue is flushed.
+
+        Args:
+            window (float): how long to wait for more data after the oldest one, in seconds.
+            max_size (int): the size from which the batch is returned right away.
+            size (Callable[[Any], int]): returns the size of a data.
+
+        Returns:
+            List[Any]: the data queued, oldest first, or None if the queue was closed.
+        """
+        with self._condition:
+            while len(self._items) == 0 and not self.closed:
+                self._condition.wait()
+
+            if len(self._items) == 0:
+                return None
+
+            deadline = time.monotonic() + window
+            batch, batch_size = [], 0
+            while True:
+                while len(self._items) > 0 and batch_size < max_size:
+                    _, item = self._items.popleft()
+                    batch.append(item)
+                    batch_size += size(item)
+
+                # threads blocked on a full queue can put again
+                self._condition.notify_all()
+
+                remaining = deadline - time.monotonic()
+                if batch_size >= max_size or self._flushing or self.closed or remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            self._taken += len(batch)
+            return batch
+
+    def done(self, count: int = 1):
+        """Marks data taken by the writer thread as written.
+
+        Args:
+            count (int, optional): the number of data written. Defaults to 1.
+        """
+        with self._condition:
+            self._taken -= count
+            if self._taken == 0 and len(self._items) == 0:
+                self._flushing = False
+                self._condition.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Asks the writer thread to send the data queued without waiting for more, and waits until it is written.
+
+        Args:
+            timeout (float, optional): how long to wait, in seconds. Defaults to None (waits forever).
+
+        Returns:
+            bool: whether every data queued was written.
+        """
+        with self._condition:
+            if self._taken == 0 and len(self._items) == 0:
+                return True
+
+            self._flushing = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: (self._taken == 0 and len(self._items) == 0) or self.closed, timeout)
+            return self._taken == 0 and len(self._items) == 0
+
+    def close(self):
+        """Closes the queue: data can no longer be put, and waiting threads are woken up."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
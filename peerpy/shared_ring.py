@@ -0,0 +1,394 @@
+import time
+import errno
+import socket
+import platform
+import struct
+import threading
+
+from multiprocessing import shared_memory, resource_tracker
+
+from typing import Any, BinaryIO, List
+
+# sends without blocking, where supported
+nonblocking_flag = getattr(socket, "MSG_DONTWAIT", 0)
+
+# a segment starts with a magic, the capacity of its rings and the name of the peer which created it,
+# followed by one ring per direction: the first one carries the bytes sent by the initiator of the connection
+segment_struct = struct.Struct("!8sQ48s")
+segment_magic = b"PPSHM\x00\x00\x01"
+# python 3.13+ can map a segment without the resource tracker unlinking it at exit
+_trackable = "track" in shared_memory.SharedMemory.__init__.__code__.co_varnames
+# rings rely on stores being seen in order by the other process and on a lock acquisition being a full memory barrier,
+# which only x86-64 guarantees: other hosts exchange data over TCP
+supported = platform.machine().lower() in ("x86_64", "amd64")
+# acquiring a lock is a full memory barrier on x86-64: a store before it is seen by the other process before a load
+# after it
+_barrier = threading.Lock()
+
+
+class SharedRing():
+    """Single-producer, single-consumer ring of bytes in a shared memory buffer.
+    Its head (the number of bytes ever read) and tail (ever written) lie on different cache lines, and are only written
+    by the consumer and the producer respectively. The tail is only moved forward once the bytes are written, which
+    relies on stores being seen in order by the other process, so rings are only used on x86-64 hosts. The consumer also flags when it waits
+    for the producer to ring it up."""
+
+    header_size = 128
+
+    def __init__(self, buffer: memoryview):
+        # indexes are read and written as single aligned words: struct.pack_into zeroes them first, so the other
+        # process could see them go back
+        self._indexes = buffer[:self.header_size].cast("Q")
+        self._data = buffer[self.header_size:]
+        self.capacity = len(self._data)
+
+    @property
+    def head(self) -> int:
+        return self._indexes[0]
+
+    @property
+    def tail(self) -> int:
+        return self._indexes[8]
+
+    @property
+    def waiting(self) -> bool:
+        return self._indexes[1] != 0
+
+    @waiting.setter
+    def waiting(self, waiting: bool):
+        self._indexes[1] = int(waiting)
+
+    def readable(self) -> int:
+        """Returns the number of bytes written and not yet read.
+
+        Returns:
+            int: the number of bytes readable
+        """
+        return self.tail - self.head
+
+    def writable(self) -> int:
+        """Returns the number of bytes which can be written without overwriting bytes not yet read.
+
+        Returns:
+            int: the free space of the ring
+        """
+        return self.capacity - self.readable()
+
+    def write(self, view: memoryview) -> int:
+        """Copies as many bytes as the ring can take.
+
+        Args:
+            view (memoryview): the bytes to write.
+
+        Returns:
+            int: the number of bytes written
+        """
+        tail = self.tail
+        count = min(len(view), self.capacity - (tail - self.head))
+        start = tail % self.capacity
+        first = min(count, self.capacity - start)
+
+        self._data[start:start + first] = view[:first]
+        self._data[:count - first] = view[first:count]
+
+        self._indexes[8] = tail + count
+        return count
+
+    def write_from(self, file: BinaryIO, count: int) -> int:
+        """Reads up to count bytes of a file right into the ring.
+
+        Args:
+            file (BinaryIO): the file object, opened in binary mode.
+            count (int): the maximum number of bytes to read.
+
+        Returns:
+            int: the number of bytes written, 0 if the file ended
+        """
+        tail = self.tail
+        start = tail % self.capacity
+        count = min(count, self.capacity - (tail - self.head), self.capacity - start)
+
+        written = file.readinto(self._data[start:start + count]) or 0
+        self._indexes[8] = tail + written
+        return written
+
+    def read_into(self, view: memoryview) -> int:
+        """Moves as many bytes as available into the given buffer.
+
+        Args:
+            view (memoryview): the writable buffer.
+
+        Returns:
+            int: the number of bytes read
+        """
+        head = self.head
+        count = min(len(view), self.tail - head)
+        start = head % self.capacity
+        first = min(count, self.capacity - start)
+
+        view[:first] = self._data[start:start + first]
+        view[first:count] = self._data[:count - first]
+
+        self._indexes[0] = head + count
+        return count
+
+    def release(self):
+        """Releases the views over the shared buffer, so that it can be unmapped."""
+        self._indexes.release()
+        self._data.release()
+
+
+def _open_segment(name: str = None, size: int = 0) -> shared_memory.SharedMemory:
+    """Creates or maps a shared memory segment which the resource tracker won't unlink at exit,
+    as its creator unlinks it as soon as both peers mapped it."""
+    if _trackable:
+        return shared_memory.SharedMemory(name, create=name is None, size=size, track=False)
+
+    segment = shared_memory.SharedMemory(name, create=name is None, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def create_segment(peer_name: str, capacity: int) -> shared_memory.SharedMemory:
+    """Creates the shared memory segment of a connection, proposed to the remote peer by its name.
+
+    Args:
+        peer_name (str): the name of the peer creating the segment, which the remote peer checks.
+        capacity (int): the capacity of each of its two rings, in bytes.
+
+    Returns:
+        shared_memory.SharedMemory: the segment
+    """
+    segment = _open_segment(size=segment_struct.size + 2 * (SharedRing.header_size + int(capacity)))
+    segment_struct.pack_into(segment.buf, 0, segment_magic, int(capacity), peer_name.encode("utf-8"))
+    return segment
+
+
+def attach_segment(name: str, peer_name: str) -> shared_memory.SharedMemory:
+    """Maps the shared memory segment proposed by a remote peer, if it lies on the same host.
+
+    Args:
+        name (str): the name of the segment.
+        peer_name (str): the name of the remote peer, which must have created the segment.
+
+    Returns:
+        shared_memory.SharedMemory: the segment, or None if it couldn't be mapped or was created by another peer
+    """
+    try:
+        segment = _open_segment(name)
+    except (OSError, ValueError):
+        # the remote peer is on another host, or this one can't map shared memory
+        return None
+
+    magic, _, creator = segment_struct.unpack_from(segment.buf, 0) if segment.size >= segment_struct.size \
+        else (None, 0, b"")
+    if magic != segment_magic or creator.rstrip(b"\x00") != peer_name.encode("utf-8"):
+        segment.close()
+        return None
+
+    return segment
+
+
+def unlink_segment(segment: shared_memory.SharedMemory):
+    """Unlinks a segment once both peers mapped it (or once the remote peer declined it): its memory is freed as soon
+    as both peers unmap it, even if they crash."""
+    if not _trackable:
+        # unlink unregisters the segment, which was never left registered
+        resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+
+class SharedMemorySocket():
+    """Socket-like transport exchanging bytes through a ring per direction in a shared memory segment, for peers on the
+    same host. Bytes cost a copy into the ring and another one out of it, instead of crossing the TCP stack.
+    The TCP socket it wraps only carries doorbells: a byte sent after a write if the remote peer's receiving thread
+    waits for data, waking it up. Its timeout, options and closing apply as they would to the TCP socket."""
+
+    def __init__(self, sock: socket.socket, segment: shared_memory.SharedMemory, initiator: bool):
+        self._sock = sock
+        self._segment = segment
+        self._closed = False
+        # held while a ring is accessed, so that closing never releases it under another thread
+        self._send_lock = threading.Lock()
+        self._receive_lock = threading.Lock()
+
+        capacity = segment_struct.unpack_from(segment.buf, 0)[1]
+        size = SharedRing.header_size + capacity
+        rings = [SharedRing(segment.buf[offset:offset + size])
+                 for offset in (segment_struct.size, segment_struct.size + size)]
+        self._send_ring, self._receive_ring = rings if initiator else reversed(rings)
+
+    def __getattr__(self, name: str) -> Any:
+        # settimeout, fileno, setsockopt... apply to the TCP socket
+        return getattr(self._sock, name)
+
+    def _check_open(self):
+        if self._closed:
+            raise BrokenPipeError(errno.EPIPE, "Shared memory transport was closed.")
+
+    def _ring_doorbell(self):
+        with _barrier:
+            pass
+        if not self._send_ring.waiting:
+            # the remote peer will find the bytes written before waiting
+            return
+
+        try:
+            self._sock.send(b"\x00", nonblocking_flag)
+        except (BlockingIOError, socket.timeout):
+            # the remote peer has doorbells left to read already
+            pass
+
+    def _wait_writable(self, wait: bool = True, deadline: float = None):
+        """Waits until the send ring has room, as a blocking socket would, honoring the socket's timeout.
+
+        Args:
+            wait (bool, optional): whether to wait if the ring is full. Defaults to True.
+            deadline (float, optional): the time.monotonic() value after which waiting is given up, even within the
+            socket's timeout. Defaults to None.
+
+        Raises:
+            BrokenPipeError: if the transport is closed.
+            BlockingIOError: if the socket is non-blocking (or not waiting) and the ring is full.
+            socket.timeout: if the ring stayed full for the socket's timeout, or until the deadline.
+        """
+        timeout = self._sock.gettimeout()
+        start = time.monotonic()
+        if timeout is not None:
+            deadline = min(deadline, start + timeout) if deadline is not None else start + timeout
+        delay = 0.
+
+        while True:
+            with self._send_lock:
+                self._check_open()
+                if self._send_ring.writable() > 0:
+                    return
+
+            if not wait or timeout == 0:
+                raise BlockingIOError(errno.EAGAIN, "Shared memory ring is full.")
+            if deadline is not None and time.monotonic() > deadline:
+                raise socket.timeout("timed out")
+
+            # the remote peer only rings when it writes, so free space is polled, with a growing delay once
+            # yielding to other threads wasn't enough
+            time.sleep(delay if delay >= 1e-5 else 0)
+            delay = min(delay * 2 if delay >= 1e-5 else delay + 1e-7, 1e-3)
+
+    def wait_writable(self, deadline: float) -> bool:
+        """Waits until the send ring has room, or until the deadline, as utils.wait_writable does for sockets.
+
+        Args:
+            deadline (float): the time.monotonic() value after which waiting is given up.
+
+        Raises:
+            BrokenPipeError: if the transport is closed.
+            BlockingIOError: if the socket is non-blocking and the ring is full.
+
+        Returns:
+            bool: whether the ring has room
+        """
+        try:
+            self._wait_writable(deadline=deadline)
+        except socket.timeout:
+            return False
+
+        return True
+
+    def sendmsg(self, buffers: List[bytes]) -> int:
+        self._wait_writable()
+
+        sent = 0
+        with self._send_lock:
+            self._check_open()
+            for buffer in buffers:
+                view = memoryview(buffer).cast("B")
+                written = self._send_ring.write(view)
+                sent += written
+                if written < len(view):
+                    break
+
+            self._ring_doorbell()
+        return sent
+
+    def send(self, data: bytes, flags: int = 0) -> int:
+        self._wait_writable(not flags & nonblocking_flag)
+        with self._send_lock:
+            self._check_open()
+            sent = self._send_ring.write(memoryview(data).cast("B"))
+            self._ring_doorbell()
+        return sent
+
+    def sendall(self, data: bytes):
+        view = memoryview(data).cast("B")
+        while len(view) > 0:
+            view = view[self.send(view):]
+
+    def sendfile(self, file: BinaryIO, offset: int = 0, count: int = None) -> int:
+        file.seek(offset)
+        sent = 0
+        while count is None or sent < count:
+            self._wait_writable()
+            with self._send_lock:
+                self._check_open()
+                written = self._send_ring.write_from(file, count - sent if count is not None else
+                                                     self._send_ring.capacity)
+                self._ring_doorbell()
+            if written == 0:
+                break
+            sent += written
+
+        return sent
+
+    def recv_into(self, buffer: Any, nbytes: int = 0, flags: int = 0) -> int:
+        # nbytes only bounds the system calls of sockets: the buffer is filled with as many bytes as available
+        view = memoryview(buffer).cast("B")
+
+        while True:
+            with self._receive_lock:
+                self._check_open()
+                received = self._receive_ring.read_into(view)
+                if received > 0 or len(view) == 0:
+                    return received
+
+                # the ring is empty: ask for a doorbell, then check again for data written meanwhile without ringing
+                self._receive_ring.waiting = True
+                with _barrier:
+                    pass
+                if self._receive_ring.readable() > 0:
+                    self._receive_ring.waiting = False
+                    continue
+
+            # wait for the remote peer's doorbell, or for it to close the connection, honoring the socket's timeout
+            try:
+                doorbells = self._sock.recv(2 ** 12)
+            finally:
+                with self._receive_lock:
+                    if not self._closed:
+                        self._receive_ring.waiting = False
+
+            if len(doorbells) == 0:
+                # data written before closing is still received
+                with self._receive_lock:
+                    self._check_open()
+                    return self._receive_ring.read_into(view)
+
+    def recv(self, bufsize: int, flags: int = 0) -> bytes:
+        buffer = bytearray(bufsize)
+        return bytes(buffer[:self.recv_into(buffer)])
+
+    def shutdown(self, how: int):
+        self._closed = True
+        self._sock.shutdown(how)
+
+    def close(self):
+        self._closed = True
+        self._sock.close()
+
+        # waits for the threads copying from or to the rings, which then find the transport closed
+        with self._send_lock, self._receive_lock:
+            if self._segment.buf is None:
+                return
+
+            for ring in (self._send_ring, self._receive_ring):
+                ring.release()
+            self._segment.close()
@@ -0,0 +1,129 @@
+from typing import Any, Dict, List
+
+
+class Histogram():
+    """Latency histogram with power of 2 buckets, in microseconds: recording a duration is a single increment,
+    so that it can be left on in production. Bucket i counts the durations in [2 ** (i - 1), 2 ** i) microseconds."""
+
+    size = 40
+
+    def __init__(self):
+        self.buckets = [0] * self.size
+        self.count = 0
+        self.total = 0.
+
+    def record(self, seconds: float):
+        """Records a duration.
+
+        Args:
+            seconds (float): the duration, in seconds.
+        """
+        self.buckets[min(int(seconds * 1e6).bit_length(), self.size - 1)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other: "Histogram"):
+        """Adds the durations recorded by another histogram to this histogram.
+
+        Args:
+            other (Histogram): the histogram to merge.
+        """
+        self.buckets = [count + other_count for count, other_count in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, rank: float) -> float:
+        """Returns an upper bound of the given percentile of the durations recorded.
+
+        Args:
+            rank (float): the percentile, in [0, 100].
+
+        Returns:
+            float: the upper bound of the bucket the percentile falls in, in microseconds, or None if nothing was recorded
+        """
+        if self.count == 0:
+            return None
+
+        threshold = rank / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= threshold and count > 0:
+                return float(2 ** index)
+
+        return float(2 ** (self.size - 1))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns a summary of this histogram.
+
+        Returns:
+            Dict[str, Any]: the number of durations recorded, their mean, p50 and p99 in microseconds,
+            and the count of every non-empty bucket by upper bound
+        """
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count * 1e6 if self.count > 0 else None,
+            "p50_us": self.percentile(50),
+            "p99_us": self.percentile(99),
+            "buckets": {2 ** index: count for index, count in enumerate(self.buckets) if count > 0}
+        }
+
+
+class ConnectionStats():
+    """Counters maintained by a connection on its send and receive paths. Counters are plain attributes updated
+    without locking: those updated by concurrent senders may slightly undercount."""
+
+    counters = [
+        "messages_sent", "frames_sent", "bytes_sent",
+        "messages_received", "bytes_received",
+        "requests_sent", "requests_received",
+        "pings_sent", "timeouts", "ignored", "corrupted", "conflated"
+    ]
+    timers = ["encode_time", "decode_time", "handler_time"]
+    histograms = ["send_latency", "handler_latency"]
+
+    def __init__(self):
+        for counter in self.counters:
+            setattr(self, counter, 0)
+        for timer in self.timers:
+            setattr(self, timer, 0.)
+        for histogram in self.histograms:
+            setattr(self, histogram, Histogram())
+
+    def merge(self, other: "ConnectionStats"):
+        """Adds the counters of another connection to these counters.
+
+        Args:
+            other (ConnectionStats): the counters to merge.
+        """
+        for name in self.counters + self.timers:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for histogram in self.histograms:
+            getattr(self, histogram).merge(getattr(other, histogram))
+
+    @classmethod
+    def aggregate(cls, stats: List["ConnectionStats"]) -> "ConnectionStats":
+        """Sums the counters of several connections.
+
+        Args:
+            stats (List[ConnectionStats]): the counters to sum.
+
+        Returns:
+            ConnectionStats: the aggregated counters
+        """
+        total = cls()
+        for connection_stats in stats:
+            total.merge(connection_stats)
+
+        return total
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns a snapshot of these counters.
+
+        Returns:
+            Dict[str, Any]: every counter and timer (in seconds), and a summary of every histogram
+        """
+        snapshot = {name: getattr(self, name) for name in self.counters + self.timers}
+        snapshot.update({histogram: getattr(self, histogram).to_dict() for histogram in self.histograms})
+
+        return snapshot
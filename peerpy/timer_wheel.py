@@ -0,0 +1,99 @@
+import math
+import time
+import threading
+import traceback
+
+from typing import Callable
+
+
+class Timer():
+    """Callback scheduled on a timer wheel, which can be cancelled until it is called."""
+
+    __slots__ = ["callback", "args", "rounds", "cancelled"]
+
+    def __init__(self, callback: Callable, args: tuple, rounds: int):
+        self.callback = callback
+        self.args = args
+        # the number of turns of the wheel left before the timer is due
+        self.rounds = rounds
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancels this timer, whose callback won't be called."""
+        self.cancelled = True
+
+
+class TimerWheel():
+    """Hashed timer wheel, calling scheduled callbacks from a single thread shared by every connection of a peer.
+    Time is divided into ticks: scheduling or cancelling a timer is constant time whatever the number of timers,
+    and the thread only wakes up once per tick. Callbacks are called up to a tick late, and must not block."""
+
+    def __init__(self, tick: float = .1, slots: int = 256):
+        self.tick = float(tick)
+        self.slots = [[] for _ in range(int(slots))]
+        self._current = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.thread = None
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """Schedules a callback, starting the wheel's thread if needed.
+
+        Args:
+            delay (float): how long to wait before calling the callback, in seconds.
+            callback (Callable): the callable to call, from the wheel's thread.
+
+        Returns:
+            Timer: the timer, to cancel it
+        """
+        ticks = max(1, math.ceil(delay / self.tick))
+        timer = Timer(callback, args, (ticks - 1) // len(self.slots))
+
+        with self._lock:
+            self.slots[(self._current + ticks) % len(self.slots)].append(timer)
+
+            if self.thread is None and not self._stopped.is_set():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+        return timer
+
+    def stop(self):
+        """Stops the wheel's thread within a tick. Timers pending are never called."""
+        self._stopped.set()
+
+    def _advance(self) -> list:
+        """Moves the wheel forward by one tick.
+
+        Returns:
+            list: the timers due
+        """
+        with self._lock:
+            self._current = (self._current + 1) % len(self.slots)
+            slot = self.slots[self._current]
+
+            due, pending = [], []
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                elif timer.rounds == 0:
+                    due.append(timer)
+                else:
+                    timer.rounds -= 1
+                    pending.append(timer)
+
+            self.slots[self._current] = pending
+
+        return due
+
+    def _run(self):
+        next_tick = time.monotonic() + self.tick
+        while not self._stopped.wait(max(next_tick - time.monotonic(), 0)):
+            next_tick += self.tick
+
+            for timer in self._advance():
+                try:
+                    timer.callback(*timer.args)
+                except Exception:
+                    # a failing callback must not stop the timers of other connections
+                    traceback.print_exc()
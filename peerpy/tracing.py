@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import itertools
+import threading
+
+from typing import Any, Dict
+
+# the tracer installed, if any: spans are only recorded while a tracer is installed
+tracer = None
+
+_message_ids = itertools.count(1)
+
+
+class Tracer():
+    """Base class of tracers, notified when a span (e.g. encoding, sending or handling a message) starts and ends.
+    Spans are nested within the thread they are recorded from. Subclasses override start and end."""
+
+    def start(self, name: str, args: Dict[str, Any]) -> Any:
+        """Called when a span starts.
+
+        Args:
+            name (str): the name of the span, one of ["encode", "send", "write", "receive", "decode", "handle"].
+            args (Dict[str, Any]): the span's arguments known when it starts, e.g. its message id and size.
+
+        Returns:
+            Any: a token passed to end
+        """
+        return None
+
+    def end(self, token: Any, name: str, args: Dict[str, Any]):
+        """Called when a span ends.
+
+        Args:
+            token (Any): the token returned by start.
+            name (str): the name of the span.
+            args (Dict[str, Any]): the span's arguments, including those set while it was running.
+        """
+        pass
+
+
+class Span():
+    """A span recorded by a tracer, used as a context manager. It is truthy, unlike the span used without tracer."""
+
+    __slots__ = ["tracer", "name", "args", "token"]
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.token = None
+
+    def set(self, **args):
+        """Sets arguments of this span known while it is running."""
+        self.args.update(args)
+
+    def __enter__(self):
+        self.token = self.tracer.start(self.name, self.args)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.tracer.end(self.token, self.name, self.args)
+        return False  # always reraise exception
+
+
+class NullSpan():
+    """Span used when no tracer is installed, doing nothing."""
+
+    def set(self, **args):
+        pass
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return False
+
+
+no_span = NullSpan()
+
+
+def span(name: str, **args) -> Span:
+    """Returns a span recorded by the installed tracer, or a span doing nothing if there is none.
+
+    Args:
+        name (str): the name of the span.
+
+    Returns:
+        Span: the span, to be used as a context manager
+    """
+    if tracer is None:
+        return no_span
+
+    return Span(tracer, name, args)
+
+
+def set_tracer(new_tracer: Tracer) -> Tracer:
+    """Installs a tracer, recording every span from now on.
+
+    Args:
+        new_tracer (Tracer): the tracer to install, or None to stop tracing.
+
+    Returns:
+        Tracer: the tracer previously installed
+    """
+    global tracer
+    previous, tracer = tracer, new_tracer
+
+    return previous
+
+
+def next_message_id() -> int:
+    """Returns a new message id, unique within this process, so that spans of a same message can be related.
+
+    Returns:
+        int: the message id
+    """
+    return next(_message_ids)
+
+
+class FileTracer(Tracer):
+    """Tracer writing every span to a file in the Chrome trace event format, which can be opened by
+    chrome://tracing, Perfetto or speedscope to see where a message spent its time, thread by thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pid = os.getpid()
+        self.events = 0
+
+        self._file = open(path, "w")
+        self._file.write("[")
+        self._lock = threading.Lock()
+
+    def start(self, name: str, args: Dict[str, Any]) -> Any:
+        return time.perf_counter()
+
+    def end(self, token: Any, name: str, args: Dict[str, Any]):
+        end = time.perf_counter()
+        event = json.dumps({
+            "name": name,
+            "ph": "X",  # complete event, with a duration
+            "ts": token * 1e6,
+            "dur": (end - token) * 1e6,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": args
+        }, default=str)
+
+        with self._lock:
+            if self._file.closed:
+                return
+
+            self._file.write(("," if self.events > 0 else "") + "\n" + event)
+            self.events += 1
+
+    def close(self):
+        """Closes the trace file. Spans ending afterwards are not written."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.write("\n]\n")
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+        return False  # always reraise exception
@@ -0,0 +1,84 @@
+from typing import BinaryIO, Union
+
+from .event_handler import EventHandler
+
+
+class Transfer(EventHandler):
+    """Large payload received from the remote peer chunk by chunk, without ever being buffered entirely.
+    Chunks are passed to the chunk handler as they are received, and can be written to a file or received straight into
+    a writable buffer (e.g. a mmap). Chunks passed to the chunk handler are only valid during the handler's call."""
+
+    def __init__(self, connection, transfer_id: int, name: str = None, size: int = None):
+        super().__init__(["chunk", "end"], {})
+
+        self.connection = connection
+        self.transfer_id = int(transfer_id)
+        self.name = name
+        self.size = int(size) if size is not None else None
+        self.received = 0
+        self.done = False
+        self.file = None
+        self.buffer = None
+
+    @property
+    def target_name(self) -> str:
+        """Returns the name of the remote peer.
+
+        Returns:
+            str: the normalized address name of the remote peer
+        """
+        return self.connection.target_name
+
+    def save(self, file: Union[str, BinaryIO]):
+        """Writes every chunk received to a file, closed once the transfer ends.
+
+        Args:
+            file (Union[str, BinaryIO]): the path of the file to write, or a file object opened in binary mode.
+        """
+        self.file = open(file, "wb") if isinstance(file, str) else file
+
+    def into(self, buffer):
+        """Receives chunks straight into a writable buffer, e.g. a mmap or a bytearray of the transfer's size.
+        Bytes received beyond the buffer's size are only passed to the chunk handler.
+
+        Args:
+            buffer: the writable bytes-like object to fill.
+
+        Raises:
+            ValueError: if the transfer's size is known and larger than the buffer.
+        """
+        view = memoryview(buffer).cast("B")
+        if self.size is not None and self.size > len(view):
+            raise ValueError(f"Buffer size ({len(view)}) is smaller than the transfer's size ({self.size})!")
+
+        self.buffer = view
+
+    def _target(self, size: int) -> memoryview:
+        """Returns the part of this transfer's buffer the next bytes received should be written to.
+
+        Args:
+            size (int): the number of bytes to be received.
+
+        Returns:
+            memoryview: a view over at most size bytes of the buffer, or None if there is no buffer space left
+        """
+        if self.buffer is None or self.received >= len(self.buffer):
+            return None
+
+        return self.buffer[self.received:self.received + size]
+
+    def _write(self, chunk: memoryview):
+        self.received += len(chunk)
+        if self.file is not None:
+            self.file.write(chunk)
+
+        self.handle("chunk", chunk)
+
+    def _end(self):
+        self.done = True
+        self.close()
+
+    def close(self):
+        """Closes the file this transfer is written to, if any."""
+        if self.file is not None:
+            self.file.close()
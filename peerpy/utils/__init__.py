@@ -1,24 +1,45 @@
+import os
+import time
+import errno
+import select
 import socket
-import requests
+import struct
 
-from typing import Dict, Any, Union, Tuple
+from typing import Dict, Any, Union, Tuple, List, BinaryIO
 
-from ..exceptions import HeaderSizeError
-from ..protocol import headers, defaults
+from ..exceptions import HeaderSizeError, FrameError, FrameSizeError
+from ..protocol import headers, frames, defaults
+from ..codec import codecs, codes, valid_data_types
 
-valid_data_types = ["raw", "json", "bytes"]
+valid_framings = [frames.text_framing, frames.binary_framing]
 
+frame_struct = struct.Struct(frames.layout)
 
-def get_local_ip() -> str:
-    """Returns the local IP address of this device.
+
+_local_ip = None
+
+
+def get_local_ip(refresh: bool = False) -> str:
+    """Returns the local IP address of this device, which is only looked up once unless refreshed.
+
+    Args:
+        refresh (bool, optional): whether to look up the address again, e.g. after a network change. Defaults to False.
 
     Returns:
-        str: the ipv4 used by this device.
+        str: the ipv4 used by this device, or 127.0.0.1 if this device has no route to other devices.
     """
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-        # works even with no internet connection
-        sock.connect(("8.8.8.8", 80))
-        return sock.getsockname()[0]
+    global _local_ip
+    if _local_ip is None or refresh:
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                # works even with no internet connection, as long as there is a default route
+                sock.connect(("8.8.8.8", 80))
+                _local_ip = sock.getsockname()[0]
+        except OSError:
+            # no default route (e.g. an isolated host or container)
+            _local_ip = "127.0.0.1"
+
+    return _local_ip
 
 
 def get_public_ip() -> str:
@@ -28,6 +49,8 @@ def get_public_ip() -> str:
         str: the ipv4 used by this device.
     """
     try:
+        # requests is only imported when needed, as it is slow to import
+        import requests
         return requests.get("http://ident.me").text
     except:
         return "localhost"
@@ -64,6 +87,198 @@ def check_address(address: str, port: int) -> Tuple[Tuple[str, int], str]:
     return address, address_name
 
 
+def receive_into(sock: socket.socket, view: memoryview, buffer_size: int = None) -> memoryview:
+    """Fills the given writable buffer with bytes received from sock, without intermediate copies.
+
+    Args:
+        sock (socket.socket): the socket to receive bytes from.
+        view (memoryview): the writable buffer to fill entirely.
+        buffer_size (int, optional): the maximum number of bytes to receive per call. Defaults to the buffer's size.
+
+    Raises:
+        ConnectionResetError: if the remote peer closed the connection before the buffer was filled.
+        socket.timeout: if no byte at all was received within the socket's timeout.
+
+    Returns:
+        memoryview: the filled buffer
+    """
+    size = len(view)
+    if buffer_size is None or buffer_size <= 0:
+        buffer_size = size
+
+    received = 0
+    while received < size:
+        try:
+            nbytes = sock.recv_into(view[received:], min(buffer_size, size - received))
+        except socket.timeout:
+            # only give up if nothing was received yet, otherwise the framing would be lost
+            if received == 0:
+                raise
+            continue
+
+        if nbytes == 0:
+            raise ConnectionResetError("Connection was closed by the remote peer.")
+
+        received += nbytes
+
+    return view
+
+
+def receive_exactly(sock: socket.socket, size: int, buffer_size: int = None) -> memoryview:
+    """Receives exactly size bytes from sock, into a single preallocated buffer.
+
+    Args:
+        sock (socket.socket): the socket to receive bytes from.
+        size (int): the number of bytes to receive.
+        buffer_size (int, optional): the maximum number of bytes to receive per call. Defaults to size.
+
+    Returns:
+        memoryview: a view over the received bytes
+    """
+    return receive_into(sock, memoryview(bytearray(size)), buffer_size)
+
+
+def buffers_size(buffers: List[bytes]) -> int:
+    """Returns the total size of several bytes-like objects.
+
+    Args:
+        buffers (List[bytes]): the bytes-like objects.
+
+    Returns:
+        int: their total size, in bytes
+    """
+    return sum([memoryview(buffer).nbytes for buffer in buffers])
+
+
+def wait_writable(sock: socket.socket, deadline: float) -> bool:
+    """Waits until a socket can take bytes without blocking, or until the deadline.
+
+    Args:
+        sock (socket.socket): the socket to wait for.
+        deadline (float): the time.monotonic() value after which waiting is given up.
+
+    Raises:
+        BrokenPipeError: if the socket was closed meanwhile.
+
+    Returns:
+        bool: whether the socket is writable
+    """
+    if not isinstance(sock, socket.socket):
+        # transports which aren't sockets (e.g. shared memory rings) wait for room in their own way
+        return sock.wait_writable(deadline)
+
+    timeout = max(deadline - time.monotonic(), 0)
+    try:
+        if hasattr(select, "poll"):
+            # unlike select, poll isn't limited to file descriptors below FD_SETSIZE
+            poller = select.poll()
+            poller.register(sock, select.POLLOUT)
+            return len(poller.poll(timeout * 1000)) > 0
+
+        return len(select.select([], [sock], [], timeout)[1]) > 0
+    except ValueError:
+        # the socket's file descriptor is -1
+        raise BrokenPipeError(errno.EPIPE, "Socket was closed while sending.")
+
+
+def send_buffers(sock: socket.socket, buffers: List[bytes], deadline: float = None) -> int:
+    """Sends several buffers at once, with as few system calls as possible (scatter/gather).
+    Partial writes are resumed until every byte is sent, or until the deadline if any.
+
+    Args:
+        sock (socket.socket): the socket to send bytes through.
+        buffers (List[bytes]): the bytes-like objects to send, in order.
+        deadline (float, optional): the time.monotonic() value after which sending is given up, even if the buffers
+        were only sent in part. Defaults to None (never gives up).
+
+    Raises:
+        ConnectionAbortedError, ConnectionResetError, BrokenPipeError: if the connection is lost.
+
+    Returns:
+        int: the number of bytes sent, which is less than the size of the buffers only if the deadline passed
+    """
+    views = [memoryview(buffer).cast("B") for buffer in buffers]
+    views = [view for view in views if len(view) > 0]
+
+    total = 0
+    while len(views) > 0:
+        if deadline is not None and not wait_writable(sock, deadline):
+            # the remote peer didn't receive in time
+            break
+
+        try:
+            if hasattr(sock, "sendmsg"):
+                # a single call can't be passed more than IOV_MAX buffers, usually 1024
+                sent = sock.sendmsg(views[:1024])
+            else:
+                # sendmsg is not available on every platform (e.g. Windows)
+                sent = sock.send(views[0])
+        except socket.timeout:
+            # the remote peer is slow to receive, keep waiting as a blocking socket would
+            continue
+
+        # skip every buffer fully sent and resume after the bytes sent from the next one
+        total += sent
+        while len(views) > 0 and sent >= len(views[0]):
+            sent -= len(views.pop(0))
+        if sent > 0:
+            views[0] = views[0][sent:]
+
+    return total
+
+
+def send_file(sock: socket.socket, file: BinaryIO, offset: int, count: int):
+    """Sends count bytes of a file from offset, letting the kernel copy them from the page cache when possible.
+    Sending is resumed after timeouts until every byte is sent.
+
+    Args:
+        sock (socket.socket): the socket to send bytes through.
+        file (BinaryIO): the file object, opened in binary mode.
+        offset (int): the position of the first byte to send.
+        count (int): the number of bytes to send.
+
+    Raises:
+        ConnectionAbortedError, ConnectionResetError, BrokenPipeError: if the connection is lost.
+        EOFError: if the file ends before count bytes were sent.
+    """
+    end = offset + count
+    while offset < end:
+        file.seek(offset)
+        try:
+            sock.sendfile(file, offset, end - offset)
+        except socket.timeout:
+            # the remote peer is slow to receive, keep waiting as a blocking socket would
+            pass
+
+        # sendfile leaves the file's position right after the last byte sent
+        sent = file.tell() - offset
+        if sent <= 0 and file.tell() >= os.fstat(file.fileno()).st_size:
+            raise EOFError("File ended before every byte was sent!")
+
+        offset += sent
+
+
+def set_keepalive(sock: socket.socket, idle: float, interval: float, count: int):
+    """Enables TCP keepalive on a socket, so that the kernel detects dead connections without any application traffic.
+    Options the platform doesn't support are left to the system's defaults.
+
+    Args:
+        sock (socket.socket): the socket holding the connection.
+        idle (float): how long the connection must be idle before the first probe is sent, in seconds.
+        interval (float): how long to wait between probes, in seconds.
+        count (int): the number of probes left unanswered before the connection is considered dead.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+    # TCP_KEEPALIVE is macOS' name of TCP_KEEPIDLE
+    idle_option = getattr(socket, "TCP_KEEPIDLE", getattr(socket, "TCP_KEEPALIVE", None))
+    for option, value in [(idle_option, idle),
+                          (getattr(socket, "TCP_KEEPINTVL", None), interval),
+                          (getattr(socket, "TCP_KEEPCNT", None), count)]:
+        if option is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, option, max(1, int(value)))
+
+
 def build_header(header_type: str, contents: Dict[str, Any]) -> bytes:
     """Returns a normalized header of type header_type.
 
@@ -88,13 +303,20 @@ def build_header(header_type: str, contents: Dict[str, Any]) -> bytes:
     return header_bytes + headers.separator.encode("utf-8") * tail_size
 
 
-def build_hello_header(peer_name: str, data_type: str, strict: bool, stream: bool = False, **kwargs) -> bytes:
+def build_hello_header(peer_name: str, data_type: str, strict: bool, stream: bool = False,
+                       framing: str = None, compression: str = None, zdict: str = None, shared_memory: str = None,
+                       **kwargs) -> bytes:
     """Builds a header used to handshake with another peer and set up a data connection.
 
     Args:
         peer_name (str): the name of the peer initiating the handshake.
         data_type (str): the data type to be sent.
         stream (bool): whether this connection is for streaming or not.
+        framing (str, optional): the framing mode proposed for this connection. Defaults to None (text framing).
+        compression (str, optional): the compression algorithm proposed for this connection. Defaults to None.
+        zdict (str, optional): the id of the compression preset dictionary proposed. Defaults to None.
+        shared_memory (str, optional): the name of the shared memory segment proposed, for peers on the same host.
+        Defaults to None.
 
     Returns:
         bytes: the generated encoded header
@@ -112,6 +334,20 @@ def build_hello_header(peer_name: str, data_type: str, strict: bool, stream: boo
         # so that the other peer knows if the connection is a streaming connection
         header_contents["stream"] = stream
 
+    if framing is not None and framing != frames.text_framing:
+        # so that the other peer knows it can answer with a more compact framing
+        header_contents["framing"] = framing
+
+    if compression is not None:
+        # so that the other peer knows how the data it receives may be compressed
+        header_contents["compression"] = compression
+        if zdict is not None:
+            header_contents["zdict"] = zdict
+
+    if shared_memory is not None:
+        # so that the other peer can map it, if on the same host
+        header_contents["shm"] = shared_memory
+
     return build_header(headers.hello_header, header_contents)
 
 
@@ -133,6 +369,48 @@ def build_data_header(data_size: int, data_type: str) -> bytes:
     })
 
 
+def build_frame_header(frame_type: int, data_size: int = 0, data_type: str = None, flags: int = 0,
+                       channel: int = 0) -> bytes:
+    """Builds a fixed-size binary frame header, used instead of text headers once negotiated.
+
+    Args:
+        frame_type (int): the type of the frame (one of the frames' *_frame codes).
+        data_size (int, optional): the size of the data following the header, in bytes. Defaults to 0.
+        data_type (str, optional): the data type to be sent. Defaults to None.
+        flags (int, optional): a bit field of frame options. Defaults to 0.
+        channel (int, optional): the logical channel the frame belongs to (0 being the connection itself). Defaults to 0.
+
+    Returns:
+        bytes: the packed frame header
+    """
+    data_type_code = codecs[data_type].code if data_type is not None else 0
+    return frame_struct.pack(frames.magic, frames.version, frame_type, flags, data_type_code, channel, data_size)
+
+
+def split_frame_header(header: bytes, max_data_size: int = None) -> Tuple[int, int, str, int, int]:
+    """Unpacks a binary frame header.
+
+    Args:
+        header (bytes): the header received, of the frame header's size.
+        max_data_size (int, optional): the largest data size accepted. Defaults to None (any data size).
+
+    Raises:
+        FrameError: if the header doesn't start with the protocol's magic or is of an unsupported version.
+        FrameSizeError: if the header announces more than max_data_size bytes.
+
+    Returns:
+        Tuple[int, int, str, int, int]: the frame type, the flags, the data type, the channel and the data size
+    """
+    magic, version, frame_type, flags, data_type_code, channel, data_size = frame_struct.unpack(header)
+    if magic != frames.magic or version != frames.version:
+        raise FrameError(f"Unsupported frame header (magic={magic}, version={version})!")
+    # data, chunks, requests and responses alike: a chunk isn't allocated at once, but is still bounded
+    if max_data_size is not None and data_size > max_data_size:
+        raise FrameSizeError(f"Data size should be <= {max_data_size} (Received {data_size})!")
+
+    return frame_type, flags, codes.get(data_type_code), channel, data_size
+
+
 def split_header(header: str) -> Dict[str, Union[str, int]]:
     """Splits the given header into a dictionnary mapping keys to values.
 
@@ -148,6 +426,10 @@ def split_header(header: str) -> Dict[str, Union[str, int]]:
 
     values = {}
     for part in header.split(headers.values_separator):
+        if len(part) == 0:
+            # headers without contents (e.g. ACCEPT) are only padded
+            continue
+
         key, value = part.split(headers.key_separator)
 
         # convert data type if necessary
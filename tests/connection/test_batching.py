@@ -0,0 +1,97 @@
+import time
+import pytest
+
+from ..utils import with_peers, offer
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    return [{}, {"handlers": {"connection": set_connection_handler}}]
+
+
+def test_batching(peers):
+    """Tests that data sent within the batch window is written at once, in order"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json", batch_window=.2)
+    for i in range(100):
+        assert connection.send({"i": i})
+
+    time.sleep(.05)
+    assert connection.counters.frames_sent == 0 and datas == []
+
+    time.sleep(.5)
+    assert datas == [{"i": i} for i in range(100)]
+    assert connection.counters.frames_sent == 100
+    assert connection.counters.send_latency.count == 1
+
+
+def test_batch_bytes(peers):
+    """Tests that a batch is written without waiting for the end of its window once large enough"""
+    connection = peers[0].connect(peers[1].address_name, data_type="bytes", batch_window=10, batch_bytes=1000)
+    for _ in range(4):
+        assert connection.send(bytes(300))
+
+    time.sleep(.2)
+    assert len(datas) == 4
+    assert connection.counters.send_latency.count == 1
+
+
+def test_flush(peers):
+    """Tests that flushing writes the data batched right away, and that closing flushes it too"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json", batch_window=10)
+    connection.send("first")
+    connection.send("second")
+
+    start = time.perf_counter()
+    assert connection.flush(timeout=1)
+    assert time.perf_counter() - start < .5
+
+    time.sleep(.1)
+    assert datas == ["first", "second"]
+
+    connection.send("last")
+    connection.close()
+    time.sleep(.1)
+    assert datas[-1] == "last"
+
+
+def test_flush_closed(peers):
+    """Tests that flushing doesn't wait for data the writer thread dropped as the connection was closed"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json", batch_window=10)
+    connection.send("dropped")
+    # as if the connection was lost while data was batched
+    connection.active = False
+
+    start = time.perf_counter()
+    connection.flush(timeout=1)
+    assert time.perf_counter() - start < .5
+    assert datas == []
+
+
+def test_nodelay(peers):
+    """Tests that TCP_NODELAY can be set per connection"""
+    connection = peers[0].connect(peers[1].address_name, nodelay=True)
+    assert connection.nodelay
+
+    connection.nodelay = False
+    assert not connection.nodelay
+
+
+def test_batching_offer(peers):
+    """Tests that the remote peer can't choose how the accepting peer batches the data it sends"""
+    sock = offer(peers[1], batch_window=5, batch_bytes=7, nodelay=True)
+    time.sleep(.1)
+
+    connection = peers[1].connections["127.0.0.1:1"]
+    assert connection.batch_window == peers[1].batch_window and connection.send_queue is None
+    assert connection.batch_bytes == peers[1].batch_bytes
+    assert not connection.nodelay
+    sock.close()
@@ -0,0 +1,88 @@
+import time
+import pytest
+
+from ..utils import with_peers
+
+datas = []
+channels = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+    channels.clear()
+
+    def set_channel_handler(connection, channel):
+        channel.handlers["data"] = lambda channel, data: datas.append((channel.data_type, data))
+        channel.handlers["close"] = lambda channel: channels.remove(channel)
+        channels.append(channel)
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(("connection", data))
+        connection.handlers["channel"] = set_channel_handler
+        return True
+
+    return [{}, {"handlers": {"connection": set_connection_handler}}]
+
+
+def test_channels(peers):
+    """Tests data sending over several channels of a single connection"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+    channel_raw = connection.open_channel(data_type="raw")
+    channel_bytes = connection.open_channel(data_type="bytes", strict=False)
+
+    connection.send("2easy4u")
+    channel_raw.send({"data": 1})
+    channel_bytes.send(b"2easy4u")
+
+    time.sleep(.1)
+
+    assert datas == [("connection", "2easy4u"), ("raw", {"data": 1}), ("bytes", b"2easy4u")]
+    assert [channel.channel_id for channel in channels] == [channel_raw.channel_id, channel_bytes.channel_id]
+    assert not channels[1].strict
+
+    channel_raw.close()
+
+    time.sleep(.1)
+
+    assert channel_raw.closed
+    assert len(channels) == 1 and channel_raw.channel_id not in connection.channels
+
+
+def test_channels_text_framing(peers):
+    """Tests that channels can't be opened over text framing"""
+    connection = peers[0].connect(peers[1].address_name, framing="text")
+
+    with pytest.raises(ValueError):
+        connection.open_channel()
+
+
+def test_channel_stream(peers):
+    """Tests that streaming channels only carry data of their fixed size"""
+    from peerpy.exceptions import DataSizeError
+
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+    channel = connection.open_channel(data_type="bytes", stream=True)
+
+    assert channel.send(b"2easy4u")
+    with pytest.raises(DataSizeError):
+        channel.send(b"too long")
+
+    time.sleep(.1)
+
+    assert datas == [("bytes", b"2easy4u")]
+    assert channels[0].stream and channels[0].data_size == 7
+
+
+def test_channel_reopened(peers):
+    """Tests that a channel reopened by the remote peer replaces the previous one, which is closed"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+    connection.open_channel(data_type="raw")
+    connection._next_channel_id -= 2
+    channel = connection.open_channel(data_type="bytes")
+
+    time.sleep(.1)
+
+    remote = peers[1].connections[peers[0].address_name]
+    assert len(channels) == 1 and remote.channels[channel.channel_id].data_type == "bytes"
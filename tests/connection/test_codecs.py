@@ -0,0 +1,62 @@
+import time
+import pytest
+
+from peerpy.codec import Codec, register_codec, valid_data_types
+
+from ..utils import with_peers
+
+datas = []
+
+
+class UpperCodec(Codec):
+    """Test codec sending strings upper-cased"""
+
+    name = "upper"
+    code = 200
+
+    def encode(self, data):
+        return [data.upper().encode("utf-8")]
+
+    def decode(self, buffer):
+        return str(buffer, "utf-8")
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_data_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    return [{}, {"handlers": {"connection": set_data_handler}}]
+
+
+def test_pickle5(peers):
+    """Tests out-of-band buffers sent with the pickle5 data type"""
+    connection = peers[0].connect(peers[1].address_name, data_type="pickle5")
+    payload = bytearray(b"2easy4u" * 1000)
+    assert connection.send({"payload": payload, "name": "test"})
+
+    time.sleep(.1)
+
+    assert len(datas) == 1
+    assert datas[0]["name"] == "test"
+    assert bytes(datas[0]["payload"]) == bytes(payload)
+
+
+def test_register_codec(peers):
+    """Tests sending data with a registered codec, and registering it twice"""
+    if UpperCodec.name not in valid_data_types:
+        register_codec(UpperCodec)
+
+    with pytest.raises(ValueError):
+        register_codec(UpperCodec)
+
+    connection = peers[0].connect(peers[1].address_name, data_type="upper")
+    connection.send("2easy4u")
+
+    time.sleep(.1)
+
+    assert datas == ["2EASY4U"]
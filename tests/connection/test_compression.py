@@ -0,0 +1,121 @@
+import gc
+import time
+import pytest
+import warnings
+
+from peerpy.compression import Compressor, valid_compressions, register_zdict
+from peerpy.exceptions import FrameError
+
+from ..utils import with_peers
+
+datas = []
+connections = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+    connections.clear()
+
+    def set_data_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        connections.append(connection)
+        return True
+
+    return [{}, {"handlers": {"connection": set_data_handler}}]
+
+
+@pytest.mark.parametrize("compression", valid_compressions)
+def test_compression(peers, compression):
+    """Tests sending data compressed above the compression threshold only"""
+    connection = peers[0].connect(peers[1].address_name, compression=compression, compression_threshold=256)
+    telemetry = [{"sensor": "temperature", "value": 21.5}] * 100
+
+    assert connection.send("2easy4u")
+    assert connection.send(telemetry)
+
+    time.sleep(.1)
+
+    assert datas == ["2easy4u", telemetry]
+
+    stats = connection.compression_stats
+    assert stats["algorithm"] == compression
+    assert stats["compressed_frames"] == 1 and stats["skipped_frames"] == 1
+    assert stats["ratio"] > 5
+    assert connections[0].compression_stats["decompressed_frames"] == 1
+
+
+@pytest.mark.parametrize("compression", valid_compressions)
+def test_decompression_limit(compression):
+    """Tests that data decompressing to more than the size allowed, or truncated, is rejected"""
+    compressor = Compressor(compression, threshold=0)
+    data = bytes(2 ** 20)
+    compressed = compressor.compress([data], len(data))
+
+    assert compressor.decompress(compressed, len(data)) == data
+    with pytest.raises(FrameError):
+        compressor.decompress(compressed, len(data) - 1)
+    with pytest.raises(FrameError):
+        compressor.decompress(compressed[:len(compressed) // 2], len(data))
+
+
+def test_decompression_bomb(peers):
+    """Tests that compressed data expanding past the peer's max_data_size is dropped"""
+    peers[1].max_data_size = 2 ** 16
+    connection = peers[0].connect(peers[1].address_name, data_type="bytes", compression="zlib")
+    assert connection.send(bytes(2 ** 20))
+    assert connection.send(b"2easy4u")
+
+    time.sleep(.2)
+
+    assert datas == [b"2easy4u"]
+    assert connections[0].counters.corrupted == 1
+
+
+def test_zdict(peers):
+    """Tests compressing small messages with a preset dictionary registered by both peers"""
+    zdict_id = register_zdict(b'{"data": {"sensor": "temperature", "value": ')
+    connection = peers[0].connect(peers[1].address_name, compression="zlib", compression_threshold=0,
+                                  zdict=zdict_id)
+
+    assert connection.compressor.zdict_id == zdict_id
+    assert connection.send({"sensor": "temperature", "value": 21.5})
+
+    time.sleep(.1)
+
+    assert datas == [{"sensor": "temperature", "value": 21.5}]
+    assert connection.compression_stats["ratio"] > 1
+
+
+def test_unregistered_zdict(peers):
+    """Tests that a preset dictionary not registered by the remote peer is not used"""
+    connection = peers[0].connect(peers[1].address_name, compression="zlib", compression_threshold=0,
+                                  zdict=b"unknown dictionary")
+
+    assert connection.compressor is not None and connection.compressor.zdict is None
+    assert connection.send("2easy4u" * 10)
+
+    time.sleep(.1)
+
+    assert datas == ["2easy4u" * 10]
+
+
+def test_text_framing(peers):
+    """Tests that compression is not used without binary framing"""
+    connection = peers[0].connect(peers[1].address_name, compression="zlib", framing="text")
+
+    assert connection.compressor is None and connection.compression_stats is None
+
+
+def test_invalid_compression(peers):
+    """Tests proposing an unknown compression"""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        with pytest.raises(ValueError):
+            peers[0].connect(peers[1].address_name, compression="zstd")
+        with pytest.raises(ValueError):
+            peers[0].connect(peers[1].address_name, stream=True, data_size=0)
+        # no socket was left open
+        gc.collect()
+    assert not [warning for warning in caught if issubclass(warning.category, ResourceWarning)]
@@ -0,0 +1,76 @@
+import time
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from peerpy.send_queue import SendQueue
+from peerpy.dispatcher import Dispatcher
+
+from ..utils import with_peers
+
+datas = []
+
+
+def slow_handler(connection, data):
+    time.sleep(.05)
+    datas.append(data)
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = slow_handler
+        return True
+
+    return [{}, {"conflate": True, "handlers": {"connection": set_connection_handler}}]
+
+
+def test_conflate(peers):
+    """Tests that a late data handler skips intermediate data, and is always passed the latest data"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json", stream=True)
+    for i in range(100):
+        assert connection.send(f"frame{i:03d}")
+
+    time.sleep(.5)
+
+    remote = peers[1].connections[peers[0].address_name]
+    assert datas[-1] == "frame099"
+    assert len(datas) < 10 and datas == sorted(datas)
+    assert remote.counters.conflated == 100 - len(datas)
+
+
+def test_conflate_sends(peers):
+    """Tests that data sent replaces the data not yet sent"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json", conflate_sends=True)
+    for i in range(100):
+        assert connection.send(f"frame{i:03d}")
+
+    time.sleep(.5)
+
+    assert datas[-1] == "frame099"
+    assert connection.dropped + connection.counters.frames_sent == 100
+
+
+def test_latest_tasks():
+    """Tests that a task submitted with a key replaces the task of the same key still waiting"""
+    dispatcher = Dispatcher(ThreadPoolExecutor(max_workers=1), 4)
+    results = []
+
+    dispatcher.submit(time.sleep, .1)
+    assert dispatcher.submit_latest("a", results.append, "a1") == 0
+    assert dispatcher.submit_latest("b", results.append, "b1") == 0
+    dispatcher.submit(results.append, "event")
+    assert dispatcher.submit_latest("a", results.append, "a2") == 1
+
+    time.sleep(.2)
+    assert results == ["b1", "event", "a2"]
+
+    send_queue = SendQueue(1)
+    send_queue.put("open")
+    send_queue.put_latest("a1", 1)
+    send_queue.put_latest("a2", 1)
+    assert [send_queue.get() for _ in range(2)] == ["open", "a2"]
+    assert send_queue.dropped == 1
@@ -0,0 +1,76 @@
+import time
+import pytest
+
+from ..utils import with_peers, offer
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def slow_handler(connection, data):
+        time.sleep(.01)
+        datas.append(data)
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = slow_handler
+        return True
+
+    peer_receiver_args = {
+        "executor": "thread",
+        "handlers": {
+            "connection": set_connection_handler
+        }
+    }
+
+    return [{}, peer_receiver_args, {}]
+
+
+def test_executor_order(peers):
+    """Tests that data handled by an executor keeps its order for each connection"""
+    connection_0 = peers[0].connect(peers[1].address_name)
+    connection_2 = peers[2].connect(peers[1].address_name)
+
+    datas_test_0 = [f"data{i}" for i in range(10)]
+    datas_test_2 = [f"other{i}" for i in range(10)]
+    for data_0, data_2 in zip(datas_test_0, datas_test_2):
+        connection_0.send(data_0)
+        connection_2.send(data_2)
+
+    time.sleep(.1)
+
+    # both connections are handled concurrently
+    assert len(datas) < len(datas_test_0) + len(datas_test_2)
+
+    time.sleep(.2)
+
+    assert [data for data in datas if data in datas_test_0] == datas_test_0
+    assert [data for data in datas if data in datas_test_2] == datas_test_2
+
+
+def test_executor_max_pending(peers):
+    """Tests that a connection's reader waits for its pending handlers"""
+    connection = peers[0].connect(peers[1].address_name)
+    dispatcher = peers[1].connections[peers[0].address_name].dispatcher
+
+    for i in range(dispatcher.max_pending + 10):
+        connection.send(i)
+
+    time.sleep(.1)
+
+    assert 0 < dispatcher.pending <= dispatcher.max_pending
+
+
+def test_executor_offer(peers):
+    """Tests that the remote peer can't choose how the accepting peer runs its data handlers"""
+    sock = offer(peers[1], executor="process", max_pending=7, conflate=True)
+    time.sleep(.1)
+
+    connection = peers[1].connections["127.0.0.1:1"]
+    assert connection.dispatcher.executor is peers[1].executor and not connection._owns_executor
+    assert connection.dispatcher.max_pending == peers[1].max_pending
+    assert not connection.conflate
+    sock.close()
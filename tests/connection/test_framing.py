@@ -0,0 +1,48 @@
+import time
+import pytest
+
+from ..utils import with_peers
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    return [{}, {"handlers": {"connection": set_connection_handler}}]
+
+
+def test_binary_framing(peers):
+    """Tests that binary framing is negotiated by default and carries data"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+
+    assert connection.binary_framing
+    assert peers[1].connections[peers[0].address_name].binary_framing
+
+    datas_test = [{"data": i} for i in range(10)]
+    for data in datas_test:
+        connection.send(data)
+
+    time.sleep(.1)
+
+    assert datas == datas_test
+
+
+def test_text_framing(peers):
+    """Tests that text headers are still used when binary framing is not proposed"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json", framing="text")
+
+    assert not connection.binary_framing
+    assert not peers[1].connections[peers[0].address_name].binary_framing
+
+    connection.send("2easy4u")
+
+    time.sleep(.1)
+
+    assert datas == ["2easy4u"]
@@ -0,0 +1,87 @@
+import time
+import socket
+import pytest
+
+from peerpy.timer_wheel import TimerWheel
+
+from ..utils import with_peers
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    return [
+        {"heartbeat_interval": .2, "keepalive": True, "keepalive_idle": 30, "keepalive_interval": 5, "keepalive_count": 3},
+        {"heartbeat_interval": .5, "dead_timeout": .5}
+    ]
+
+
+def test_idle_heartbeats(peers):
+    """Tests that heartbeats are only sent over connections which sent nothing for the heartbeat interval"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+
+    time.sleep(1.)
+    assert connection.counters.pings_sent >= 3
+
+    pings_sent = connection.counters.pings_sent
+    for _ in range(20):
+        assert connection.send("2easy4u")
+        time.sleep(.05)
+
+    assert connection.counters.pings_sent <= pings_sent + 1
+
+
+def test_dead_peer(peers):
+    """Tests that a connection over which nothing was received for the dead timeout is closed"""
+    connection = peers[1].connect(peers[0].address_name, data_type="json")
+    # the remote peer only sends heartbeats every 10 seconds
+    peers[0].heartbeat_interval = 10.
+
+    time.sleep(.2)
+    assert not connection.closed
+
+    time.sleep(.8)
+    assert connection.closed
+
+
+def test_dead_timeout_validation(peers):
+    """Tests that the dead timeout can't be shorter than the heartbeat interval"""
+    from peerpy import Peer
+
+    with pytest.raises(ValueError):
+        Peer(heartbeat_interval=1., dead_timeout=.5)
+    with pytest.raises(ValueError):
+        peers[1].heartbeat_interval = 1.
+
+
+def test_keepalive(peers):
+    """Tests that TCP keepalive options are set on the connections' sockets"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+
+    assert connection.sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE) != 0
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        assert connection.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE) == 30
+        assert connection.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT) == 3
+
+
+def test_timeout_propagation(peers):
+    """Tests that a new timeout is applied to the sockets of existing connections"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+    peers[0].timeout = .3
+
+    assert connection.sock.gettimeout() == .3
+
+
+def test_timer_wheel():
+    """Tests that timers are called in order, beyond a turn of the wheel, unless cancelled"""
+    wheel = TimerWheel(tick=.01, slots=8)
+    calls = []
+
+    wheel.schedule(.15, calls.append, "late")
+    wheel.schedule(.02, calls.append, "early")
+    wheel.schedule(.05, calls.append, "cancelled").cancel()
+
+    time.sleep(.3)
+    wheel.stop()
+
+    assert calls == ["early", "late"]
@@ -0,0 +1,80 @@
+import time
+import pytest
+
+from ..utils import with_peers
+
+numpy = pytest.importorskip("numpy")
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_data_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    return [{}, {"handlers": {"connection": set_data_handler}}]
+
+
+def test_ndarray(peers):
+    """Tests sending arrays of different dtypes and shapes"""
+    connection = peers[0].connect(peers[1].address_name, data_type="ndarray")
+    arrays = [
+        numpy.arange(12, dtype=numpy.float64).reshape(3, 4),
+        numpy.arange(10, dtype=">i4")[::2],  # non-contiguous, non-native byte order
+        numpy.array(7, dtype=numpy.uint8),
+        numpy.zeros((0, 3), dtype=numpy.int16)
+    ]
+    for array in arrays:
+        assert connection.send(array)
+
+    time.sleep(.1)
+
+    assert len(datas) == len(arrays)
+    for received, array in zip(datas, arrays):
+        assert received.dtype == array.dtype
+        assert received.shape == array.shape
+        assert numpy.array_equal(received, array)
+
+
+def test_ndarray_ring(peers):
+    """Tests that arrays are received into a ring of reused buffers"""
+    connection = peers[0].connect(peers[1].address_name, data_type="ndarray")
+    for i in range(5):
+        connection.send(numpy.full(256, i, dtype=numpy.uint8))
+
+    time.sleep(.1)
+
+    # the receive buffer of the 1st array was reused by the 5th one (the ring holds 4 buffers by default)
+    assert numpy.shares_memory(datas[0], datas[4])
+    assert datas[0][0] == 4 and datas[3][0] == 3
+
+
+def test_ndarray_type(peers):
+    """Tests sending objects that are not arrays"""
+    from peerpy.exceptions import DataTypeError
+
+    connection = peers[0].connect(peers[1].address_name, data_type="ndarray")
+    with pytest.raises(DataTypeError):
+        connection.send([1, 2, 3])
+
+
+def test_ndarray_executor(peers):
+    """Tests that arrays waiting for a data handler run by an executor are never overwritten"""
+    connection = peers[0].connect(peers[1].address_name, data_type="ndarray", executor="thread")
+    remote = peers[1].connections[peers[0].address_name]
+
+    def slow_handler(connection, data):
+        time.sleep(.01)
+        datas.append(data)
+
+    connection.handlers["data"] = slow_handler
+    for i in range(12):
+        remote.send(numpy.full(256, i, dtype=numpy.uint8))
+
+    time.sleep(.5)
+    assert [int(data[0]) for data in datas] == list(range(12))
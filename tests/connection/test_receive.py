@@ -1,6 +1,9 @@
 import time
 import pytest
 
+from peerpy.protocol import frames
+from peerpy.utils import build_frame_header, build_data_header
+
 from ..utils import with_peers
 
 datas = []
@@ -85,3 +88,37 @@ def test_receive_stream(peers):
     time.sleep(.1)
 
     assert datas == datas_test
+
+
+def test_receive_slow_body(peers):
+    """Tests that data whose body arrives after the socket's timeout is still received, keeping the framing"""
+    peers[1].timeout = .1
+    connection = peers[0].connect(peers[1].address_name, data_type="bytes")
+    time.sleep(.1)
+
+    connection.sock.sendall(build_frame_header(frames.data_frame, 7, "bytes"))
+    time.sleep(.3)
+    connection.sock.sendall(b"2easy4u")
+    connection.send(b"next")
+
+    time.sleep(.1)
+
+    assert datas == [b"2easy4u", b"next"]
+
+
+@pytest.mark.parametrize("framing", ["binary", "text"])
+def test_receive_oversized(peers, framing):
+    """Tests that a connection announcing more data than the peer accepts is closed, without allocating it"""
+    connection = peers[0].connect(peers[1].address_name, data_type="bytes", framing=framing)
+    time.sleep(.1)
+
+    remote = peers[1].connections[peers[0].address_name]
+    closed = []
+    remote.handlers["close"] = lambda connection: closed.append(connection)
+
+    connection.sock.sendall(build_frame_header(frames.data_frame, 2 ** 62, "bytes") if framing == "binary"
+                            else build_data_header(2 ** 62, "bytes"))
+    time.sleep(.2)
+
+    assert remote.closed and closed == [remote] and remote.counters.corrupted == 1
+    assert peers[0].address_name not in peers[1].connections
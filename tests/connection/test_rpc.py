@@ -0,0 +1,93 @@
+import time
+import pytest
+
+from peerpy.exceptions import RemoteError
+
+from ..utils import with_peers
+
+
+def sleep_and_echo(connection, payload):
+    time.sleep(payload)
+    return payload
+
+
+def fail(connection, payload):
+    raise KeyError(payload)
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    def register_methods(peer, connection):
+        connection.register_method("sleep", sleep_and_echo)
+        return True
+
+    return [{}, {"executor": "thread", "handlers": {"connection": register_methods}}]
+
+
+def test_request(peers):
+    """Tests requests answered by methods registered on the remote peer or connection"""
+    peers[1].register_method("default", lambda connection, payload: payload * 2)
+    peers[1].register_method("fail", fail)
+
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+    assert connection.request([1, 2]).result(timeout=1) == [1, 2, 1, 2]
+    assert connection.request(0, method="sleep").result(timeout=1) == 0
+
+    with pytest.raises(RemoteError, match="KeyError"):
+        connection.request("2easy4u", method="fail").result(timeout=1)
+    with pytest.raises(RemoteError, match="not registered"):
+        connection.request("2easy4u", method="unknown").result(timeout=1)
+
+    assert connection.counters.requests_sent == 4
+    assert peers[1].connections[peers[0].address_name].counters.requests_received == 4
+
+
+def test_pipelining(peers):
+    """Tests that many requests can wait for their response, answered in any order"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+
+    answered = []
+    futures = [connection.request(delay, method="sleep") for delay in [.3, .2, .1, 0]]
+    for future in futures:
+        future.add_done_callback(lambda future: answered.append(future.result()))
+
+    start = time.perf_counter()
+    assert [future.result(timeout=1) for future in futures] == [.3, .2, .1, 0]
+    # requests are handled concurrently, not one round trip after the other
+    assert time.perf_counter() - start < .5
+    assert answered == [0, .1, .2, .3]
+
+
+def test_request_timeout(peers):
+    """Tests that requests fail once their timeout expired, or their connection was closed"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+
+    with pytest.raises(TimeoutError):
+        connection.request(.5, timeout=.2, method="sleep").result(timeout=1)
+
+    future = connection.request(.5, method="sleep")
+    connection.close()
+    with pytest.raises(ConnectionAbortedError):
+        future.result(timeout=2)
+
+
+def test_request_cancel(peers):
+    """Tests that cancelled requests never stop their connection from receiving"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+
+    futures = [connection.request(.1, method="sleep"), connection.request(.1, timeout=.2, method="sleep")]
+    for future in futures:
+        assert future.cancel()
+    time.sleep(.3)
+
+    assert connection.active
+    assert connection.request(0, method="sleep").result(timeout=1) == 0
+
+
+def test_text_framing(peers):
+    """Tests that requests can't be sent without binary framing"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json", framing="text")
+
+    with pytest.raises(ValueError):
+        connection.request(0)
@@ -1,5 +1,8 @@
+import socket
+import threading
 import pytest
 
+from peerpy.utils import send_buffers, receive_exactly
 from ..utils import with_peers
 
 
@@ -22,3 +25,19 @@ def test_stream(peers):
 
     for _ in range(10):
         connection.send("2easy4u")
+
+
+def test_send_buffers():
+    """Tests that scatter/gather sending resumes partial writes in order"""
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        buffers = [b"header", bytes(range(256)) * 2 ** 12, b"", b"tail"]
+        expected = b"".join(buffers)
+
+        thread = threading.Thread(target=send_buffers, args=(sender, buffers))
+        thread.start()
+
+        received = receive_exactly(receiver, len(expected), 2 ** 10)
+        thread.join()
+
+        assert received == expected
@@ -0,0 +1,76 @@
+import time
+import pytest
+
+from peerpy.send_queue import SendQueue
+from peerpy.exceptions import SendQueueFullError
+from ..utils import with_peers, offer
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    return [{}, {"handlers": {"connection": set_connection_handler}}]
+
+
+def test_send_queued(peers):
+    """Tests data sending through a connection's send queue"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json", send_queue_size=4)
+
+    datas_test = [f"data{i}" for i in range(15)]
+    for data in datas_test:
+        assert connection.send(data)
+
+    time.sleep(.1)
+
+    assert datas == datas_test
+    assert connection.queue_depth == 0
+    assert connection.dropped == 0
+
+
+def test_send_queue_offer(peers):
+    """Tests that the remote peer can't give the accepting peer's connection a send queue"""
+    sock = offer(peers[1], send_queue_size=7, send_policy="drop_oldest", conflate_sends=True)
+    time.sleep(.1)
+
+    connection = peers[1].connections["127.0.0.1:1"]
+    assert connection.send_queue is None and connection.writer_thread is None
+    assert not connection.conflate_sends
+    sock.close()
+
+
+def test_send_queue_policies():
+    """Tests the policies applied when a send queue is full"""
+    send_queue = SendQueue(2, "drop_oldest")
+    for i in range(4):
+        assert send_queue.put(i)
+
+    assert send_queue.depth == 2 and send_queue.dropped == 2
+    assert send_queue.get() == 2
+
+    send_queue = SendQueue(2, "drop_newest")
+    assert [send_queue.put(i) for i in range(3)] == [True, True, False]
+    assert send_queue.dropped == 1
+    assert send_queue.get() == 0
+
+    send_queue = SendQueue(1, "block")
+    send_queue.put(0)
+    start = time.perf_counter()
+    assert not send_queue.put(1, timeout=.1)
+    assert time.perf_counter() - start >= .1
+
+    send_queue = SendQueue(1, "raise")
+    send_queue.put(0)
+    with pytest.raises(SendQueueFullError):
+        send_queue.put(1)
+
+    send_queue.close()
+    assert send_queue.get() == 0
+    assert send_queue.get() is None
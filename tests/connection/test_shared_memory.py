@@ -0,0 +1,159 @@
+import os
+import time
+import pytest
+import socket
+import threading
+
+from peerpy.shared_ring import SharedRing, SharedMemorySocket, create_segment, attach_segment, unlink_segment
+
+from ..utils import with_peers
+
+datas = []
+transfers = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+    transfers.clear()
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(bytes(data))
+        connection.handlers["transfer"] = lambda connection, transfer: transfers.append(transfer)
+        return True
+
+    # small rings, so that data larger than them is sent in several pieces
+    return [{"shared_memory": True, "shared_memory_size": 2 ** 16}, {"handlers": {"connection": set_connection_handler}},
+            {"reactor": True, "handlers": {"connection": set_connection_handler}}]
+
+
+def test_shared_memory(peers):
+    """Tests that peers on the same host exchange data through shared memory, whatever its size"""
+    connection = peers[0].connect(peers[1].address_name, data_type="bytes")
+    time.sleep(.1)
+
+    remote = peers[1].connections[peers[0].address_name]
+    assert connection.shared_memory and remote.shared_memory
+
+    content = os.urandom(2 ** 20)
+    for data in [b"small", content, b"last"]:
+        assert connection.send(data)
+
+    time.sleep(.5)
+    assert datas == [b"small", content, b"last"]
+
+    # the other direction has its own ring
+    received = []
+    connection.handlers["data"] = lambda connection, data: received.append(bytes(data))
+    assert remote.send(content)
+    time.sleep(.5)
+    assert received == [content]
+
+
+def test_shared_memory_file(peers, tmp_path):
+    """Tests sending a file straight into shared memory"""
+    path = tmp_path / "sent.bin"
+    content = os.urandom(3 * 2 ** 16 + 123)
+    path.write_bytes(content)
+
+    connection = peers[0].connect(peers[1].address_name, chunk_size=2 ** 16)
+    assert connection.shared_memory
+    assert connection.send_file(str(path))
+
+    time.sleep(.5)
+    assert transfers[0].done and transfers[0].received == len(content)
+
+
+def test_shared_memory_close():
+    """Tests that closing the transport while other threads use its rings makes them fail as a closed socket would"""
+    sockets = socket.socketpair()
+    segment = create_segment("peer", 2 ** 12)
+    remote_segment = attach_segment(segment.name, "peer")
+    unlink_segment(segment)
+    sender = SharedMemorySocket(sockets[0], segment, initiator=True)
+    receiver = SharedMemorySocket(sockets[1], remote_segment, initiator=False)
+    errors = []
+
+    def send():
+        try:
+            while True:
+                sender.sendall(bytes(1000))
+        except Exception as error:
+            errors.append(error)
+
+    def receive():
+        buffer = bytearray(3000)
+        try:
+            while receiver.recv_into(buffer) > 0:
+                pass
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=send), threading.Thread(target=receive)]
+    for thread in threads:
+        thread.start()
+    time.sleep(.1)
+    sender.close()
+    receiver.close()
+    for thread in threads:
+        thread.join(1)
+
+    assert all([isinstance(error, OSError) for error in errors])
+
+
+def test_reactor_fallback(peers):
+    """Tests that a peer running a reactor declines shared memory, falling back to TCP"""
+    connection = peers[0].connect(peers[2].address_name, data_type="bytes")
+    assert not connection.shared_memory
+
+    assert connection.send(b"over tcp")
+    time.sleep(.2)
+    assert datas == [b"over tcp"]
+
+
+def test_unsupported_host(peers, monkeypatch):
+    """Tests that shared memory is never proposed on hosts whose memory ordering the rings can't rely on"""
+    monkeypatch.setattr("peerpy.shared_ring.supported", False)
+    connection = peers[0].connect(peers[1].address_name, data_type="bytes")
+    assert not connection.shared_memory
+
+    assert connection.send(b"over tcp")
+    time.sleep(.2)
+    assert datas == [b"over tcp"]
+
+
+def test_handshake_failure(peers, monkeypatch):
+    """Tests that the segment proposed is unlinked even if the handshake fails unexpectedly"""
+    segments = []
+
+    def record_segment(*args):
+        segments.append(create_segment(*args))
+        return segments[-1]
+
+    monkeypatch.setattr("peerpy.shared_ring.create_segment", record_segment)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("handshake failed")
+
+    monkeypatch.setattr("peerpy.peer.build_hello_header", fail)
+    with pytest.raises(RuntimeError):
+        peers[0].connect(peers[1].address_name)
+
+    assert len(segments) == 1
+    assert not os.path.exists(f"/dev/shm/{segments[0].name}")
+
+
+def test_ring():
+    """Tests that a ring wraps around, and never overwrites bytes not yet read"""
+    ring = SharedRing(memoryview(bytearray(SharedRing.header_size + 10)))
+    buffer = memoryview(bytearray(10))
+
+    assert ring.write(b"abcdefgh") == 8
+    assert ring.read_into(buffer[:6]) == 6
+    assert ring.write(b"ijklmnopqrst") == 8
+    assert ring.writable() == 0
+
+    assert ring.read_into(buffer) == 10
+    assert bytes(buffer) == b"ghijklmnop"
+    assert ring.readable() == 0 and ring.head == ring.tail == 16
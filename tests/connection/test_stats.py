@@ -0,0 +1,88 @@
+import time
+import pytest
+
+from peerpy.stats import Histogram
+from peerpy.protocol import frames
+from peerpy.utils import build_frame_header
+
+from ..utils import with_peers
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_data_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    return [{}, {"handlers": {"connection": set_data_handler}},
+            {"reactor": True, "handlers": {"connection": set_data_handler}}]
+
+
+def test_stats(peers):
+    """Tests the counters of both ends of a connection, and of their peers"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+    for _ in range(3):
+        assert connection.send("2easy4u")
+    connection.send_iter([b"2easy4u"])  # a transfer of 3 frames, which is not a message
+
+    time.sleep(.1)
+
+    remote = peers[1].connections[peers[0].address_name]
+    sent, received = connection.stats(), remote.stats()
+
+    assert sent["messages_sent"] == 3 and sent["frames_sent"] == 6
+    assert sent["send_latency"]["count"] == 6
+    assert received["messages_received"] == 3
+    assert received["bytes_received"] == sent["bytes_sent"]
+    assert received["handler_latency"]["count"] == 3
+
+    assert peers[1].stats()["messages_received"] == 3
+    connection.close()
+    connection.thread.join()
+
+    assert peers[0].stats()["connections"] == 0 and peers[0].stats()["messages_sent"] == 3
+
+
+@pytest.mark.parametrize("framing", ["text", "binary"])
+@pytest.mark.parametrize("remote", [1, 2])
+def test_bytes(peers, framing, remote):
+    """Tests that both ends of a connection count the headers of frames, whatever their framing and receiving thread"""
+    connection = peers[0].connect(peers[remote].address_name, data_type="bytes", framing=framing)
+    for size in [0, 10, 1000]:
+        assert connection.send(bytes(size))
+
+    time.sleep(.1)
+
+    assert len(datas) == 3
+    received = peers[remote].connections[peers[0].address_name].stats()
+    assert received["bytes_received"] == connection.stats()["bytes_sent"]
+
+
+def test_ignored(peers):
+    """Tests counting data ignored by a strict connection"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+    # data of another data type
+    connection._submit_buffers([build_frame_header(frames.data_frame, 7, "bytes"), b"2easy4u"])
+    connection.send("2easy4u")
+
+    time.sleep(.1)
+
+    assert datas == ["2easy4u"]
+    assert peers[1].stats()["ignored"] == 1
+
+
+def test_histogram():
+    """Tests histogram percentiles"""
+    histogram = Histogram()
+    for _ in range(99):
+        histogram.record(.00001)  # 10us
+    histogram.record(.01)  # 10ms
+
+    assert histogram.percentile(50) == 16.
+    assert histogram.percentile(100) == 16384.
+    assert histogram.to_dict()["count"] == 100
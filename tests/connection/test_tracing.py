@@ -0,0 +1,78 @@
+import json
+import time
+import pytest
+
+from peerpy import tracing
+
+from ..utils import with_peers
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_data_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    return [{}, {"handlers": {"connection": set_data_handler}}, {"reactor": True}]
+
+
+def test_file_tracer(peers, tmp_path):
+    """Tests tracing a message from its encoding to its handler, to a Chrome trace file"""
+    connection = peers[0].connect(peers[1].address_name, data_type="json")
+
+    path = str(tmp_path / "trace.json")
+    with tracing.FileTracer(path) as tracer:
+        tracing.set_tracer(tracer)
+        try:
+            connection.send("2easy4u")
+            time.sleep(.1)
+        finally:
+            tracing.set_tracer(None)
+
+    assert datas == ["2easy4u"]
+
+    with open(path) as file:
+        events = {event["name"]: event for event in json.load(file)}
+
+    assert {"encode", "send", "write", "receive", "decode", "handle"} <= set(events)
+    assert events["send"]["args"]["message_id"] == events["encode"]["args"]["message_id"]
+    assert events["decode"]["args"]["message_id"] == events["receive"]["args"]["message_id"]
+    assert events["receive"]["args"]["size"] == events["encode"]["args"]["size"]
+    assert events["handle"]["args"]["event"] == "data"
+    assert all([event["ph"] == "X" and event["dur"] >= 0 for event in events.values()])
+
+
+def test_reactor_tracer(peers, tmp_path):
+    """Tests that the receive span of a frame received by a reactor covers what is done with it"""
+    peers[2].register_method("sleep", lambda connection, payload: time.sleep(payload))
+    connection = peers[0].connect(peers[2].address_name, data_type="json")
+
+    path = str(tmp_path / "trace.json")
+    with tracing.FileTracer(path) as tracer:
+        tracing.set_tracer(tracer)
+        try:
+            connection.request(.05, method="sleep").result(timeout=1)
+            # the response is sent before the spans of the request end
+            time.sleep(.1)
+        finally:
+            tracing.set_tracer(None)
+
+    with open(path) as file:
+        # spans of the reactor's thread
+        events = {event["name"]: event for event in json.load(file) if event["tid"] == peers[2].server_thread.ident}
+
+    receive, handle = events["receive"], events["handle"]
+    assert handle["args"]["event"] == "request"
+    assert receive["ts"] <= handle["ts"] and handle["ts"] + handle["dur"] <= receive["ts"] + receive["dur"]
+
+
+def test_no_tracer():
+    """Tests that spans do nothing without tracer"""
+    assert tracing.tracer is None
+    with tracing.span("encode", size=1) as span:
+        assert not span
@@ -0,0 +1,118 @@
+import os
+import time
+import pytest
+
+from peerpy.protocol import defaults
+
+from ..utils import with_peers, offer
+
+transfers = []
+chunks = []
+received = {}
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    transfers.clear()
+    chunks.clear()
+    received.clear()
+
+    def set_transfer_handler(connection, transfer):
+        transfers.append(transfer)
+        if transfer.name == "chunks":
+            transfer.handlers["chunk"] = lambda transfer, chunk: chunks.append(bytes(chunk))
+        elif transfer.name == "buffer":
+            received["buffer"] = bytearray(transfer.size)
+            transfer.into(received["buffer"])
+        else:
+            transfer.save(received["path"])
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["transfer"] = set_transfer_handler
+        return True
+
+    return [{}, {"handlers": {"connection": set_connection_handler}}]
+
+
+def test_send_file(peers, tmp_path):
+    """Tests sending a file in several chunks, written to a file by the remote peer"""
+    path = tmp_path / "sent.bin"
+    content = os.urandom(3 * 2 ** 16 + 123)
+    path.write_bytes(content)
+    received["path"] = str(tmp_path / "received.bin")
+
+    connection = peers[0].connect(peers[1].address_name, chunk_size=2 ** 16)
+    assert connection.send_file(str(path))
+
+    time.sleep(.2)
+
+    assert transfers[0].name == "sent.bin" and transfers[0].size == len(content)
+    assert transfers[0].done and transfers[0].received == len(content)
+    assert (tmp_path / "received.bin").read_bytes() == content
+
+
+def test_send_file_closed(peers, tmp_path):
+    """Tests that sending a file fails without raising when the connection is closed meanwhile"""
+    path = tmp_path / "sent.bin"
+    path.write_bytes(os.urandom(2 ** 16))
+    received["path"] = str(tmp_path / "received.bin")
+
+    connection = peers[0].connect(peers[1].address_name)
+    # as closing does while the file is being sent
+    connection.sock.settimeout(0)
+    assert not connection.send_file(str(path))
+    assert connection.closed
+
+
+def test_send_iter(peers):
+    """Tests sending chunks of unknown total size, passed to the chunk handler"""
+    connection = peers[0].connect(peers[1].address_name)
+    assert connection.send_iter((bytes([i]) * 1000 for i in range(10)), name="chunks")
+    assert connection.send("2easy4u")
+
+    time.sleep(.1)
+
+    assert transfers[0].size is None and transfers[0].done
+    assert chunks == [bytes([i]) * 1000 for i in range(10)]
+
+
+def test_send_into(peers):
+    """Tests receiving a transfer straight into a buffer"""
+    connection = peers[0].connect(peers[1].address_name)
+    content = os.urandom(10000)
+    assert connection.send_iter([content[:5000], content[5000:]], name="buffer", size=len(content))
+
+    time.sleep(.1)
+
+    assert received["buffer"] == content
+
+
+def test_text_framing(peers):
+    """Tests that transfers are not available without binary framing"""
+    connection = peers[0].connect(peers[1].address_name, framing="text")
+    with pytest.raises(ValueError):
+        connection.send_iter([b"2easy4u"])
+
+
+def test_transfer_offer(peers):
+    """Tests that the remote peer can't choose the chunk size, and thus the buffer, of the accepting peer"""
+    sock = offer(peers[1], chunk_size=99999999, framing="binary")
+    time.sleep(.1)
+
+    assert peers[1].connections["127.0.0.1:1"].chunk_size == defaults.chunk_size
+    sock.close()
+
+
+def test_transfer_oversized(peers):
+    """Tests that a connection announcing a chunk larger than the peer accepts is closed"""
+    peers[1].max_data_size = 1000
+    connection = peers[0].connect(peers[1].address_name)
+    time.sleep(.1)
+
+    remote = peers[1].connections[peers[0].address_name]
+    assert connection.send_iter([bytes(100), bytes(2000)], name="chunks")
+    time.sleep(.2)
+
+    assert chunks == [bytes(100)]
+    assert remote.closed and remote.counters.corrupted == 1
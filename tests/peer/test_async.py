@@ -0,0 +1,66 @@
+import asyncio
+
+from peerpy import Peer, AsyncPeer
+from peerpy.protocol import frames
+from peerpy.utils import build_frame_header
+
+
+def test_async_receive():
+    """Tests data exchange between two asyncio peers, iterating over incoming data"""
+    async def scenario():
+        async with AsyncPeer(timeout=1.) as peer_0, AsyncPeer(timeout=1.) as peer_1:
+            connection = await peer_0.connect(peer_1.address_name)
+
+            assert connection
+            assert peer_0.address_name in peer_1.connections
+
+            datas_test = [f"data{i}" for i in range(15)]
+            for data in datas_test:
+                assert await connection.send(data)
+
+            connection_ = peer_1.connections[peer_0.address_name]
+            return [await asyncio.wait_for(connection_.receive(), 1.) for _ in datas_test] == datas_test
+
+    assert asyncio.run(scenario())
+
+
+def test_async_handlers():
+    """Tests coroutine handlers of an asyncio peer connected to a threaded peer"""
+    datas = []
+
+    async def on_data(connection, data):
+        datas.append(data)
+
+    def set_connection_handler(peer, connection):
+        connection.set_handler("data", on_data)
+
+    async def scenario():
+        with Peer(timeout=1.) as peer_0:
+            async with AsyncPeer(timeout=1., handlers={"connection": set_connection_handler}) as peer_1:
+                # the threaded peer blocks while connecting, so it must not block the event loop
+                loop = asyncio.get_running_loop()
+                connection = await loop.run_in_executor(None, lambda: peer_0.connect(peer_1.address_name, data_type="raw"))
+
+                assert connection.send({"data": 1})
+                await asyncio.sleep(.1)
+
+    asyncio.run(scenario())
+
+    assert datas == [{"data": 1}]
+
+
+def test_async_oversized():
+    """Tests that an asyncio connection announcing more data than its peer accepts is closed"""
+    async def scenario():
+        with Peer(timeout=1.) as peer_0:
+            async with AsyncPeer(timeout=1., max_data_size=1000) as peer_1:
+                loop = asyncio.get_running_loop()
+                connection = await loop.run_in_executor(None, lambda: peer_0.connect(peer_1.address_name))
+                await asyncio.sleep(.1)
+
+                connection_ = peer_1.connections[peer_0.address_name]
+                connection.sock.sendall(build_frame_header(frames.chunk_frame, 2 ** 62, channel=1))
+                await asyncio.sleep(.2)
+                return connection_.closed and peer_0.address_name not in peer_1.connections
+
+    assert asyncio.run(scenario())
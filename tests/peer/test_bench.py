@@ -0,0 +1,14 @@
+from peerpy import bench
+
+
+def test_bench():
+    """Tests running a small benchmark and its JSON report"""
+    report = bench.run(["json", "bytes"], [16, 2 ** 16], [False, True], [2 ** 13], [1, 2],
+                       max_messages=100, latency_messages=10)
+
+    throughputs = [result for result in report["results"] if result["benchmark"] == "throughput"]
+    latencies = [result for result in report["results"] if result["benchmark"] == "latency"]
+
+    assert len(throughputs) == 16 and len(latencies) == 4
+    assert all([result["completed"] and result["messages"] == 100 for result in throughputs])
+    assert all([result["round_trips"] == 10 and result["p50_us"] <= result["p99_us"] for result in latencies])
@@ -0,0 +1,108 @@
+import time
+import pytest
+import threading
+
+from ..utils import with_peers
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    peer_receiver_args = {
+        "handlers": {
+            "connection": set_connection_handler
+        }
+    }
+
+    return [{}, peer_receiver_args, peer_receiver_args, peer_receiver_args]
+
+
+def test_broadcast(peers):
+    """Tests data broadcasting to several peers with different data types"""
+    peers[0].connect(peers[1].address_name, data_type="json")
+    peers[0].connect(peers[2].address_name, data_type="raw")
+    peers[0].connect(peers[3].address_name, data_type="bytes")
+
+    failed = peers[0].broadcast("2easy4u")
+
+    time.sleep(.1)
+
+    assert failed == [peers[3].address_name]
+    assert datas == ["2easy4u"] * 2
+
+
+def test_broadcast_empty(peers):
+    """Tests data broadcasting without any connection"""
+    assert peers[0].broadcast("2easy4u") == []
+
+
+def test_broadcast_timeout(peers):
+    """Tests that a broadcast gives up on a remote peer not receiving at the timeout, without delaying the others"""
+    peers[0].connect(peers[1].address_name, data_type="bytes")
+    stuck = peers[0].connect(peers[2].address_name, data_type="bytes")
+
+    # the remote peer's receiving thread is held by its data handler
+    release = threading.Event()
+    peers[2].connections[peers[0].address_name].handlers["data"] = lambda connection, data: release.wait()
+    stuck.send(b"first")
+    time.sleep(.1)
+
+    start = time.perf_counter()
+    failed = peers[0].broadcast(bytes(2 ** 25), timeout=.5)
+    assert time.perf_counter() - start < 1
+    release.set()
+
+    assert failed == [peers[2].address_name]
+    # only part of the data could be sent: the remote peer couldn't read the next frame
+    assert stuck.closed
+
+    time.sleep(.2)
+    assert len(datas) == 1 and len(datas[0]) == 2 ** 25
+
+
+def test_broadcast_compressed(peers):
+    """Tests that broadcast data is compressed once for all the connections sharing the same compression settings"""
+    connections = [peers[0].connect(peers[index].address_name, data_type="json", compression=compression)
+                   for index, compression in [(1, "zlib"), (2, "zlib"), (3, "bz2")]]
+    telemetry = [{"sensor": "temperature", "value": 21.5}] * 100
+
+    assert peers[0].broadcast(telemetry) == []
+
+    time.sleep(.1)
+
+    assert datas == [telemetry] * 3
+    assert sum([connection.compression_stats["compressed_frames"] for connection in connections[:2]]) == 1
+    assert connections[2].compression_stats["compressed_frames"] == 1
+
+
+def test_broadcast_shared_memory_timeout(peers):
+    """Tests that a broadcast gives up at the timeout on a remote peer not receiving through shared memory"""
+    from peerpy import shared_ring
+    if not shared_ring.supported:
+        pytest.skip("shared memory is not supported on this host")
+
+    peers[0].connect(peers[1].address_name, data_type="bytes")
+    stuck = peers[0].connect(peers[2].address_name, data_type="bytes", shared_memory=True, shared_memory_size=2 ** 16)
+    assert stuck.shared_memory
+
+    release = threading.Event()
+    peers[2].connections[peers[0].address_name].handlers["data"] = lambda connection, data: release.wait()
+    stuck.send(b"first")
+    time.sleep(.1)
+
+    # so that the broadcast ends even if it waits for the remote peer
+    threading.Timer(3, release.set).start()
+    start = time.perf_counter()
+    failed = peers[0].broadcast(bytes(2 ** 20), timeout=.5)
+    assert time.perf_counter() - start < 1
+    release.set()
+
+    assert failed == [peers[2].address_name]
@@ -0,0 +1,91 @@
+import gc
+import time
+import pytest
+import warnings
+
+from ..utils import with_peers
+
+
+def record_events(events):
+    return {
+        "discovered": lambda peer, address_name: events.append(("discovered", address_name)),
+        "lost": lambda peer, address_name: events.append(("lost", address_name))
+    }
+
+
+events = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    events.clear()
+    return [{"discovery": True, "discovery_interval": .2, "discovery_ttl": 1., "handlers": record_events(events)}, {}, {}]
+
+
+def test_cached_peers(peers):
+    """Tests that peers discovered in the background are returned without waiting"""
+    start = time.perf_counter()
+    addresses = peers[0].get_local_peers()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < .1
+    assert sorted(addresses) == sorted([peer.address_name for peer in peers[1:]])
+    assert sorted(events) == sorted([("discovered", peer.address_name) for peer in peers[1:]])
+
+    # a refresh pings the network again
+    assert sorted(peers[0].get_local_peers(refresh=True)) == sorted(addresses)
+    assert len(events) == 2
+
+
+def test_lost_peer(peers):
+    """Tests that a peer no longer answering is lost once its ttl expired"""
+    peers[1].invisible = True
+    time.sleep(2)
+
+    assert peers[0].get_local_peers() == [peers[2].address_name]
+    assert ("lost", peers[1].address_name) in events
+
+    peers[1].invisible = False
+    time.sleep(.5)
+
+    assert sorted(peers[0].get_local_peers()) == sorted([peer.address_name for peer in peers[1:]])
+    assert events.count(("discovered", peers[1].address_name)) == 2
+
+
+def test_invalid_ttl():
+    """Tests that a ttl shorter than the discovery interval is rejected"""
+    from peerpy import Peer
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        with pytest.raises(ValueError):
+            Peer(invisible=True, discovery_interval=1, discovery_ttl=.5)
+        # the server socket bound meanwhile was closed
+        gc.collect()
+    assert not [warning for warning in caught if issubclass(warning.category, ResourceWarning)]
+
+
+@pytest.fixture
+@with_peers
+def announcing_peers():
+    return [{"discovery": "announce", "discovery_interval": .2, "discovery_ttl": 1.}] * 3
+
+
+def test_announce(announcing_peers):
+    """Tests that peers announcing themselves learn about each other without pinging"""
+    peer = announcing_peers[0]
+    others = [other.address_name for other in announcing_peers[1:]]
+    assert sorted(peer.get_local_peers()) == sorted(others)
+
+    beacon = peer.discovery.beacon(others[0])
+    assert "json" in beacon["data_types"]
+    assert beacon["load"] == 0
+
+    announcing_peers[1].connect(announcing_peers[2].address_name)
+    time.sleep(.5)
+    assert peer.discovery.beacon(others[0])["load"] == 1
+
+    announcing_peers[1].stop(_async=True)
+    time.sleep(1.5)
+    assert peer.get_local_peers() == [others[1]]
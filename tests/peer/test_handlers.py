@@ -1,4 +1,5 @@
 import time
+import threading
 import pytest
 
 from ..utils import with_peers
@@ -17,3 +18,19 @@ def peers():
 def test_deny(peers):
     """Tests the denial process of a connection request"""
     assert not peers[0].connect(peers[1].address)
+
+
+def test_wait(peers):
+    """Tests waiting for an event triggered from another thread"""
+    results = []
+    thread = threading.Thread(target=lambda: results.append(peers[1].wait("offer", timeout=1.)))
+    thread.start()
+
+    time.sleep(.1)
+
+    assert not peers[0].connect(peers[1].address)
+    thread.join()
+
+    # the waiting thread receives the offer handler's result
+    assert results == [False]
+    assert peers[1].wait("offer", timeout=.1) is None
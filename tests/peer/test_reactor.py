@@ -0,0 +1,92 @@
+import time
+import socket
+import pytest
+
+from peerpy.protocol import frames
+from peerpy.utils import build_frame_header
+
+from ..utils import with_peers
+
+datas = []
+
+
+@pytest.fixture
+@with_peers
+def peers():
+    datas.clear()
+
+    def set_connection_handler(peer, connection):
+        connection.handlers["data"] = lambda connection, data: datas.append(data)
+        return True
+
+    return [
+        {"reactor": True},
+        {"reactor": True, "workers": 2, "handlers": {"connection": set_connection_handler}},
+        {}
+    ]
+
+
+def test_reactor_receive(peers):
+    """Tests data sending to a peer driving its connections from a reactor"""
+    connection_0 = peers[0].connect(peers[1].address_name, data_type="json")
+    connection_2 = peers[2].connect(peers[1].address_name, data_type="json")
+
+    datas_test_0 = [f"data{i}" for i in range(15)]
+    datas_test_2 = [f"other{i}" for i in range(15)]
+    for data_0, data_2 in zip(datas_test_0, datas_test_2):
+        connection_0.send(data_0)
+        connection_2.send(data_2)
+
+    time.sleep(.1)
+
+    # each connection is bound to a single worker, so its data is handled in order
+    assert [data for data in datas if data in datas_test_0] == datas_test_0
+    assert [data for data in datas if data in datas_test_2] == datas_test_2
+
+
+def test_reactor_disconnect(peers):
+    """Tests the disconnection of a peer driven by a reactor and its detection from the other peer"""
+    connection = peers[2].connect(peers[1].address_name)
+    connection_ = peers[1].connections[peers[2].address_name]
+
+    connection.close()
+
+    time.sleep(1.2)
+
+    assert connection_.closed
+    assert peers[2].address_name not in peers[1].connections
+
+
+def test_reactor_slow_peers(peers):
+    """Tests that a remote peer stalling in the middle of its offer or of a frame never holds other connections"""
+    stalled_offer = socket.create_connection(peers[1].address)
+    stalled_offer.sendall(b"HELLO|")
+
+    stalled = peers[0].connect(peers[1].address_name, data_type="json")
+    stalled.sock.sendall(build_frame_header(frames.data_frame, 100, "json") + b"[")
+    time.sleep(.1)
+
+    start = time.perf_counter()
+    connection = peers[2].connect(peers[1].address_name, data_type="json")
+    assert connection.send("fast")
+    time.sleep(.1)
+
+    assert datas == ["fast"]
+    assert time.perf_counter() - start < 1
+    stalled_offer.close()
+
+
+def test_reactor_failing_connection(peers):
+    """Tests that an unexpected error while receiving from a connection only closes that connection"""
+    # so that the data announced is allocated, and fails to be
+    peers[1].max_data_size = 2 ** 63
+    failing = peers[0].connect(peers[1].address_name, data_type="json")
+    failing.sock.sendall(build_frame_header(frames.data_frame, 2 ** 62, "json"))
+    time.sleep(.1)
+
+    connection = peers[2].connect(peers[1].address_name, data_type="json")
+    assert connection.send("served")
+    time.sleep(.1)
+
+    assert datas == ["served"]
+    assert peers[0].address_name not in peers[1].connections
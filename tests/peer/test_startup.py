@@ -0,0 +1,36 @@
+import os
+import sys
+import socket
+import subprocess
+
+import peerpy
+from peerpy import utils
+
+
+def test_lazy_imports():
+    """Tests that importing peerpy doesn't import optional or heavy modules"""
+    # modules which the interpreter imported at startup (e.g. zipfile's bz2 and lzma) are not peerpy's doing
+    script = "import sys; before = set(sys.modules); import peerpy; print([m for m in ['requests', 'asyncio', " \
+             "'concurrent.futures.process', 'bz2', 'lzma'] if m in sys.modules and m not in before])"
+    # run from the directory peerpy is imported from, in a fresh interpreter
+    cwd = os.path.dirname(os.path.dirname(peerpy.__file__))
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, check=True, text=True, cwd=cwd)
+
+    assert output.stdout.strip() == "[]"
+
+
+def test_local_ip(monkeypatch):
+    """Tests that the local ip is cached until refreshed, and falls back to loopback without route"""
+    local_ip = utils.get_local_ip(refresh=True)
+
+    class UnroutedSocket(socket.socket):
+        def connect(self, address):
+            raise OSError("Network is unreachable")
+
+    monkeypatch.setattr(socket, "socket", UnroutedSocket)
+
+    assert utils.get_local_ip() == local_ip
+    assert utils.get_local_ip(refresh=True) == "127.0.0.1"
+
+    monkeypatch.undo()
+    assert utils.get_local_ip(refresh=True) == local_ip
@@ -1,7 +1,10 @@
 import time
+import socket
 from typing import List, Dict, Any, Callable
 
 from peerpy import Peer
+from peerpy.protocol import headers
+from peerpy.utils import build_header, receive_exactly
 
 
 def with_peers(peers_args: Callable[[], List[Dict[str, Any]]]):
@@ -22,3 +25,17 @@ def with_peers(peers_args: Callable[[], List[Dict[str, Any]]]):
         for peer in peers:
             peer.stop(_async=True)
     return wrapper
+
+
+def offer(peer: Peer, **contents) -> socket.socket:
+    """Offers a connection to a peer with a hand-built hello header, which may carry any field.
+
+    Returns:
+        socket.socket: the socket of the connection, once accepted
+    """
+    sock = socket.create_connection(peer.address)
+    sock.settimeout(1.)
+    sock.sendall(build_header(headers.hello_header, {"peer_name": "127.0.0.1:1", "data_type": "json",
+                                                     "strict": True, **contents}))
+    assert str(receive_exactly(sock, headers.size), "utf-8").startswith(headers.accept_header)
+    return sock